@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Alert transisi sinyal (HOLD -> BUY, whaleTrapLevel jadi severe, mulai
+distribusi ke retail, ...).
+
+State sebelumnya tidak disimpan terpisah: screener index (screener.py) sudah
+berisi nilai analytics terakhir per saham per periode. Setiap kali file
+periode ditulis (generate penuh, work queue merge, intraday), index lama
+dibaca dulu, index baru ditulis, lalu hanya saham yang berubah menurut
+manifest (delta_feed: entry['changed']) yang dievaluasi terhadap rules.
+Event ditambahkan ke log append-only:
+
+    <output>/alerts/events.jsonl    satu event JSON per baris
+
+Rules (alert_rules.json di folder script, atau --rules FILE; default
+DEFAULT_RULES):
+
+    [
+      {"name": "hold_to_buy", "field": "recommendation", "from": "HOLD", "to": "BUY"},
+      {"name": "trap_severe", "field": "whaleTrapLevel", "to": "severe"},
+      {"name": "score_above_2", "when": "score>2", "periods": ["1month"]}
+    ]
+
+- field/from/to: nilai field berubah, dari (opsional) ke (opsional)
+- when: ekspresi screener (lihat screener.py) berubah dari false ke true
+- periods: batasi ke periode tertentu (default semua file periode)
+
+Saham baru (belum ada di index lama) hanya menjadi state awal, tanpa event.
+
+CLI:
+    python alerts.py <output_dir> [--rule NAME] [--stock CODE] [--period 1month] [--tail 50]
+"""
+
+import os
+import json
+
+from screener import FIELDS, compile_query, index_filename, write_index, patch_index
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alert_rules.json')
+
+DEFAULT_RULES = [
+    {'name': 'hold_to_buy', 'field': 'recommendation', 'from': 'HOLD', 'to': 'BUY'},
+    {'name': 'turn_sell', 'field': 'recommendation', 'to': 'SELL'},
+    {'name': 'whale_trap_severe', 'field': 'whaleTrapLevel', 'to': 'severe'},
+    {'name': 'distributing_to_retail', 'field': 'isDistributing', 'from': False, 'to': True},
+]
+
+
+def load_rules(file_path=None):
+    """Rules dari file JSON (jika ada), dikompilasi sekali"""
+    file_path = file_path or DEFAULT_RULES_FILE
+    rules = DEFAULT_RULES
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+
+    compiled = []
+    for rule in rules:
+        if 'when' in rule:
+            test = compile_query(rule['when'])
+        elif rule.get('field') in FIELDS:
+            test = None
+        else:
+            raise ValueError(f"Rule {rule.get('name')}: needs 'when' or a screener field ({', '.join(FIELDS)})")
+        compiled.append((rule, test))
+    return compiled
+
+
+def _period_name(period_filename):
+    return period_filename[:-5] if period_filename.endswith('.json') else period_filename
+
+
+def load_index(output_path, period_filename):
+    path = os.path.join(output_path, index_filename(period_filename))
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def detect_transitions(old_index, new_index, codes, rules, period_filename, at=None):
+    """Event untuk saham di codes yang ada di index lama dan baru"""
+    if not old_index or not rules:
+        return []
+    period = _period_name(period_filename)
+    old_fields = old_index['fields']
+    old_rows = {row[0]: row for row in old_index['rows']}
+    new_rows = {row[0]: row for row in new_index['rows']}
+    field_pos = {f: i for i, f in enumerate(FIELDS)}
+
+    events = []
+    for code in codes:
+        old_row, new_row = old_rows.get(code), new_rows.get(code)
+        if old_row is None or new_row is None:
+            continue
+        # Index lama bisa punya urutan field berbeda (versi lama)
+        if old_fields != list(FIELDS):
+            old_map = dict(zip(old_fields, old_row))
+            old_row = [old_map.get(f) for f in FIELDS]
+
+        for rule, test in rules:
+            if rule.get('periods') and period not in rule['periods']:
+                continue
+            if test is not None:
+                if test(old_row) or not test(new_row):
+                    continue
+                before, after = False, True
+            else:
+                i = field_pos[rule['field']]
+                before, after = old_row[i], new_row[i]
+                if before == after:
+                    continue
+                if 'from' in rule and before != rule['from']:
+                    continue
+                if 'to' in rule and after != rule['to']:
+                    continue
+            events.append({
+                'at': at or new_index.get('generated_at'),
+                'period': period,
+                'code': code,
+                'rule': rule['name'],
+                'field': rule.get('field') or rule['when'],
+                'from': before,
+                'to': after,
+                'date_end': new_row[field_pos['date_end']]
+            })
+    return events
+
+
+def append_events(output_path, events):
+    """Tambah event ke alerts/events.jsonl (satu write per batch)"""
+    if not events:
+        return None
+    alerts_dir = os.path.join(output_path, 'alerts')
+    os.makedirs(alerts_dir, exist_ok=True)
+    path = os.path.join(alerts_dir, 'events.jsonl')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in events))
+    return path
+
+
+def write_index_with_alerts(output_path, period_filename, output, changed, rules):
+    """Tulis screener index file periode dan catat transisi saham yang berubah. Returns: events"""
+    old_index = load_index(output_path, period_filename) if changed and rules else None
+    new_index = write_index(output_path, period_filename, output)
+    events = detect_transitions(old_index, new_index, changed, rules, period_filename)
+    append_events(output_path, events)
+    return events
+
+
+def patch_index_with_alerts(output_path, period_filename, meta, stock_code, stock, changed, rules):
+    """
+    write_index_with_alerts untuk update satu saham (intraday): hanya baris
+    saham itu yang dihitung ulang. Returns: events, atau None jika index
+    belum ada / versi field lama (tulis ulang dari file periode)
+    """
+    old_index = load_index(output_path, period_filename)
+    if old_index is None or old_index.get('fields') != list(FIELDS):
+        return None
+    new_index = patch_index(output_path, period_filename, old_index, meta, stock_code, stock)
+    events = detect_transitions(old_index, new_index, changed, rules, period_filename)
+    append_events(output_path, events)
+    return events
+
+
+def read_events(output_path):
+    path = os.path.join(output_path, 'alerts', 'events.jsonl')
+    if not os.path.exists(path):
+        return []
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python alerts.py <output_dir> [--rule NAME] [--stock CODE] [--period 1month] [--tail 50]")
+        return
+
+    args = sys.argv[2:]
+    rule = args[args.index('--rule') + 1] if '--rule' in args else None
+    stock = args[args.index('--stock') + 1].upper() if '--stock' in args else None
+    period = args[args.index('--period') + 1] if '--period' in args else None
+    tail = int(args[args.index('--tail') + 1]) if '--tail' in args else 50
+
+    events = [e for e in read_events(sys.argv[1])
+              if (not rule or e['rule'] == rule) and (not stock or e['code'] == stock)
+              and (not period or e['period'] == period)]
+    if not events:
+        print("No alert events")
+        return
+
+    for e in events[-tail:]:
+        print(f"{e['at']}  {e['period']:<12}{e['code']:<7}{e['rule']:<24}{e['from']!s} -> {e['to']!s}")
+
+
+if __name__ == '__main__':
+    main()
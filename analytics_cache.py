@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Memoized analytics per window.
+
+Window yang sama (saham sama, baris daily sama) sering dianalisis berulang:
+- 6month.json dan broker_data.json memakai window 180 hari yang sama
+- saham dengan < 30 hari punya window 1month/3month/6month yang identik
+- intraday / run berikutnya menghitung ulang saham yang tidak berubah
+
+Key = fingerprint (saham, batas window, versi data, last price, versi kode
+analytics). Versi data = hash kolom flows mentah + mask whale (flows_version),
+dihitung sekali per saham; meng-hash baris daily per window justru lebih mahal
+daripada analytics-nya (~0.5 ms per window). Hasil disimpan di LRU memori
+(OrderedDict, dibatasi jumlah entry) dan opsional di disk
+(<cache_dir>/<fp[:2]>/<fp>.json) supaya bisa dipakai bersama antar run dan
+oleh tool lain.
+
+Hasil dari cache dipakai bersama (objek yang sama) - jangan dimodifikasi.
+"""
+
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+from records import json_default
+
+DEFAULT_MAX_ENTRIES = 512
+
+
+def flows_version(flows, column_mask):
+    """Versi data satu saham: hash byte kolom flows + tanggal + broker + mask"""
+    h = hashlib.sha1()
+    h.update('|'.join(flows['dates']).encode('utf-8'))
+    h.update('|'.join(flows['dates_end']).encode('utf-8'))
+    h.update('|'.join(flows['brokers']).encode('utf-8'))
+    h.update(bytes(column_mask))
+    for cols in flows['columns'].values():
+        for col in cols:
+            h.update(col)
+    return h.hexdigest()
+
+
+def window_fingerprint(stock_code, start, end, data_version, last_price=None, version=''):
+    """Fingerprint window [start, end) dari data dengan versi data_version"""
+    key = f"{version}|{stock_code}|{start}|{end}|{data_version}|{last_price!r}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def source_version(*paths):
+    """Versi kode analytics = hash isi file sumber (cache disk invalid otomatis saat kode berubah)"""
+    h = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+class AnalyticsCache:
+    """LRU memori + tier disk opsional"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None, version=''):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.version = version
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def fingerprint(self, stock_code, start, end, data_version, last_price=None):
+        return window_fingerprint(stock_code, start, end, data_version, last_price, self.version)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        value = json.load(f)
+                except (ValueError, OSError):
+                    value = None
+                if value is not None:
+                    self.disk_hits += 1
+                    self._remember(key, value)
+                    return value
+
+        self.misses += 1
+        return None
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.cache_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=json_default))
+            os.replace(tmp_path, path)
+        return value
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self.entries)
+        }
@@ -1,31 +1,335 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Safe backup and versioning system for dashboard.html
-Creates backups before any modification and tracks version history
-"""
+Safe backup and versioning system for dashboard.html and generated data.
+
+Backups are kept in a content-addressed store:
+- every file version is identified by its SHA-256 (streamed, 1 MB buffer)
+- identical versions are stored once (dedup), compressed with zlib
+- near-identical versions are delta-encoded (line ops) against the previous
+  version of the same file, with a bounded delta chain
+- each backup run writes a small snapshot manifest {relative path: sha}
+
+Layout:
+    backups/objects/<sha[:2]>/<sha>   compressed object (full or delta)
+    backups/snapshots/<timestamp>.json
+    backups/stat_cache.json           (size, mtime) -> sha, skips rehashing
+    backups/version.json
 """
 
 import os
+import sys
+import json
+import zlib
 import shutil
-from datetime import datetime
 import hashlib
-import json
+from datetime import datetime
 
 # Configuration
-DASHBOARD_FILE = r"C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham\dashboard.html"
-BACKUP_DIR = r"C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham\backups"
+BASE_DIR = r"C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham"
+DASHBOARD_FILE = os.path.join(BASE_DIR, "dashboard.html")
+BACKUP_DIR = os.path.join(BASE_DIR, "backups")
 VERSION_FILE = os.path.join(BACKUP_DIR, "version.json")
-MAX_VERSIONS = 10  # # Keep maximum 10 versioned backups
+MAX_VERSIONS = 10  # Keep maximum 10 versioned backups (snapshots)
+
+# Files covered by a snapshot (relative to BASE_DIR)
+SNAPSHOT_FILES = [
+    "dashboard.html",
+    "1week.json",
+    "1month.json",
+    "3month.json",
+    "6month.json",
+    "broker_data.json",
+]
+
+HASH_BUFFER_SIZE = 1024 * 1024
+MAX_DELTA_CHAIN = 8       # restore never applies more than 8 deltas
+DELTA_MAX_RATIO = 0.5     # delta only if < 50% of the full compressed size
+MIN_COPY_LINES = 4        # shorter matching runs are cheaper as inserts
+
+OBJ_FULL = b'F'
+OBJ_DELTA = b'D'
+
 
 def calculate_file_hash(filepath):
-    """Calculate SHA-256 hash of a file"""
+    """Calculate SHA-256 hash of a file (streamed)"""
     sha256_hash = hashlib.sha256()
     with open(filepath, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096)):
+        for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b''):
             sha256_hash.update(chunk)
     return sha256_hash.hexdigest()
 
+
+# ===== CONTENT-ADDRESSED STORE =====
+def _objects_dir(backup_dir):
+    return os.path.join(backup_dir, "objects")
+
+
+def _snapshots_dir(backup_dir):
+    return os.path.join(backup_dir, "snapshots")
+
+
+def _object_path(backup_dir, sha):
+    return os.path.join(_objects_dir(backup_dir), sha[:2], sha)
+
+
+def has_object(backup_dir, sha):
+    return os.path.exists(_object_path(backup_dir, sha))
+
+
+def _write_object(backup_dir, sha, payload):
+    path = _object_path(backup_dir, sha)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _read_raw(backup_dir, sha):
+    with open(_object_path(backup_dir, sha), 'rb') as f:
+        return f.read()
+
+
+def _delta_base(payload):
+    """Base sha of a delta object (None for full objects)"""
+    if payload[:1] == OBJ_DELTA:
+        return payload[1:65].decode('ascii')
+    return None
+
+
+def _chain_depth(backup_dir, sha):
+    depth = 0
+    while sha and depth <= MAX_DELTA_CHAIN:
+        sha = _delta_base(_read_raw(backup_dir, sha))
+        if sha:
+            depth += 1
+    return depth
+
+
+def make_delta(base, data):
+    """
+    Line-based delta: list of [start, end] copy ranges or insert strings.
+    Linear time (one dict of base lines, greedy run extension) so multi-million
+    line period JSONs stay cheap; copy runs shorter than MIN_COPY_LINES are
+    emitted as inserts (common lines like '},' would otherwise fragment ops).
+    """
+    base_lines = base.splitlines(keepends=True)
+    new_lines = data.splitlines(keepends=True)
+    first_pos = {}
+    for i, line in enumerate(base_lines):
+        first_pos.setdefault(line, i)
+
+    ops = []
+    pending = []
+    n_base, n_new = len(base_lines), len(new_lines)
+    prev_end = 0
+    j = 0
+    while j < n_new:
+        line = new_lines[j]
+        # Lanjutkan dari akhir copy sebelumnya dulu, baru cari di index
+        if prev_end < n_base and base_lines[prev_end] == line:
+            start = prev_end
+        else:
+            start = first_pos.get(line)
+        if start is None:
+            pending.append(line)
+            j += 1
+            continue
+        i, k = start, j
+        while i < n_base and k < n_new and base_lines[i] == new_lines[k]:
+            i += 1
+            k += 1
+        if i - start < MIN_COPY_LINES:
+            pending.extend(new_lines[j:k])
+        else:
+            if pending:
+                ops.append(b''.join(pending).decode('latin-1'))
+                pending = []
+            ops.append([start, i])
+            prev_end = i
+        j = k
+    if pending:
+        ops.append(b''.join(pending).decode('latin-1'))
+    return ops
+
+
+def apply_delta(base, ops):
+    base_lines = base.splitlines(keepends=True)
+    out = []
+    for op in ops:
+        if isinstance(op, list):
+            out.append(b''.join(base_lines[op[0]:op[1]]))
+        else:
+            out.append(op.encode('latin-1'))
+    return b''.join(out)
+
+
+def read_object(backup_dir, sha):
+    """Return the original bytes of an object (resolving delta chains)"""
+    payload = _read_raw(backup_dir, sha)
+    if payload[:1] == OBJ_FULL:
+        data = zlib.decompress(payload[1:])
+    else:
+        base = read_object(backup_dir, _delta_base(payload))
+        data = apply_delta(base, json.loads(zlib.decompress(payload[65:])))
+    if hashlib.sha256(data).hexdigest() != sha:
+        raise ValueError(f"Corrupt backup object {sha}")
+    return data
+
+
+def store_file(backup_dir, filepath, sha=None, base_sha=None):
+    """
+    Store one file in the object store.
+    Returns: (sha, kind) where kind is 'dedup', 'delta' or 'full'.
+    """
+    sha = sha or calculate_file_hash(filepath)
+    if has_object(backup_dir, sha):
+        return sha, 'dedup'
+
+    with open(filepath, 'rb') as f:
+        data = f.read()
+
+    full_payload = OBJ_FULL + zlib.compress(data, 9)
+    payload, kind = full_payload, 'full'
+
+    if base_sha and base_sha != sha and has_object(backup_dir, base_sha) \
+            and _chain_depth(backup_dir, base_sha) < MAX_DELTA_CHAIN:
+        base = read_object(backup_dir, base_sha)
+        ops = make_delta(base, data)
+        delta_payload = OBJ_DELTA + base_sha.encode('ascii') + zlib.compress(
+            json.dumps(ops, separators=(',', ':')).encode('utf-8'), 9)
+        if len(delta_payload) < len(full_payload) * DELTA_MAX_RATIO:
+            payload, kind = delta_payload, 'delta'
+
+    _write_object(backup_dir, sha, payload)
+    return sha, kind
+
+
+# ===== SNAPSHOTS =====
+def _load_stat_cache(backup_dir):
+    path = os.path.join(backup_dir, "stat_cache.json")
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def _save_stat_cache(backup_dir, cache):
+    path = os.path.join(backup_dir, "stat_cache.json")
+    with open(path, 'w') as f:
+        json.dump(cache, f)
+
+
+def list_snapshots(backup_dir=BACKUP_DIR):
+    """Snapshot manifest filenames, newest first"""
+    snap_dir = _snapshots_dir(backup_dir)
+    if not os.path.isdir(snap_dir):
+        return []
+    return sorted((f for f in os.listdir(snap_dir) if f.endswith('.json')), reverse=True)
+
+
+def load_snapshot(name, backup_dir=BACKUP_DIR):
+    with open(os.path.join(_snapshots_dir(backup_dir), name), 'r') as f:
+        return json.load(f)
+
+
+def create_snapshot(base_dir=BASE_DIR, backup_dir=BACKUP_DIR, files=None, label=''):
+    """
+    Back up files (relative to base_dir) into the content store.
+    Unchanged files cost one stat() call; identical content is stored once.
+    Returns: (snapshot_name, stats)
+    """
+    files = files or SNAPSHOT_FILES
+    os.makedirs(_snapshots_dir(backup_dir), exist_ok=True)
+
+    previous = {}
+    snapshots = list_snapshots(backup_dir)
+    if snapshots:
+        previous = load_snapshot(snapshots[0], backup_dir).get('files', {})
+
+    stat_cache = _load_stat_cache(backup_dir)
+    manifest = {}
+    stats = {'dedup': 0, 'delta': 0, 'full': 0, 'bytes': 0}
+
+    for rel_path in files:
+        filepath = os.path.join(base_dir, rel_path)
+        if not os.path.exists(filepath):
+            continue
+        st = os.stat(filepath)
+        cached = stat_cache.get(rel_path)
+        sha = None
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            sha = cached[2]
+        sha, kind = store_file(backup_dir, filepath, sha, previous.get(rel_path))
+        stat_cache[rel_path] = [st.st_size, st.st_mtime_ns, sha]
+        manifest[rel_path] = sha
+        stats[kind] += 1
+        if kind != 'dedup':
+            stats['bytes'] += os.path.getsize(_object_path(backup_dir, sha))
+
+    _save_stat_cache(backup_dir, stat_cache)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    name = f"{timestamp}.json"
+    with open(os.path.join(_snapshots_dir(backup_dir), name), 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'label': label,
+            'files': manifest
+        }, f, indent=2)
+
+    prune_snapshots(backup_dir)
+    return name, stats
+
+
+def prune_snapshots(backup_dir=BACKUP_DIR, keep=MAX_VERSIONS):
+    """Keep the newest `keep` snapshots and delete unreachable objects"""
+    snapshots = list_snapshots(backup_dir)
+    for name in snapshots[keep:]:
+        os.remove(os.path.join(_snapshots_dir(backup_dir), name))
+
+    reachable = set()
+    for name in snapshots[:keep]:
+        for sha in load_snapshot(name, backup_dir).get('files', {}).values():
+            # Delta bases must stay as long as a kept object depends on them
+            while sha and sha not in reachable and has_object(backup_dir, sha):
+                reachable.add(sha)
+                sha = _delta_base(_read_raw(backup_dir, sha))
+
+    removed = 0
+    objects_dir = _objects_dir(backup_dir)
+    if os.path.isdir(objects_dir):
+        for prefix in os.listdir(objects_dir):
+            for sha in os.listdir(os.path.join(objects_dir, prefix)):
+                if sha not in reachable:
+                    os.remove(os.path.join(objects_dir, prefix, sha))
+                    removed += 1
+    return removed
+
+
+def restore_snapshot(name=None, base_dir=BASE_DIR, backup_dir=BACKUP_DIR, files=None):
+    """Restore files from a snapshot (default: latest). Returns restored paths"""
+    snapshots = list_snapshots(backup_dir)
+    if not snapshots:
+        return None, []
+    name = name or snapshots[0]
+    manifest = load_snapshot(name, backup_dir).get('files', {})
+
+    restored = []
+    for rel_path, sha in manifest.items():
+        if files and rel_path not in files:
+            continue
+        filepath = os.path.join(base_dir, rel_path)
+        tmp_path = filepath + '.restore'
+        with open(tmp_path, 'wb') as f:
+            f.write(read_object(backup_dir, sha))
+        os.replace(tmp_path, filepath)
+        restored.append(rel_path)
+    return name, restored
+
+
+# ===== VERSION TRACKING =====
 def load_version():
     """Load current version information"""
     if os.path.exists(VERSION_FILE):
@@ -59,20 +363,17 @@ def save_version(version, changes):
 
     return new_entry
 
-def create_backup():
-    """Create a backup before making changes"""
+def create_backup(label='dashboard'):
+    """Create a backup (snapshot of dashboard.html + period JSONs) before making changes"""
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
 
-    # Generate backup filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(BACKUP_DIR, f"dashboard_backup_{timestamp}.html")
+    name, stats = create_snapshot(label=label)
 
-    # Copy current dashboard to backup
-    shutil.copy2(DASHBOARD_FILE, backup_file)
-
-    print(f"✅ Backup created: {backup_file}")
-    return backup_file
+    print(f"✅ Backup created: {name} "
+          f"(new: {stats['full']} full, {stats['delta']} delta, {stats['dedup']} unchanged, "
+          f"{stats['bytes'] / 1024:.1f} KB written)")
+    return name
 
 def get_next_version():
     """Determine next version number"""
@@ -88,10 +389,21 @@ def get_next_version():
 
     return next_version
 
+def restore_legacy_backup():
+    """Restore from the newest pre-snapshot dashboard_backup_*.html copy"""
+    backups = [f for f in os.listdir(BACKUP_DIR) if f.startswith("dashboard_backup_") and f.endswith(".html")]
+    backups.sort(reverse=True)
+
+    if not backups:
+        print("❌ No backups found to restore!")
+        return
+
+    latest_backup = backups[0]
+    shutil.copy2(os.path.join(BACKUP_DIR, latest_backup), DASHBOARD_FILE)
+    print(f"✅ Restored from: {latest_backup}")
+
 def main():
     """Main function - always create backup before allowing edits"""
-    import sys
-
     # Ensure backup directory exists
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
@@ -102,63 +414,62 @@ def main():
 
         if command == "backup":
             # Create backup of current file
-            backup_file = create_backup()
+            backup_name = create_backup("Manual backup before modification")
 
             # Update version to next
             next_ver = get_next_version()
             save_version(
                 next_ver,
-                ["Manual backup before modification"]
+                ["Manual backup before modification", backup_name]
             )
 
-            print(f"✅ Backup created: {backup_file}")
             print(f"📝 Version updated to: {next_ver}")
 
+        elif command == "snapshot":
+            # Backup after a generation run (dashboard + all period JSONs)
+            create_backup(sys.argv[2] if len(sys.argv) > 2 else "snapshot")
+
+        elif command == "list":
+            for name in list_snapshots():
+                snap = load_snapshot(name)
+                print(f"  {name[:-5]}  {snap.get('label', '')}  ({len(snap.get('files', {}))} files)")
+
         elif command == "restore":
-            # Restore from latest backup
-            # List available backups
-            backups = [f for f in os.listdir(BACKUP_DIR) if f.startswith("dashboard_backup_") and f.endswith(".html")]
-            backups.sort(reverse=True)
+            # Restore dashboard.html from a snapshot (latest or given name)
+            name = sys.argv[2] if len(sys.argv) > 2 else None
+            if name and not name.endswith('.json'):
+                name += '.json'
 
-            if not backups:
-                print("❌ No backups found to restore!")
+            if not list_snapshots():
+                restore_legacy_backup()
                 return
 
-            # Use latest backup
-            latest_backup = backups[0]
-            restore_file = os.path.join(BACKUP_DIR, latest_backup)
-
-            # Restore
-            shutil.copy2(restore_file, DASHBOARD_FILE)
+            restored_name, restored = restore_snapshot(name, files=["dashboard.html"])
 
             # Get version info from backup
             backup_version = "unknown"
-            if os.path.exists(VERSION_FILE):
-                with open(VERSION_FILE, 'r') as f:
-                    ver_data = json.load(f)
-                    # Find this backup's version
-                    for entry in ver_data.get("changes", []):
-                        if os.path.basename(restore_file) in entry.get("changes", []):
-                            backup_version = entry.get("version", "unknown")
-                            break
-
-            print(f"✅ Restored from: {latest_backup}")
+            for entry in load_version().get("changes", []):
+                if restored_name in entry.get("changes", []):
+                    backup_version = entry.get("version", "unknown")
+                    break
+
+            print(f"✅ Restored from: {restored_name} ({', '.join(restored)})")
             print(f"📝 Version: {backup_version}")
 
         else:
             print("❌ Unknown command!")
-            print(f"Usage: python backup_system.py [backup|restore]")
+            print(f"Usage: python backup_system.py [backup|snapshot [label]|list|restore [snapshot]]")
 
     else:
         # Default: create backup
         print("ℹ️ No command specified - creating backup...")
-        backup_file = create_backup()
+        create_backup()
 
         # Don't auto-update version on manual backup
         print("💡 To make changes to dashboard.html:")
         print("   1. Run: python backup_system.py backup")
         print("   2. Make your edits")
-        print("   3. Run: python backup_system.py restore [version_name]")
+        print("   3. Run: python backup_system.py restore [snapshot_name]")
         print("   4. Dashboard will auto-restore from latest backup on load")
 
 if __name__ == "__main__":
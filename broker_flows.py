@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Per-broker daily flows - disimpan TERPISAH dari klasifikasi whale/retail.
+
+Alur lama: selisih kumulatif per broker langsung dijumlahkan ke whale/retail
+di dalam loop differencing, jadi ganti SHARK_BROKERS = parse ulang semua CSV.
+
+Alur baru:
+1. extract_flows()    - differencing CSV kumulatif -> flow harian per broker
+                        (kolom array per broker, urutan kemunculan pertama)
+2. aggregate_flows()  - terapkan mask broker (bytearray 0/1 per registry ID)
+                        -> daily, summary, brokers persis seperti sebelumnya
+3. save_flows()/load_flows() - simpan flow per saham supaya klasifikasi lain
+                        (foreign vs lokal, watchlist custom) bisa dihitung
+                        tanpa membaca CSV lagi
+
+CLI:
+    python broker_flows.py <flows_dir> whale foreign codes:AK,BK,ZP
+"""
+
+import os
+import json
+import socket
+from array import array
+from operator import add
+
+from records import compact_rows
+
+FLOW_FIELDS = ('buy', 'sell', 'buy_lot', 'sell_lot', 'buyavg', 'sellavg')
+
+FLOWS_VERSION = 2
+
+
+def new_flows(stock_code):
+    """Container flow kosong untuk satu saham"""
+    return {
+        'version': FLOWS_VERSION,
+        'code': stock_code,
+        'dates': [],
+        'dates_display': [],
+        'dates_end': [],
+        'brokers': [],
+        'columns': {field: [] for field in FLOW_FIELDS},
+        # Snapshot kumulatif hari terakhir (basis differencing hari berikutnya)
+        'last_cumulative': {},
+        # Snapshot kumulatif hari sebelum hari terakhir (untuk replace_last_day)
+        'prev_cumulative': {}
+    }
+
+
+def _diff(curr, prev):
+    """Selisih kumulatif; reset (curr < prev) atau prev kosong -> pakai curr"""
+    if curr < prev or prev == 0:
+        return curr
+    return curr - prev
+
+
+def append_day(flows, cum_data):
+    """
+    Tambahkan satu hari (hasil read_csv_file_cumulative) ke flows.
+    Differencing memakai flows['last_cumulative'] sebagai hari sebelumnya.
+    """
+    n = len(flows['dates'])
+    columns = flows['columns']
+    broker_index = flows.setdefault('_index', {c: i for i, c in enumerate(flows['brokers'])})
+    prev_cumulative = flows['last_cumulative']
+
+    # Broker baru: kolom diisi nol untuk hari-hari sebelumnya
+    for broker_code in cum_data['brokers']:
+        if broker_code not in broker_index:
+            broker_index[broker_code] = len(flows['brokers'])
+            flows['brokers'].append(broker_code)
+            for field in FLOW_FIELDS:
+                columns[field].append(array('d', bytes(8 * n)))
+
+    for field in FLOW_FIELDS:
+        for col in columns[field]:
+            col.append(0.0)
+
+    for broker_code, broker_cum in cum_data['brokers'].items():
+        b = broker_index[broker_code]
+        prev = prev_cumulative.get(broker_code, {})
+        columns['buy'][b][n] = _diff(broker_cum['buy'], prev.get('buy', 0))
+        columns['sell'][b][n] = _diff(broker_cum['sell'], prev.get('sell', 0))
+        columns['buy_lot'][b][n] = _diff(broker_cum.get('buy_lot', 0), prev.get('buy_lot', 0))
+        columns['sell_lot'][b][n] = _diff(broker_cum.get('sell_lot', 0), prev.get('sell_lot', 0))
+        columns['buyavg'][b][n] = broker_cum.get('buyavg', 0)
+        columns['sellavg'][b][n] = broker_cum.get('sellavg', 0)
+
+    flows['dates'].append(cum_data['date_start'] or 'Unknown')
+    flows['dates_display'].append(cum_data['date_display'] or 'Unknown')
+    flows['dates_end'].append(cum_data['date_end'] or 'Unknown')
+    flows['prev_cumulative'] = prev_cumulative
+    flows['last_cumulative'] = {
+        code: {k: v for k, v in b.items() if k != 'id'}
+        for code, b in cum_data['brokers'].items()
+    }
+    return flows
+
+
+def replace_last_day(flows, cum_data):
+    """
+    Ganti hari terakhir dengan export ulang file yang sama (intraday).
+    Differencing ulang memakai prev_cumulative; broker yang hanya muncul di
+    versi lama hari itu tetap punya kolom (berisi nol).
+    """
+    if not flows['dates']:
+        return append_day(flows, cum_data)
+    if flows.get('prev_cumulative') is None:
+        raise ValueError(f"Flows {flows['code']} tidak punya prev_cumulative - jalankan generate penuh dulu")
+
+    for field in FLOW_FIELDS:
+        for col in flows['columns'][field]:
+            col.pop()
+    for key in ('dates', 'dates_display', 'dates_end'):
+        flows[key].pop()
+    flows['last_cumulative'] = flows['prev_cumulative']
+    return append_day(flows, cum_data)
+
+
+def update_day(flows, cum_data):
+    """
+    Intraday: tanggal sama dengan hari terakhir -> replace, tanggal lebih baru -> append.
+    Returns: 'replaced' atau 'appended'
+    """
+    date = cum_data['date_start'] or 'Unknown'
+    last = flows['dates'][-1] if flows['dates'] else None
+    if last is not None and date == last:
+        replace_last_day(flows, cum_data)
+        return 'replaced'
+    if last is not None and date < last:
+        raise ValueError(f"{flows['code']}: {date} lebih lama dari hari terakhir ({last}) - jalankan generate penuh")
+    append_day(flows, cum_data)
+    return 'appended'
+
+
+def extract_flows(stock_code, cumulative_data, base=None, seed=None):
+    """
+    Differencing semua file kumulatif (urut tanggal) -> flows.
+
+    base : file kumulatif tepat sebelum cumulative_data[0] (window-pruned
+           loading) - hanya dipakai sebagai basis differencing
+    seed : flows hari-hari sebelum cumulative_data[0] s.d. hari base (dari
+           flows cache, lihat truncate_flows); hari baru ditambahkan di
+           belakangnya sehingga hasilnya sama dengan load penuh
+    """
+    flows = seed if seed is not None else new_flows(stock_code)
+    if base is not None:
+        flows['last_cumulative'] = {
+            code: {k: v for k, v in b.items() if k != 'id'}
+            for code, b in base['brokers'].items()
+        }
+    for cum_data in cumulative_data:
+        append_day(flows, cum_data)
+    return flows
+
+
+def truncate_flows(flows, n_days):
+    """
+    Flows n_days hari pertama (seed untuk extract_flows). Kolom semua broker
+    dipertahankan (urutan kolom sama dengan load penuh); snapshot kumulatif
+    dikosongkan - basis differencing berikutnya diisi dari file base.
+    """
+    truncated = new_flows(flows['code'])
+    for key in ('dates', 'dates_display', 'dates_end'):
+        truncated[key] = flows[key][:n_days]
+    truncated['brokers'] = list(flows['brokers'])
+    truncated['columns'] = {f: [col[:n_days] for col in flows['columns'][f]] for f in FLOW_FIELDS}
+    return truncated
+
+
+def merge_flows(stock_code, sources):
+    """
+    Gabung flows beberapa variant export (urut preferensi): per tanggal diambil
+    baris dari flows pertama yang punya tanggal itu. Differencing sudah per
+    variant, jadi kumulatif antar variant tidak pernah dicampur. Hasilnya
+    tidak untuk disimpan (snapshot kumulatif kosong).
+    """
+    if len(sources) == 1:
+        return sources[0]
+    picks = {}
+    for s, flows in enumerate(sources):
+        for t, date in enumerate(flows['dates']):
+            picks.setdefault(date, (s, t))
+
+    merged = new_flows(stock_code)
+    columns = merged['columns']
+    broker_index = {}
+    for n, date in enumerate(sorted(picks)):
+        s, t = picks[date]
+        flows = sources[s]
+        for code in flows['brokers']:
+            if code not in broker_index:
+                broker_index[code] = len(merged['brokers'])
+                merged['brokers'].append(code)
+                for field in FLOW_FIELDS:
+                    columns[field].append(array('d', bytes(8 * n)))
+        for field in FLOW_FIELDS:
+            for col in columns[field]:
+                col.append(0.0)
+            for b, code in enumerate(flows['brokers']):
+                columns[field][broker_index[code]][n] = flows['columns'][field][b][t]
+        for key in ('dates', 'dates_display', 'dates_end'):
+            merged[key].append(flows[key][t])
+    return merged
+
+
+def num_days(flows):
+    return len(flows['dates'])
+
+
+def broker_mask(flows, group_mask, registry):
+    """Mask grup (per registry ID) -> list 0/1 per kolom broker di flows"""
+    ids = [registry.intern(code) for code in flows['brokers']]
+    # intern bisa menambah ID baru; mask grup yang lebih pendek = bukan anggota
+    return [group_mask[i] if i < len(group_mask) else 0 for i in ids]
+
+
+def _masked_sum(columns, selected, n, transform=None):
+    """Jumlah elemen per hari dari kolom-kolom broker terpilih"""
+    total = [0] * n
+    for b in selected:
+        col = columns[b] if transform is None else transform(b)
+        total = list(map(add, total, col))
+    return total
+
+
+def _clamped(col):
+    return [x if x > 0 else 0 for x in col]
+
+
+def _weighted(avg_col, lot_col):
+    return [a * l if l > 0 else 0 for a, l in zip(avg_col, lot_col)]
+
+
+def new_totals():
+    """Total berjalan whale/retail untuk aggregate_daily (semua nol)"""
+    return {g: {
+        'cum_buy': 0, 'cum_sell': 0, 'cum_buy_lot': 0, 'cum_sell_lot': 0,
+        'buyavg_w': 0, 'sellavg_w': 0, 'buy_lot_avg': 0, 'sell_lot_avg': 0
+    } for g in ('whale', 'retail')}
+
+
+def aggregate_daily(flows, column_mask, start=0, end=None, totals=None, cols=None):
+    """
+    Baris daily whale/retail untuk hari [start, end).
+
+    totals: total berjalan s.d. sebelum hari start (new_totals(), diubah di
+            tempat). Intraday melanjutkan dari total hari sebelumnya, jadi
+            hanya hari yang berubah yang diagregasi.
+    cols  : kolom flows yang sudah dipotong [start, end) (opsional)
+
+    Returns: (daily_data (list dict), totals)
+    """
+    end = num_days(flows) if end is None else end
+    n = max(0, end - start)
+    if cols is None:
+        cols = {f: [c[start:end] for c in flows['columns'][f]] for f in FLOW_FIELDS}
+    nb = len(flows['brokers'])
+    groups = {
+        'whale': [b for b in range(nb) if column_mask[b]],
+        'retail': [b for b in range(nb) if not column_mask[b]],
+    }
+
+    per_group = {}
+    for g, selected in groups.items():
+        buy_lot_clamped = {b: _clamped(cols['buy_lot'][b]) for b in selected}
+        sell_lot_clamped = {b: _clamped(cols['sell_lot'][b]) for b in selected}
+        per_group[g] = {
+            'buy': _masked_sum(cols['buy'], selected, n),
+            'sell': _masked_sum(cols['sell'], selected, n),
+            'buy_lot': _masked_sum(cols['buy_lot'], selected, n),
+            'sell_lot': _masked_sum(cols['sell_lot'], selected, n),
+            'buy_lot_avg': _masked_sum(None, selected, n, lambda b: buy_lot_clamped[b]),
+            'sell_lot_avg': _masked_sum(None, selected, n, lambda b: sell_lot_clamped[b]),
+            'buyavg_w': _masked_sum(None, selected, n, lambda b: _weighted(cols['buyavg'][b], cols['buy_lot'][b])),
+            'sellavg_w': _masked_sum(None, selected, n, lambda b: _weighted(cols['sellavg'][b], cols['sell_lot'][b])),
+        }
+
+    totals = totals if totals is not None else new_totals()
+
+    daily_data = []
+    for t in range(n):
+        row_avg = {}
+        for g in groups:
+            p = per_group[g]
+            tot = totals[g]
+            today_buy_lot = p['buy_lot_avg'][t]
+            today_sell_lot = p['sell_lot_avg'][t]
+            buyavg = p['buyavg_w'][t] / today_buy_lot if today_buy_lot > 0 else 0
+            sellavg = p['sellavg_w'][t] / today_sell_lot if today_sell_lot > 0 else 0
+            row_avg[g] = (buyavg, sellavg)
+
+            tot['cum_buy'] += p['buy'][t]
+            tot['cum_sell'] += p['sell'][t]
+            tot['cum_buy_lot'] += p['buy_lot'][t]
+            tot['cum_sell_lot'] += p['sell_lot'][t]
+            if today_buy_lot > 0:
+                tot['buyavg_w'] += buyavg * today_buy_lot
+            if today_sell_lot > 0:
+                tot['sellavg_w'] += sellavg * today_sell_lot
+            tot['buy_lot_avg'] += today_buy_lot
+            tot['sell_lot_avg'] += today_sell_lot
+
+        w, r = per_group['whale'], per_group['retail']
+        tw, tr = totals['whale'], totals['retail']
+        daily_data.append({
+            'day': start + t + 1,
+            'date': flows['dates'][start + t],
+            'date_display': flows['dates_display'][start + t],
+            'date_end': flows['dates_end'][start + t],
+            'whale_buy': round(w['buy'][t], 2),
+            'retail_buy': round(r['buy'][t], 2),
+            'whale_sell': round(w['sell'][t], 2),
+            'retail_sell': round(r['sell'][t], 2),
+            'whale_buyavg': round(row_avg['whale'][0], 2),
+            'whale_sellavg': round(row_avg['whale'][1], 2),
+            'retail_buyavg': round(row_avg['retail'][0], 2),
+            'retail_sellavg': round(row_avg['retail'][1], 2),
+            'whale_cum_buy': round(tw['cum_buy'], 2),
+            'retail_cum_buy': round(tr['cum_buy'], 2),
+            'whale_cum_sell': round(tw['cum_sell'], 2),
+            'retail_cum_sell': round(tr['cum_sell'], 2),
+            'whale_net': round(w['buy'][t] - w['sell'][t], 2),
+            'retail_net': round(r['buy'][t] - r['sell'][t], 2),
+            'whale_cum_net': round(tw['cum_buy'] - tw['cum_sell'], 2),
+            'retail_cum_net': round(tr['cum_buy'] - tr['cum_sell'], 2),
+            'whale_cum_buy_lot': round(tw['cum_buy_lot']),
+            'whale_cum_sell_lot': round(tw['cum_sell_lot']),
+            'retail_cum_buy_lot': round(tr['cum_buy_lot']),
+            'retail_cum_sell_lot': round(tr['cum_sell_lot']),
+            'whale_net_lot': round(tw['cum_buy_lot'] - tw['cum_sell_lot']),
+            'retail_net_lot': round(tr['cum_buy_lot'] - tr['cum_sell_lot'])
+        })
+    return daily_data, totals
+
+
+def aggregate_flows(flows, column_mask, registry, start=0, end=None):
+    """
+    Agregasi whale/retail dari flows dengan mask per kolom broker.
+
+    column_mask: list/bytearray 0/1 sepanjang flows['brokers'] (lihat broker_mask)
+    registry   : BrokerRegistry (nama broker untuk tabel brokers)
+    start, end : slice hari (default semua hari)
+
+    Returns: (daily_data, summary, brokers_list) dengan field dan pembulatan
+    identik dengan loop differencing lama di process_stock_folder. Baris
+    daily/broker berupa records.Row (kolom per field, dict read-only).
+    """
+    end = num_days(flows) if end is None else end
+    cols = {f: [c[start:end] for c in flows['columns'][f]] for f in FLOW_FIELDS}
+    daily_data, totals = aggregate_daily(flows, column_mask, start, end, cols=cols)
+
+    tw, tr = totals['whale'], totals['retail']
+    summary = {
+        'whale_buy': round(tw['cum_buy'], 2),
+        'retail_buy': round(tr['cum_buy'], 2),
+        'whale_sell': round(tw['cum_sell'], 2),
+        'retail_sell': round(tr['cum_sell'], 2),
+        'whale_buyavg': round(tw['buyavg_w'] / tw['buy_lot_avg'] if tw['buy_lot_avg'] > 0 else 0, 2),
+        'retail_buyavg': round(tr['buyavg_w'] / tr['buy_lot_avg'] if tr['buy_lot_avg'] > 0 else 0, 2),
+        'whale_sellavg': round(tw['sellavg_w'] / tw['sell_lot_avg'] if tw['sell_lot_avg'] > 0 else 0, 2),
+        'retail_sellavg': round(tr['sellavg_w'] / tr['sell_lot_avg'] if tr['sell_lot_avg'] > 0 else 0, 2),
+        'whale_net': round(tw['cum_buy'] - tw['cum_sell'], 2),
+        'retail_net': round(tr['cum_buy'] - tr['cum_sell'], 2),
+        'total_buy': round(tw['cum_buy'] + tr['cum_buy'], 2),
+        'total_sell': round(tw['cum_sell'] + tr['cum_sell'], 2),
+        'whale_cum_buy_lot': round(tw['cum_buy_lot']),
+        'whale_cum_sell_lot': round(tw['cum_sell_lot']),
+        'retail_cum_buy_lot': round(tr['cum_buy_lot']),
+        'retail_cum_sell_lot': round(tr['cum_sell_lot']),
+        'whale_net_lot': round(tw['cum_buy_lot'] - tw['cum_sell_lot']),
+        'retail_net_lot': round(tr['cum_buy_lot'] - tr['cum_sell_lot'])
+    }
+
+    return compact_rows(daily_data), summary, aggregate_brokers(flows, column_mask, cols, registry)
+
+
+def aggregate_brokers(flows, column_mask, cols, registry):
+    """
+    Total per broker (buy/sell/avg tertimbang) untuk slice hari di cols.
+    Broker tanpa transaksi di slice tersebut tidak dimasukkan.
+    """
+    brokers_list = []
+    for b, code in enumerate(flows['brokers']):
+        buy_col, sell_col = cols['buy'][b], cols['sell'][b]
+        if not any(buy_col) and not any(sell_col):
+            continue
+        buy = sum(buy_col)
+        sell = sum(sell_col)
+        buyavg_weighted = sum(a * v for a, v in zip(cols['buyavg'][b], buy_col))
+        sellavg_weighted = sum(a * v for a, v in zip(cols['sellavg'][b], sell_col))
+        data = {
+            'code': code,
+            'name': registry.name(code),
+            'category': 'whale' if column_mask[b] else 'retail',
+            'buy': round(buy, 2),
+            'sell': round(sell, 2),
+            'buyavg': 0,
+            'sellavg': 0,
+            'buyavg_weighted': buyavg_weighted,
+            'sellavg_weighted': sellavg_weighted,
+            'net': round(buy - sell, 2),
+            'total': round(buy + sell, 2)
+        }
+        data['buyavg'] = round(buyavg_weighted / data['buy'], 2) if data['buy'] > 0 else 0
+        data['sellavg'] = round(sellavg_weighted / data['sell'], 2) if data['sell'] > 0 else 0
+        brokers_list.append(data)
+
+    brokers_list.sort(key=lambda x: x['total'], reverse=True)
+    return compact_rows(brokers_list)
+
+
+# ===== PERSISTENCE =====
+# <CODE>.json : metadata (tanggal, broker, snapshot kumulatif)
+# <CODE>.bin  : semua kolom sebagai array 'd' mentah, urut FLOW_FIELDS lalu
+#               broker, masing-masing sepanjang jumlah hari. Jauh lebih cepat
+#               dibaca/ditulis daripada ribuan float di JSON (path intraday).
+def flows_to_json(flows, include_columns=True):
+    data = {
+        'version': flows['version'],
+        'code': flows['code'],
+        'dates': flows['dates'],
+        'dates_display': flows['dates_display'],
+        'dates_end': flows['dates_end'],
+        'brokers': flows['brokers'],
+        'last_cumulative': flows['last_cumulative'],
+        'prev_cumulative': flows.get('prev_cumulative')
+    }
+    if include_columns:
+        data['columns'] = {f: [list(c) for c in cols] for f, cols in flows['columns'].items()}
+    return data
+
+
+def flows_from_json(data, column_bytes=None):
+    """Flows dari JSON; kolom dari JSON (format lama) atau dari isi file .bin"""
+    flows = dict(data)
+    if 'columns' in data:
+        flows['columns'] = {f: [array('d', c) for c in cols] for f, cols in data['columns'].items()}
+        return flows
+
+    n, nb = len(data['dates']), len(data['brokers'])
+    values = array('d')
+    values.frombytes(column_bytes or b'')
+    if len(values) != len(FLOW_FIELDS) * nb * n:
+        raise ValueError(f"Flows {data['code']}: kolom .bin tidak cocok dengan metadata")
+    flows['columns'] = {}
+    pos = 0
+    for field in FLOW_FIELDS:
+        cols = []
+        for _ in range(nb):
+            cols.append(values[pos:pos + n])
+            pos += n
+        flows['columns'][field] = cols
+    return flows
+
+
+def tmp_path_for(path):
+    """Nama file sementara unik per host + proses (folder flows/results bisa dipakai worker lintas mesin)"""
+    return f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+
+
+def save_flows(flows, flows_dir):
+    """Simpan flows satu saham ke <flows_dir>/<CODE>.json + .bin (atomic replace)"""
+    os.makedirs(flows_dir, exist_ok=True)
+    path = os.path.join(flows_dir, f"{flows['code']}.json")
+    bin_path = os.path.join(flows_dir, f"{flows['code']}.bin")
+    tmp_path, tmp_bin_path = tmp_path_for(path), tmp_path_for(bin_path)
+
+    with open(tmp_bin_path, 'wb') as f:
+        for field in FLOW_FIELDS:
+            for col in flows['columns'][field]:
+                col.tofile(f)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(flows_to_json(flows, include_columns=False), separators=(',', ':')))
+    os.replace(tmp_bin_path, bin_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_flows(stock_code, flows_dir):
+    """Flows satu saham (None jika belum ada atau .json/.bin tidak konsisten)"""
+    path = os.path.join(flows_dir, f'{stock_code}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    column_bytes = None
+    if 'columns' not in data:
+        bin_path = os.path.join(flows_dir, f'{stock_code}.bin')
+        if not os.path.exists(bin_path):
+            return None
+        with open(bin_path, 'rb') as f:
+            column_bytes = f.read()
+    try:
+        return flows_from_json(data, column_bytes)
+    except ValueError:
+        return None
+
+
+def list_flows(flows_dir):
+    if not os.path.isdir(flows_dir):
+        return []
+    return sorted(f[:-5] for f in os.listdir(flows_dir) if f.endswith('.json'))
+
+
+# ===== RE-CLASSIFICATION =====
+def resolve_grouping(spec, registry):
+    """
+    Grouping spec -> mask per registry ID.
+
+    - nama kategori registry: whale, shark, retail, foreign, local, hybrid
+      (gabungan dengan '+', mis. 'foreign+hybrid')
+    - daftar kode: 'codes:AK,BK,ZP'
+    """
+    from broker_registry import CATEGORY_NAMES
+
+    if spec.startswith('codes:'):
+        codes = [c.strip().upper() for c in spec[6:].split(',') if c.strip()]
+        return registry.mask_for_codes(codes)
+
+    bits = 0
+    for name in spec.split('+'):
+        if name not in CATEGORY_NAMES:
+            raise ValueError(f"Unknown broker grouping: {name}")
+        bits |= CATEGORY_NAMES[name]
+    return registry.mask(bits)
+
+
+def compare_groupings(flows_by_stock, specs, registry, period_days=None):
+    """
+    Hitung summary whale/retail untuk beberapa grouping sekaligus.
+
+    Returns: {spec: {stock_code: summary}}
+    """
+    masks = {spec: resolve_grouping(spec, registry) for spec in specs}
+    result = {spec: {} for spec in specs}
+    for stock_code, flows in flows_by_stock.items():
+        n = num_days(flows)
+        start = max(0, n - period_days) if period_days else 0
+        for spec, group_mask in masks.items():
+            col_mask = broker_mask(flows, group_mask, registry)
+            _, summary, _ = aggregate_flows(flows, col_mask, registry, start, n)
+            result[spec][stock_code] = summary
+    return result
+
+
+def main():
+    import sys
+    from generate_data import get_registry
+
+    if len(sys.argv) < 3:
+        print("Usage: python broker_flows.py <flows_dir> <grouping> [<grouping> ...] [--days N]")
+        print("  grouping: whale | shark | retail | foreign | local | hybrid | a+b | codes:AK,BK")
+        return
+
+    args = sys.argv[2:]
+    period_days = None
+    if '--days' in args:
+        i = args.index('--days')
+        if i + 1 >= len(args) or not args[i + 1].isdigit():
+            print("Error: --days needs a number of days")
+            return
+        period_days = int(args[i + 1])
+        args = args[:i] + args[i + 2:]
+
+    flows_dir = sys.argv[1]
+    registry = get_registry()
+    for spec in args:
+        try:
+            resolve_grouping(spec, registry)
+        except ValueError as e:
+            print(f"Error: {e} (use whale | shark | retail | foreign | local | hybrid | a+b | codes:AK,BK)")
+            return
+    flows_by_stock = {code: load_flows(code, flows_dir) for code in list_flows(flows_dir)}
+    flows_by_stock = {code: f for code, f in flows_by_stock.items() if f is not None}
+    result = compare_groupings(flows_by_stock, args, registry, period_days)
+
+    print(f"{'Stock':<8}" + ''.join(f"{spec[:18]:>20}" for spec in args))
+    for stock_code in sorted(flows_by_stock):
+        row = ''.join(f"{result[spec][stock_code]['whale_net']:>20.2f}" for spec in args)
+        print(f"{stock_code:<8}{row}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Cross-stock broker footprint index + leaderboard.
+
+Menjawab "broker AK sedang akumulasi di saham apa?" tanpa membuka semua
+file periode. Dibangun saat generate dari per-broker flows (broker_flows.py):
+
+- tensor broker x saham x hari (sparse: hanya pasangan broker/saham yang aktif),
+  disimpan sebagai prefix sum per kolom sehingga total window apa pun O(1)
+- index terbalik: broker -> saham -> window -> net value/lot dan harga rata-rata
+- leaderboard: ranking broker berdasarkan net akumulasi seluruh universe
+
+Output:
+- broker_index.json        (index terbalik, per window)
+- broker_leaderboard.json  (ranking broker per window)
+
+Query:
+    python broker_footprint.py broker_index.json AK [--window 1month] [--top 20]
+"""
+
+import os
+import json
+from array import array
+from itertools import accumulate
+from datetime import datetime
+
+DEFAULT_WINDOWS = (
+    ('1week', 7),
+    ('1month', 30),
+    ('3month', 90),
+    ('6month', 180),
+)
+
+
+def _prefix(col):
+    """
+    Prefix sum dengan 0 di depan: total hari [a, b) = p[b] - p[a].
+    array('d') (8 byte/hari) - tensor seluruh universe ditahan sampai output
+    ditulis, list float Python ~5x lebih besar
+    """
+    p = array('d', [0.0])
+    p.extend(accumulate(col))
+    return p
+
+
+def _weighted_prefix(avg_col, val_col):
+    return _prefix(a * v for a, v in zip(avg_col, val_col))
+
+
+class FootprintTensor:
+    """
+    Tensor sparse broker x saham x hari dalam bentuk prefix sum.
+
+    cells[(broker_code, stock_code)] = {field: prefix array} dengan field
+    buy, sell, buy_lot, sell_lot, buy_w (buyavg*buy), sell_w (sellavg*sell).
+    days[stock_code] = jumlah hari saham tersebut.
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.days = {}
+        self.dates = {}
+        self.stock_brokers = {}
+
+    def update_stock(self, flows):
+        """Ganti (atau tambah) slice satu saham dari flows-nya"""
+        stock_code = flows['code']
+        self.remove_stock(stock_code)
+
+        cols = flows['columns']
+        active = []
+        for b, broker_code in enumerate(flows['brokers']):
+            buy_col, sell_col = cols['buy'][b], cols['sell'][b]
+            if not any(buy_col) and not any(sell_col):
+                continue
+            self.cells[(broker_code, stock_code)] = {
+                'buy': _prefix(buy_col),
+                'sell': _prefix(sell_col),
+                'buy_lot': _prefix(cols['buy_lot'][b]),
+                'sell_lot': _prefix(cols['sell_lot'][b]),
+                'buy_w': _weighted_prefix(cols['buyavg'][b], buy_col),
+                'sell_w': _weighted_prefix(cols['sellavg'][b], sell_col),
+            }
+            active.append(broker_code)
+
+        self.days[stock_code] = len(flows['dates'])
+        self.dates[stock_code] = (flows['dates'][0], flows['dates'][-1]) if flows['dates'] else (None, None)
+        self.stock_brokers[stock_code] = active
+
+    def remove_stock(self, stock_code):
+        for broker_code in self.stock_brokers.pop(stock_code, []):
+            self.cells.pop((broker_code, stock_code), None)
+        self.days.pop(stock_code, None)
+        self.dates.pop(stock_code, None)
+
+    def window_totals(self, broker_code, stock_code, window_days):
+        """Total broker di saham untuk N hari terakhir saham tersebut"""
+        cell = self.cells.get((broker_code, stock_code))
+        if cell is None:
+            return None
+        n = self.days[stock_code]
+        a = max(0, n - window_days)
+        t = {field: p[n] - p[a] for field, p in cell.items()}
+        if t['buy'] == 0 and t['sell'] == 0:
+            return None
+        return {
+            'net': round(t['buy'] - t['sell'], 2),
+            'net_lot': round(t['buy_lot'] - t['sell_lot']),
+            'buy': round(t['buy'], 2),
+            'sell': round(t['sell'], 2),
+            'buyavg': round(t['buy_w'] / t['buy'], 2) if t['buy'] > 0 else 0,
+            'sellavg': round(t['sell_w'] / t['sell'], 2) if t['sell'] > 0 else 0
+        }
+
+
+def build_index(tensor, windows=DEFAULT_WINDOWS):
+    """
+    Index terbalik broker -> saham -> window -> totals.
+
+    Returns: {broker_code: {stock_code: {window_name: totals}}}
+    """
+    index = {}
+    for (broker_code, stock_code) in tensor.cells:
+        per_window = {}
+        for name, days in windows:
+            totals = tensor.window_totals(broker_code, stock_code, days)
+            if totals:
+                per_window[name] = totals
+        if per_window:
+            index.setdefault(broker_code, {})[stock_code] = per_window
+    return index
+
+
+def build_leaderboard(index, windows=DEFAULT_WINDOWS, name_func=None, top_stocks=5):
+    """
+    Ranking broker per window berdasarkan total net value di semua saham.
+
+    Returns: {window_name: [ {code, name, net, net_lot, buy, sell, stocks,
+                              topAccumulation, topDistribution}, ... ]}
+    """
+    leaderboard = {}
+    for name, _ in windows:
+        rows = []
+        for broker_code, stocks in index.items():
+            entries = [(s, w[name]) for s, w in stocks.items() if name in w]
+            if not entries:
+                continue
+            entries.sort(key=lambda x: x[1]['net'], reverse=True)
+            rows.append({
+                'code': broker_code,
+                'name': name_func(broker_code) if name_func else broker_code,
+                'net': round(sum(e['net'] for _, e in entries), 2),
+                'net_lot': sum(e['net_lot'] for _, e in entries),
+                'buy': round(sum(e['buy'] for _, e in entries), 2),
+                'sell': round(sum(e['sell'] for _, e in entries), 2),
+                'stocks': len(entries),
+                'topAccumulation': [
+                    {'code': s, 'net': e['net']} for s, e in entries[:top_stocks] if e['net'] > 0
+                ],
+                'topDistribution': [
+                    {'code': s, 'net': e['net']} for s, e in reversed(entries[-top_stocks:]) if e['net'] < 0
+                ]
+            })
+        rows.sort(key=lambda r: r['net'], reverse=True)
+        for rank, row in enumerate(rows, 1):
+            row['rank'] = rank
+        leaderboard[name] = rows
+    return leaderboard
+
+
+def write_outputs(tensor, output_path, windows=DEFAULT_WINDOWS, name_func=None):
+    """Tulis broker_index.json dan broker_leaderboard.json"""
+    index = build_index(tensor, windows)
+    leaderboard = build_leaderboard(index, windows, name_func)
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    index_path = os.path.join(output_path, 'broker_index.json')
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated_at': generated_at,
+            'windows': dict(windows),
+            'stock_dates': {s: list(d) for s, d in sorted(tensor.dates.items())},
+            'brokers': index
+        }, f, separators=(',', ':'), ensure_ascii=False)
+
+    leaderboard_path = os.path.join(output_path, 'broker_leaderboard.json')
+    with open(leaderboard_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated_at': generated_at,
+            'windows': dict(windows),
+            'leaderboard': leaderboard
+        }, f, indent=2, ensure_ascii=False)
+
+    return index_path, leaderboard_path
+
+
+def query_broker(index_data, broker_code, window='1month', top=20):
+    """Saham tempat broker akumulasi/distribusi di window tertentu (urut net)"""
+    stocks = index_data['brokers'].get(broker_code.upper(), {})
+    rows = [(s, w[window]) for s, w in stocks.items() if window in w]
+    rows.sort(key=lambda x: x[1]['net'], reverse=True)
+    return rows[:top] if top else rows
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python broker_footprint.py <broker_index.json> <BROKER> [--window 1month] [--top 20]")
+        return
+
+    args = sys.argv[3:]
+    window = args[args.index('--window') + 1] if '--window' in args else '1month'
+    top = int(args[args.index('--top') + 1]) if '--top' in args else 20
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        index_data = json.load(f)
+
+    rows = query_broker(index_data, sys.argv[2], window, top)
+    if not rows:
+        print(f"No activity for broker {sys.argv[2].upper()} in {window}")
+        return
+
+    print(f"{'Stock':<8}{'Net (M)':>12}{'Net Lot':>14}{'BuyAvg':>10}{'SellAvg':>10}")
+    for stock_code, t in rows:
+        print(f"{stock_code:<8}{t['net']:>12.2f}{t['net_lot']:>14,}{t['buyavg']:>10.0f}{t['sellavg']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
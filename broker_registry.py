@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Broker registry - kode broker -> ID integer, nama, dan kategori (bitmask).
+
+Registry dibaca SEKALI dari broker_saham_indonesia.md lalu dipakai ulang.
+Setiap kode broker mendapat ID integer yang padat (0, 1, 2, ...) sehingga
+pipeline berbasis array bisa langsung index per broker, dan klasifikasi
+whale/retail cukup dengan mask (bytearray 0/1 per ID) tanpa lookup set.
+
+Kode yang belum dikenal (muncul di CSV tapi tidak ada di tabel) otomatis
+di-intern dengan ID baru, nama default 'Broker XX' dan kategori kosong.
+"""
+
+import os
+from array import array
+
+# Kategori broker (bitmask)
+CAT_SHARK = 1      # Tabel 1: broker institusional/smart money
+CAT_RETAIL = 2     # Tabel 2: broker favorit ritel
+CAT_FOREIGN = 4    # Jenis 'Asing'
+CAT_LOCAL = 8      # Jenis 'Lokal' / BUMN
+CAT_HYBRID = 16    # Jenis 'Hybrid' / bank
+CAT_WHALE = 32     # Dipakai pipeline sebagai whale (SHARK_BROKERS)
+
+CATEGORY_NAMES = {
+    'shark': CAT_SHARK,
+    'retail': CAT_RETAIL,
+    'foreign': CAT_FOREIGN,
+    'local': CAT_LOCAL,
+    'hybrid': CAT_HYBRID,
+    'whale': CAT_WHALE,
+}
+
+DEFAULT_REGISTRY_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'broker_saham_indonesia.md'
+)
+
+# Nama tampilan yang sudah dipakai di output JSON/dashboard.
+# Diprioritaskan di atas nama dari tabel markdown supaya output tidak berubah.
+DISPLAY_NAMES = {
+    'CC': 'Mandiri Sekuritas', 'XL': 'Stockbit', 'PD': 'IPOT',
+    'YP': 'Mirae Asset', 'NI': 'BNI Sekuritas', 'KI': 'Kingsford',
+    'SQ': 'BCA Sekuritas', 'DR': 'RHB/Danareksa', 'EP': 'MNC Sekuritas',
+    'BK': 'JP Morgan', 'GR': 'Gundalah', 'ZP': 'Maybank Sekuritas',
+    'YU': 'Yuanta Sekuritas', 'XC': 'Ajaib Sekuritas', 'AK': 'UBS Sekuritas',
+    'KK': 'Phillip Sekuritas', 'OD': 'BRI Danareksa', 'AZ': 'Asia Trade',
+    'DX': 'Bahana Sekuritas', 'TP': 'OCBC Sekuritas', 'AR': 'Artha Sekuritas',
+    'XA': 'NH Korindo', 'YB': 'Yulie Sekuritas', 'DH': 'Sinarmas Sekuritas',
+    'CP': 'Ciptadana Sekuritas', 'AT': 'Phintraco Sekuritas', 'YJ': 'Lotus Andalan',
+    'HD': 'KGI Sekuritas', 'RG': 'RHB Sekuritas', 'BQ': 'Korea Investment',
+    'HP': 'Hanson Sekuritas', 'IF': 'Samuel Sekuritas', 'MU': 'Mandiri Investasi',
+    'LS': 'Lippo Sekuritas', 'AG': 'Agra Sekuritas', 'TF': 'Trust Sekuritas',
+    'LG': 'Trimegah Sekuritas', 'MG': 'MNC Sekuritas', 'AI': 'UOB Kay Hian',
+    'MR': 'Mandiri Manajemen', 'CM': 'CIMB Sekuritas', 'VS': 'Valbury Sekuritas',
+    'YT': 'Yulie Sekuritas', 'PT': 'Pioneer Investama', 'NL': 'NASD',
+    'MZ': 'MNC Sekuritas', 'TN': 'Trimegah Tbk', 'TH': 'Tech Sekuritas',
+    'RX': 'Macquarie Sekuritas'
+}
+
+
+def _jenis_to_bits(jenis):
+    """Map kolom 'Jenis' tabel shark ke bit kategori"""
+    jenis = jenis.lower()
+    bits = 0
+    if 'asing' in jenis:
+        bits |= CAT_FOREIGN
+    if 'lokal' in jenis or 'bumn' in jenis:
+        bits |= CAT_LOCAL
+    if 'hybrid' in jenis or 'bank' in jenis:
+        bits |= CAT_HYBRID
+    return bits
+
+
+def parse_registry_markdown(file_path):
+    """
+    Parse tabel broker dari broker_saham_indonesia.md.
+
+    Returns: list of (code, name, category_bits) sesuai urutan di file.
+    Broker yang muncul di dua tabel digabung bit kategorinya.
+    """
+    entries = OrderedEntries()
+    section_bits = 0
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('## '):
+                if 'SHARK' in line and 'RITEL' not in line:
+                    section_bits = CAT_SHARK
+                elif 'RITEL' in line and 'SHARK' not in line:
+                    section_bits = CAT_RETAIL
+                else:
+                    section_bits = 0
+                continue
+
+            if not section_bits or not line.startswith('| **'):
+                continue
+
+            cells = [c.strip() for c in line.strip('|').split('|')]
+            if len(cells) < 3:
+                continue
+
+            code = cells[0].strip('*').strip().upper()
+            if not code or len(code) > 3:
+                continue
+
+            bits = section_bits
+            if section_bits == CAT_SHARK:
+                bits |= _jenis_to_bits(cells[2])
+            entries.add(code, cells[1], bits)
+
+    return entries.items()
+
+
+class OrderedEntries:
+    """Kumpulan (code, name, bits) dengan merge bit untuk kode duplikat"""
+
+    def __init__(self):
+        self._index = {}
+        self._items = []
+
+    def add(self, code, name, bits):
+        if code in self._index:
+            i = self._index[code]
+            old_code, old_name, old_bits = self._items[i]
+            self._items[i] = (old_code, old_name, old_bits | bits)
+        else:
+            self._index[code] = len(self._items)
+            self._items.append((code, name, bits))
+
+    def items(self):
+        return list(self._items)
+
+
+class BrokerRegistry:
+    """
+    Registry broker dengan ID integer padat.
+
+    - ids[code]        -> ID integer (0..n-1)
+    - codes[id]        -> kode broker
+    - names[id]        -> nama tampilan
+    - categories[id]   -> bitmask kategori (array 'H')
+    - mask(bits)       -> bytearray 0/1 per ID (di-cache, ikut tumbuh saat intern)
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.codes = []
+        self.names = []
+        self.categories = array('H')
+        self._mask_cache = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.ids
+
+    def add(self, code, name=None, bits=0):
+        """Tambah / update broker, return ID-nya"""
+        bid = self.ids.get(code)
+        if bid is None:
+            bid = len(self.codes)
+            self.ids[code] = bid
+            self.codes.append(code)
+            self.names.append(name or f'Broker {code}')
+            self.categories.append(bits)
+        else:
+            if name:
+                self.names[bid] = name
+            self.categories[bid] |= bits
+        self._mask_cache.clear()
+        return bid
+
+    def intern(self, code):
+        """Return ID untuk kode broker, menambahkan kode baru jika belum ada"""
+        bid = self.ids.get(code)
+        if bid is None:
+            bid = self.add(code)
+        return bid
+
+    def name(self, code):
+        """Nama tampilan broker (default 'Broker XX' untuk kode tak dikenal)"""
+        bid = self.ids.get(code)
+        if bid is None:
+            return f'Broker {code}'
+        return self.names[bid]
+
+    def has_category(self, code, bits):
+        bid = self.ids.get(code)
+        return bid is not None and bool(self.categories[bid] & bits)
+
+    def mask(self, bits):
+        """
+        Boolean mask (bytearray 0/1 per ID) untuk broker yang punya salah satu bit.
+        Mask di-cache dan dibangun ulang otomatis jika registry bertambah.
+        """
+        cached = self._mask_cache.get(bits)
+        if cached is not None and len(cached) == len(self.codes):
+            return cached
+        cats = self.categories
+        m = bytearray(1 if cats[i] & bits else 0 for i in range(len(cats)))
+        self._mask_cache[bits] = m
+        return m
+
+    def mask_for_codes(self, codes):
+        """Mask 0/1 per ID untuk daftar kode bebas (watchlist custom)"""
+        selected = [self.intern(code) for code in codes]
+        m = bytearray(len(self.codes))
+        for bid in selected:
+            m[bid] = 1
+        return m
+
+    def category_label(self, code, whale_bits=CAT_WHALE):
+        """'whale' atau 'retail' - label kategori yang dipakai output JSON"""
+        return 'whale' if self.has_category(code, whale_bits) else 'retail'
+
+
+def load_registry(file_path=None, whale_codes=None):
+    """
+    Bangun registry dari broker_saham_indonesia.md + DISPLAY_NAMES.
+
+    whale_codes: set kode yang dianggap whale oleh pipeline (SHARK_BROKERS).
+    """
+    registry = BrokerRegistry()
+    file_path = file_path or DEFAULT_REGISTRY_FILE
+
+    if os.path.exists(file_path):
+        try:
+            for code, name, bits in parse_registry_markdown(file_path):
+                registry.add(code, DISPLAY_NAMES.get(code, name), bits)
+        except Exception as e:
+            print(f"Error reading broker registry {file_path}: {e}")
+
+    for code, name in DISPLAY_NAMES.items():
+        registry.add(code, name)
+
+    for code in sorted(whale_codes or ()):
+        registry.add(code, bits=CAT_WHALE)
+
+    return registry
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Checkpoint per saham untuk run generate yang panjang.
+
+main() menulis hasil setiap saham yang selesai ke <output>/checkpoint/:
+
+    <CODE>.json        window per periode (hasil filter_data_by_period) +
+                       signature run + fingerprint file input
+    flows/<CODE>.*     flows saham (untuk broker index saat assembly)
+
+Jika run mati di tengah, run berikutnya memakai checkpoint yang masih valid
+(signature sama dan file CSV input tidak berubah) dan hanya memproses saham
+sisanya; langkah assembly (file periode, broker index, manifest) diulang dari
+checkpoint. Setelah semua output selesai ditulis, folder checkpoint dihapus.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+from broker_flows import save_flows, load_flows, tmp_path_for
+from month_archive import split_member_path
+from records import json_default
+
+
+def inputs_fingerprint(csv_files):
+    """Hash (path, size, mtime) semua file input satu saham (hasil scan_stock_folder)"""
+    h = hashlib.sha1()
+    stat_cache = {}
+    for file_path, date_str, _ in csv_files:
+        # Member arsip: pakai stat file zip-nya
+        real_path, _ = split_member_path(file_path)
+        st = stat_cache.get(real_path)
+        if st is None:
+            try:
+                st = os.stat(real_path)
+                st = stat_cache[real_path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                st = stat_cache[real_path] = (-1, -1)
+        h.update(f"{file_path}|{date_str}|{st[0]}|{st[1]}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def run_signature(**params):
+    """Signature parameter run yang mempengaruhi hasil per saham"""
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class RunCheckpoint:
+    """Checkpoint per saham di satu folder"""
+
+    def __init__(self, checkpoint_dir, signature):
+        self.checkpoint_dir = checkpoint_dir
+        self.flows_dir = os.path.join(checkpoint_dir, 'flows')
+        self.signature = signature
+        self.resumed = 0
+
+    def _path(self, stock_code):
+        return os.path.join(self.checkpoint_dir, f'{stock_code}.json')
+
+    def load(self, stock_code, inputs, last_price=None):
+        """Record checkpoint yang masih valid (None jika tidak ada/usang)"""
+        path = self._path(stock_code)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (ValueError, OSError):
+            return None
+        if (record.get('signature') != self.signature or record.get('inputs') != inputs
+                or record.get('last_price') != last_price):
+            return None
+        flows = load_flows(stock_code, self.flows_dir)
+        if flows is None:
+            return None
+        record['_flows'] = flows
+        self.resumed += 1
+        return record
+
+    def save(self, stock_code, inputs, last_price, record, flows):
+        """Simpan hasil satu saham (flows dulu, record JSON terakhir = penanda selesai)"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        if flows is not None:
+            save_flows(flows, self.flows_dir)
+        data = dict(record, signature=self.signature, inputs=inputs, last_price=last_price)
+        path = self._path(stock_code)
+        tmp_path = tmp_path_for(path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=json_default))
+        os.replace(tmp_path, path)
+
+    def finish(self):
+        """Semua output sudah final: checkpoint tidak diperlukan lagi"""
+        if os.path.isdir(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir)
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Korelasi whale flow antar saham (co-movement) - ke mana uang institusi yang
+sama berputar.
+
+Dari flows cache (broker_flows.py) dibangun matriks saham x hari berisi net
+whale harian (buy - sell broker whale, miliar), atau net satu broker
+(--broker AK). Untuk setiap window (DEFAULT_WINDOWS hari bursa terakhir):
+
+- statistik cukup per window atas semua saham: jumlah hari aktif, Σx, Σx²
+  dan Σxy (N x N); saham dengan kurang dari MIN_ACTIVE_DAYS hari aktif atau
+  varians 0 di window dilewati
+- korelasi Pearson semua pasangan diturunkan dari statistik tersebut:
+  (Σxy/n - mean_x mean_y) / (std_x std_y)
+- co-movement pasangan teratas = % hari aktif bersama dengan arah sama
+  (sama-sama akumulasi / distribusi)
+
+Tahap ini membutuhkan numpy (pip install numpy); tanpa numpy korelasi
+dilewati dengan pesan [SKIP] dan output lama dibiarkan.
+
+Incremental (dipanggil di setiap write_run_outputs, termasuk siklus scheduler):
+- seri per saham disimpan di <output>/comovement/series.json bersama
+  signature file flows (ukuran + mtime); hanya flows yang berubah dibaca ulang
+- statistik per window disimpan (stats_<hari>.npz); hari baru yang masuk
+  window ditambahkan dan hari yang keluar dikurangkan (O(N^2) per hari),
+  saham yang berubah (export ulang) dihitung ulang per baris (k x N).
+  Statistik dihitung penuh lagi setelah window bergulir satu putaran penuh
+  supaya error pembulatan tidak menumpuk
+- tanpa perubahan sama sekali, output tidak ditulis ulang
+
+Output ringkas untuk dashboard (<output>/whale_correlation.json):
+
+    windows: {"20": {date_start, date_end, days, codes,
+                     pairs:   [[A, B, corr, comove, hari_aktif_bersama], ...]  korelasi tertinggi
+                     inverse: [...]                                           korelasi paling negatif
+                     neighbors: {kode: [[kode_lain, corr], ...]}}}            TOP_NEIGHBORS per saham
+
+CLI:
+    python comovement.py <output_dir> [--broker AK] [--windows 20,60,120] [--stock BBTN] [--top 20]
+"""
+
+import os
+import json
+import heapq
+import hashlib
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # wajib untuk tahap korelasi: tanpa numpy tahap ini dilewati
+    np = None
+
+DEFAULT_WINDOWS = (20, 60, 120)
+MIN_ACTIVE_DAYS = 5
+TOP_PAIRS = 50
+TOP_NEIGHBORS = 10
+
+STATE_DIR = 'comovement'
+OUTPUT_FILE = 'whale_correlation.json'
+STATE_VERSION = 2
+
+
+def output_filename(broker=None):
+    """whale_correlation.json atau broker_correlation_<KODE>.json"""
+    return OUTPUT_FILE if not broker else f'broker_correlation_{broker}.json'
+
+
+def _flows_signature(flows_dir, stock_code):
+    sig = []
+    for ext in ('.json', '.bin'):
+        try:
+            st = os.stat(os.path.join(flows_dir, stock_code + ext))
+            sig.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            sig.append('-')
+    return '|'.join(sig)
+
+
+def net_series(flows, column_mask):
+    """Net harian (buy - sell) kolom broker terpilih, urut flows['dates']"""
+    cols = flows['columns']
+    net = np.zeros(len(flows['dates']))
+    for b, selected in enumerate(column_mask):
+        if selected:
+            net = net + np.asarray(cols['buy'][b], dtype=float) - np.asarray(cols['sell'][b], dtype=float)
+    return [round(v, 4) for v in net.tolist()]
+
+
+class FlowMatrix:
+    """Seri net harian per saham (saham x hari) + signature sumber"""
+
+    def __init__(self, broker=None):
+        self.broker = broker
+        self.series = {}        # kode -> {tanggal: net}
+        self.sources = {}       # kode -> signature file flows
+        self.previous = {}      # kode berubah -> seri sebelum update (None jika saham baru)
+
+    def update(self, flows_dir, registry, group_mask):
+        """Baca ulang flows yang berubah. Returns: set kode yang berubah (termasuk yang hilang)"""
+        from broker_flows import load_flows, list_flows, broker_mask
+
+        codes = list_flows(flows_dir)
+        changed = {code for code in self.series if code not in codes}
+        for code in changed:
+            self.previous[code] = self.series.pop(code, None)
+            self.sources.pop(code, None)
+
+        for code in codes:
+            sig = _flows_signature(flows_dir, code)
+            if self.sources.get(code) == sig:
+                continue
+            flows = load_flows(code, flows_dir)
+            if flows is None:
+                continue
+            if self.broker:
+                column_mask = [1 if b == self.broker else 0 for b in flows['brokers']]
+            else:
+                column_mask = broker_mask(flows, group_mask, registry)
+            series = dict(zip(flows['dates'], net_series(flows, column_mask)))
+            if series != self.series.get(code):
+                changed.add(code)
+                self.previous[code] = self.series.get(code)
+            self.series[code] = series
+            self.sources[code] = sig
+        return changed
+
+    def dates(self):
+        return sorted({d for series in self.series.values() for d in series})
+
+    def revised(self, code, dates):
+        """True jika nilai saham di salah satu tanggal berbeda dari sebelum update (hari tambahan saja = False)"""
+        if code not in self.previous:
+            return False
+        old, new = self.previous[code], self.series.get(code)
+        if old is None or new is None:
+            return True
+        return any(old.get(d, 0.0) != new.get(d, 0.0) for d in dates)
+
+    def to_json(self):
+        return {'version': STATE_VERSION, 'broker': self.broker, 'sources': self.sources,
+                'series': {code: [list(s.keys()), list(s.values())] for code, s in self.series.items()}}
+
+    @classmethod
+    def from_json(cls, data, broker=None):
+        matrix = cls(broker)
+        if data.get('version') == STATE_VERSION and data.get('broker') == broker:
+            matrix.sources = data.get('sources', {})
+            matrix.series = {code: dict(zip(d, v)) for code, (d, v) in data.get('series', {}).items()}
+        return matrix
+
+
+def state_token(sources):
+    """Token isi seri (signature semua flows) - statistik window hanya valid untuk seri yang sama"""
+    return hashlib.sha1(json.dumps(sources, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def code_rows(flow_matrix, codes, dates):
+    """Matriks len(codes) x len(dates); hari tanpa data = 0"""
+    series = flow_matrix.series
+    return np.array([[series[code].get(d, 0.0) for d in dates] for code in codes],
+                    dtype=float).reshape(len(codes), len(dates))
+
+
+class WindowStats:
+    """
+    Statistik cukup satu window atas semua saham (urut codes): hari aktif,
+    Σx, Σx², Σxy untuk tanggal dates. rolled = jumlah hari yang sudah
+    digeser sejak dihitung penuh.
+    """
+
+    def __init__(self, codes, dates, active, total, squares, cross, rolled=0):
+        self.codes = codes
+        self.dates = dates
+        self.active = active
+        self.total = total
+        self.squares = squares
+        self.cross = cross
+        self.rolled = rolled
+
+    @classmethod
+    def compute(cls, flow_matrix, codes, dates):
+        x = code_rows(flow_matrix, codes, dates)
+        return cls(codes, dates, (x != 0).sum(axis=1), x.sum(axis=1), (x * x).sum(axis=1), x @ x.T)
+
+    def roll(self, flow_matrix, codes, dates, changed):
+        """
+        Statistik untuk codes/dates baru dari statistik ini. Saham yang
+        nilainya di tanggal window lama tidak berubah (termasuk yang hanya
+        bertambah hari): hari keluar dikurangkan, hari masuk ditambahkan.
+        Saham baru/direvisi: baris + kolom Σxy dihitung ulang terhadap semua
+        saham. Returns: (WindowStats, jumlah baris dihitung ulang)
+        """
+        old_index = {code: i for i, code in enumerate(self.codes)}
+        fresh_codes = {code for code in codes if code not in old_index
+                       or (code in changed and flow_matrix.revised(code, self.dates))}
+        keep = np.array([i for i, code in enumerate(codes) if code not in fresh_codes], dtype=int)
+        fresh = np.array([i for i, code in enumerate(codes) if code in fresh_codes], dtype=int)
+        kept_codes = [codes[i] for i in keep]
+        old_keep = np.array([old_index[code] for code in kept_codes], dtype=int)
+
+        active = self.active[old_keep].copy()
+        total = self.total[old_keep].copy()
+        squares = self.squares[old_keep].copy()
+        cross = self.cross[np.ix_(old_keep, old_keep)].copy()
+        window = set(dates)
+        previous = set(self.dates)
+        for sign, days in ((-1, [d for d in self.dates if d not in window]),
+                           (1, [d for d in dates if d not in previous])):
+            if not days:
+                continue
+            x = code_rows(flow_matrix, kept_codes, days)
+            active += sign * (x != 0).sum(axis=1)
+            total += sign * x.sum(axis=1)
+            squares += sign * (x * x).sum(axis=1)
+            cross += sign * (x @ x.T)
+
+        n = len(codes)
+        stats = WindowStats(codes, dates, np.zeros(n, dtype=active.dtype), np.zeros(n), np.zeros(n),
+                            np.zeros((n, n)), self.rolled + len(window - previous))
+        stats.active[keep] = active
+        stats.total[keep] = total
+        stats.squares[keep] = squares
+        stats.cross[np.ix_(keep, keep)] = cross
+        if len(fresh):
+            x = code_rows(flow_matrix, codes, dates)
+            xf = x[fresh]
+            stats.active[fresh] = (xf != 0).sum(axis=1)
+            stats.total[fresh] = xf.sum(axis=1)
+            stats.squares[fresh] = (xf * xf).sum(axis=1)
+            rows = xf @ x.T
+            stats.cross[fresh, :] = rows
+            stats.cross[:, fresh] = rows.T
+        return stats, len(fresh)
+
+    def correlation(self):
+        """(codes lolos filter, matriks korelasi float32)"""
+        n = len(self.dates)
+        if not n:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        mean = self.total / n
+        var = self.squares / n - mean * mean
+        idx = np.flatnonzero((self.active >= MIN_ACTIVE_DAYS) & (var > 1e-12))
+        std = np.sqrt(var[idx])
+        cov = self.cross[np.ix_(idx, idx)] / n - np.outer(mean[idx], mean[idx])
+        return [self.codes[i] for i in idx], (cov / np.outer(std, std)).astype(np.float32)
+
+
+def _stats_path(state_dir, days):
+    return os.path.join(state_dir, f'stats_{days}.npz')
+
+
+def load_stats(state_dir, days, token):
+    """Statistik window run sebelumnya (None jika tidak ada / dari seri lain)"""
+    path = _stats_path(state_dir, days)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if str(data['token']) != token:
+                return None
+            return WindowStats(data['codes'].tolist(), data['dates'].tolist(), data['active'], data['total'],
+                               data['squares'], data['cross'], int(data['rolled']))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_stats(state_dir, days, stats, token):
+    path = _stats_path(state_dir, days)
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(f, token=np.array(token), codes=np.array(stats.codes, dtype=str),
+                 dates=np.array(stats.dates, dtype=str), active=stats.active, total=stats.total,
+                 squares=stats.squares, cross=stats.cross, rolled=np.array(stats.rolled))
+    os.replace(path + '.tmp', path)
+    legacy = os.path.join(state_dir, f'corr_{days}.bin')  # matriks korelasi STATE_VERSION 1
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def comove(a, b):
+    """(% hari aktif bersama dengan arah sama, jumlah hari aktif bersama)"""
+    both = [(x > 0) == (y > 0) for x, y in zip(a, b) if x and y]
+    if not both:
+        return 0, 0
+    return round(sum(both) / len(both) * 100, 1), len(both)
+
+
+def top_pairs(matrix, count, largest=True):
+    """
+    Pasangan (corr, i, j), i < j, dengan korelasi tertinggi/terendah - sama
+    dengan heapq.nlargest/nsmallest atas semua pasangan, tapi hanya kandidat
+    di atas ambang partisi yang dibandingkan di Python
+    """
+    rows, cols = np.triu_indices(len(matrix), 1)
+    values = matrix[rows, cols]
+    if len(values) > count:
+        if largest:
+            cand = np.flatnonzero(values >= np.partition(values, -count)[-count])
+        else:
+            cand = np.flatnonzero(values <= np.partition(values, count - 1)[count - 1])
+    else:
+        cand = range(len(values))
+    pick = heapq.nlargest if largest else heapq.nsmallest
+    return pick(count, ((float(values[c]), int(rows[c]), int(cols[c])) for c in cand))
+
+
+def top_neighbors(matrix, count):
+    """Per baris: [(corr, j), ...] count korelasi tertinggi (j != i)"""
+    n = len(matrix)
+    k = min(count, n - 1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+    others = matrix.astype(float)
+    np.fill_diagonal(others, -np.inf)
+    kth = -np.partition(-others, k - 1, axis=1)[:, k - 1]
+    return [heapq.nlargest(count, ((float(others[i, j]), int(j)) for j in np.flatnonzero(others[i] >= kth[i])))
+            for i in range(n)]
+
+
+def window_correlation(flow_matrix, dates, days, state_dir, changed, token, previous_token):
+    """
+    Korelasi satu window. Returns: (entry output, meta state, jumlah baris dihitung)
+    Statistik digulir dari run sebelumnya; dihitung penuh jika belum ada,
+    dari seri lain, atau window sudah bergulir satu putaran penuh
+    """
+    window_dates = dates[-days:]
+    codes = sorted(flow_matrix.series)
+    stats = load_stats(state_dir, days, previous_token)
+    if stats is not None and stats.rolled + len(set(window_dates) - set(stats.dates)) < max(len(window_dates), 1):
+        stats, rows = stats.roll(flow_matrix, codes, window_dates, changed)
+    else:
+        stats, rows = WindowStats.compute(flow_matrix, codes, window_dates), len(codes)
+    save_stats(state_dir, days, stats, token)
+
+    codes, matrix = stats.correlation()
+    meta = {'date_start': window_dates[0] if window_dates else None,
+            'date_end': window_dates[-1] if window_dates else None, 'codes': codes}
+
+    def pair_row(corr, i, j):
+        pct, active = comove(*code_rows(flow_matrix, [codes[i], codes[j]], window_dates).tolist())
+        return [codes[i], codes[j], round(corr, 4), pct, active]
+
+    inverse = top_pairs(matrix, TOP_PAIRS, largest=False)
+    entry = {
+        'date_start': meta['date_start'],
+        'date_end': meta['date_end'],
+        'days': len(window_dates),
+        'codes': codes,
+        'pairs': [pair_row(*p) for p in top_pairs(matrix, TOP_PAIRS)],
+        'inverse': [pair_row(*p) for p in inverse if p[0] < 0],
+        'neighbors': {code: [[codes[j], round(corr, 4)] for corr, j in best]
+                      for code, best in zip(codes, top_neighbors(matrix, TOP_NEIGHBORS))}
+    }
+    return entry, meta, rows
+
+
+def update_correlation(output_path, flows_dir, registry, group_mask, windows=DEFAULT_WINDOWS, broker=None):
+    """
+    Update seri + korelasi per window secara incremental dan tulis output.
+    Returns: ringkasan {changed, recomputed: {window: baris}, path} atau None
+    jika tidak ada perubahan (atau numpy tidak terpasang)
+    """
+    if np is None:
+        print(f"[SKIP] {output_filename(broker)}: korelasi butuh numpy (pip install numpy), tahap dilewati")
+        return None
+
+    state_dir = os.path.join(output_path, STATE_DIR if not broker else f'{STATE_DIR}_{broker}')
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = os.path.join(state_dir, 'series.json')
+    state = {}
+    if os.path.exists(state_path):
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (ValueError, OSError):
+            state = {}
+
+    flow_matrix = FlowMatrix.from_json(state, broker)
+    previous_token = state_token(flow_matrix.sources)
+    changed = flow_matrix.update(flows_dir, registry, group_mask)
+    token = state_token(flow_matrix.sources)
+    out_path = os.path.join(output_path, output_filename(broker))
+    previous_windows = state.get('windows', {}) if state.get('version') == STATE_VERSION else {}
+    if not changed and os.path.exists(out_path) and set(previous_windows) == {str(w) for w in windows}:
+        return None
+
+    dates = flow_matrix.dates()
+    output_windows = {}
+    window_meta = {}
+    recomputed = {}
+    for days in windows:
+        entry, meta, rows = window_correlation(flow_matrix, dates, days, state_dir, changed,
+                                               token, previous_token)
+        output_windows[str(days)] = entry
+        window_meta[str(days)] = meta
+        recomputed[str(days)] = rows
+
+    output = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'metric': f'net {broker}' if broker else 'whale_net',
+        'engine': 'numpy',
+        'windows': output_windows
+    }
+    with open(out_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(output, separators=(',', ':'), ensure_ascii=False))
+    os.replace(out_path + '.tmp', out_path)
+
+    # State terakhir ditulis: statistik window hanya dipakai ulang jika tokennya
+    # cocok dengan seri di state ini, jadi run yang terputus menghitung penuh
+    data = flow_matrix.to_json()
+    data['windows'] = window_meta
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, separators=(',', ':')))
+    os.replace(state_path + '.tmp', state_path)
+    return {'changed': sorted(changed), 'recomputed': recomputed, 'path': out_path}
+
+
+def main():
+    import sys
+    from broker_registry import CAT_WHALE
+    from generate_data import get_registry
+
+    if len(sys.argv) < 2:
+        print("Usage: python comovement.py <output_dir> [--broker AK] [--windows 20,60,120] "
+              "[--stock BBTN] [--top 20]")
+        return
+
+    output_path = sys.argv[1]
+    args = sys.argv[2:]
+    broker = args[args.index('--broker') + 1].upper() if '--broker' in args else None
+    windows = tuple(int(w) for w in args[args.index('--windows') + 1].split(',')) if '--windows' in args \
+        else DEFAULT_WINDOWS
+    stock = args[args.index('--stock') + 1].upper() if '--stock' in args else None
+    top = int(args[args.index('--top') + 1]) if '--top' in args else 20
+
+    registry = get_registry()
+    result = update_correlation(output_path, os.path.join(output_path, 'flows'), registry,
+                                registry.mask(CAT_WHALE), windows, broker)
+    if np is None:
+        return
+    if result is not None:
+        print(f"[OK] {len(result['changed'])} stocks changed; rows recomputed per window: "
+              + ', '.join(f"{w}d={n}" for w, n in result['recomputed'].items()))
+
+    with open(os.path.join(output_path, output_filename(broker)), 'r', encoding='utf-8') as f:
+        output = json.load(f)
+    for days, entry in output['windows'].items():
+        print(f"\n[{days} hari] {entry['date_start']} .. {entry['date_end']} ({len(entry['codes'])} stocks)")
+        if stock:
+            for code, corr in entry['neighbors'].get(stock, [])[:top]:
+                print(f"  {stock} ~ {code:<7}{corr:>8.3f}")
+            continue
+        for a, b, corr, pct, active in entry['pairs'][:top]:
+            print(f"  {a:<7}{b:<7}{corr:>8.3f}   searah {pct:>5.1f}% dari {active} hari")
+
+
+if __name__ == '__main__':
+    main()
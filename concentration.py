@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Konsentrasi & partisipasi broker per saham per window.
+
+Dari per-broker daily flows (broker_flows.py), untuk window hari [start, end):
+
+- hhi_buy / hhi_sell  Herfindahl-Hirschman index nilai beli/jual (0-10000;
+                      > 2500 = sangat terkonsentrasi di sedikit broker)
+- top5_share          % turnover (beli + jual) dari 5 broker terbesar
+- active_brokers      jumlah broker yang bertransaksi di window
+- whale_share         % turnover dari broker whale (mask yang sama dengan summary)
+
+Prefix sum per broker dibangun sekali per saham (O(broker x hari)); setelah itu
+setiap window cukup O(broker) - semua periode (1week..6month, broker_data)
+memakai prefix yang sama, jadi biaya tidak ikut tumbuh dengan panjang histori.
+"""
+
+from itertools import accumulate
+
+TOP_N = 5
+
+
+def _prefix(col):
+    """Prefix sum dengan 0 di depan: total hari [a, b) = p[b] - p[a]"""
+    return [0.0] + list(accumulate(col))
+
+
+class ConcentrationIndex:
+    """Prefix sum buy/sell/aktivitas per broker untuk satu saham"""
+
+    def __init__(self, flows, column_mask):
+        self.n_days = len(flows['dates'])
+        self.whale = [bool(m) for m in column_mask]
+        self.buy = [_prefix(col) for col in flows['columns']['buy']]
+        self.sell = [_prefix(col) for col in flows['columns']['sell']]
+        self.active = [_prefix(1 if b > 0 or s > 0 else 0 for b, s in zip(buy_col, sell_col))
+                       for buy_col, sell_col in zip(flows['columns']['buy'], flows['columns']['sell'])]
+
+    def window(self, start, end=None):
+        """Metrik konsentrasi untuk hari [start, end)"""
+        end = self.n_days if end is None else end
+        buys = [p[end] - p[start] for p in self.buy]
+        sells = [p[end] - p[start] for p in self.sell]
+        total_buy = sum(buys)
+        total_sell = sum(sells)
+        turnover = [b + s for b, s in zip(buys, sells)]
+        total_turnover = total_buy + total_sell
+
+        def hhi(values, total):
+            if total <= 0:
+                return 0
+            return round(sum((v / total * 100) ** 2 for v in values if v > 0), 1)
+
+        def share(value):
+            return round(value / total_turnover * 100, 2) if total_turnover > 0 else 0
+
+        return {
+            'hhi_buy': hhi(buys, total_buy),
+            'hhi_sell': hhi(sells, total_sell),
+            'top5_share': share(sum(sorted(turnover, reverse=True)[:TOP_N])),
+            'active_brokers': sum(1 for p in self.active if p[end] - p[start] > 0),
+            'whale_share': share(sum(t for t, w in zip(turnover, self.whale) if w))
+        }
+
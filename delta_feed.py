@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Day-over-day delta feeds for period outputs.
+
+Setiap run harian biasanya hanya menambah satu baris `daily` per saham dan
+mengganti blok analytics, tapi dashboard mengunduh ulang file periode penuh.
+Generator sekarang menulis, untuk setiap file periode:
+
+- deltas/<file>          delta dari versi sebelumnya (base_hash -> new_hash):
+                         per saham hanya baris daily baru/berubah, tanggal
+                         awal window, dan objek analytics yang berubah
+- manifest.json          hash file + hash per saham + delta yang tersedia
+
+Client yang memegang versi dengan hash == base_hash cukup mengambil delta dan
+menerapkannya (apply_delta); client lain mengambil file penuh.
+
+Update satu saham (intraday) memakai patch_output: potongan teks saham itu
+saja yang diganti, file lain tidak di-parse ulang.
+"""
+
+import os
+import json
+import hashlib
+
+from records import json_default
+
+DELTA_FORMAT = 'period-delta/1'
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def stock_hash(stock):
+    """Hash isi satu saham (kanonik, tidak tergantung urutan key)"""
+    text = json.dumps(stock, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=json_default)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _stock_delta(old, new):
+    """Delta satu saham, None jika tidak berubah"""
+    delta = {}
+
+    replace = {k: v for k, v in new.items() if k != 'daily' and old.get(k) != v}
+    removed_keys = [k for k in old if k != 'daily' and k not in new]
+    if replace:
+        delta['replace'] = replace
+    if removed_keys:
+        delta['remove'] = removed_keys
+
+    new_daily = new.get('daily', [])
+    old_daily = old.get('daily', [])
+    old_rows = {d.get('date'): d for d in old_daily}
+    new_dates = {d.get('date') for d in new_daily}
+    start = new_daily[0].get('date') if new_daily else None
+    old_start = old_daily[0].get('date') if old_daily else None
+
+    upsert = [d for d in new_daily if old_rows.get(d.get('date')) != d]
+    dropped = [dt for dt in old_rows if start is not None and dt >= start and dt not in new_dates]
+
+    if upsert or dropped or start != old_start:
+        delta['daily_start'] = start
+        delta['daily_upsert'] = upsert
+        if dropped:
+            delta['daily_remove'] = dropped
+
+    return delta or None
+
+
+def build_delta(old_output, new_output, base_hash, new_hash):
+    """Delta document antara dua output periode"""
+    old_stocks = old_output.get('stocks', {})
+    new_stocks = new_output.get('stocks', {})
+
+    stocks = {}
+    added = {}
+    for code, stock in new_stocks.items():
+        if code not in old_stocks:
+            added[code] = stock
+            continue
+        d = _stock_delta(old_stocks[code], stock)
+        if d:
+            stocks[code] = d
+
+    return {
+        'format': DELTA_FORMAT,
+        'base_hash': base_hash,
+        'new_hash': new_hash,
+        'meta': {k: v for k, v in new_output.items() if k != 'stocks'},
+        'stocks': stocks,
+        'added': added,
+        'removed': sorted(code for code in old_stocks if code not in new_stocks)
+    }
+
+
+def apply_delta(old_output, delta):
+    """Terapkan delta ke output lama -> output baru (dict baru)"""
+    if delta.get('format') != DELTA_FORMAT:
+        raise ValueError(f"Unsupported delta format: {delta.get('format')}")
+
+    stocks = dict(old_output.get('stocks', {}))
+    for code in delta.get('removed', []):
+        stocks.pop(code, None)
+
+    for code, d in delta.get('stocks', {}).items():
+        stock = dict(stocks[code])
+        for key in d.get('remove', []):
+            stock.pop(key, None)
+        stock.update(d.get('replace', {}))
+
+        if 'daily_start' in d:
+            start = d['daily_start']
+            rows = {r.get('date'): r for r in stock.get('daily', [])
+                    if start is not None and r.get('date') >= start}
+            for dt in d.get('daily_remove', []):
+                rows.pop(dt, None)
+            for r in d.get('daily_upsert', []):
+                rows[r.get('date')] = r
+            stock['daily'] = [rows[dt] for dt in sorted(rows)]
+        stocks[code] = stock
+
+    stocks.update(delta.get('added', {}))
+
+    new_output = dict(delta.get('meta', {}))
+    new_output['stocks'] = {code: stocks[code] for code in sorted(stocks)}
+    return new_output
+
+
+def load_manifest(output_path):
+    path = os.path.join(output_path, 'manifest.json')
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            pass
+    return {'files': {}}
+
+
+def save_manifest(output_path, manifest):
+    path = os.path.join(output_path, 'manifest.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_output(filepath):
+    """File periode yang sudah ada -> (output, hash, text), None semua jika tidak ada/rusak"""
+    if not os.path.exists(filepath):
+        return None, None, None
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return json.loads(text), sha256_text(text), text
+    except (ValueError, OSError):
+        return None, None, None
+
+
+STOCKS_OPEN = '\n  "stocks": {\n'
+STOCKS_OPEN_BYTES = STOCKS_OPEN.encode('utf-8')
+
+
+def _stock_fragments(text):
+    """
+    Potongan teks per saham dari file periode (format indent=2).
+    Key saham ada di indent 4 dan isi saham selalu di indent >= 6; string JSON
+    tidak pernah berisi newline mentah, jadi '\\n    "' hanya muncul di awal
+    key saham.
+    """
+    start = text.find(STOCKS_OPEN)
+    end = text.rfind('\n  }\n}')
+    if start < 0 or end < start:
+        return {}
+    starts = []
+    pos = text.find('\n    "', start + len(STOCKS_OPEN) - 1)
+    while 0 <= pos < end:
+        starts.append(pos + 1)
+        pos = text.find('\n    "', pos + 1)
+    fragments = {}
+    for k, a in enumerate(starts):
+        b = starts[k + 1] - 2 if k + 1 < len(starts) else end
+        fragment = text[a:b]
+        code = json.loads(fragment[4:fragment.index('": ') + 1])
+        fragments[code] = fragment
+    return fragments
+
+
+def encode_output(output, old_output=None, old_text=None, encoded=None):
+    """
+    Sama persis dengan json.dumps(output, indent=2, ensure_ascii=False)
+    (baris daily records.Row di-encode sebagai dict).
+
+    Encoder indent=2 berjalan di Python murni (lambat untuk file ratusan KB)
+    dan menahan semua potongan kecilnya sampai join, jadi file dibangun per
+    saham dengan satu join (tanpa salinan antara). Saham yang objeknya identik
+    (is) dengan saham di old_output memakai ulang potongan teks lamanya, jadi
+    update satu saham (intraday) hanya meng-encode saham itu saja. encoded: cache {id(stock): teks} untuk objek saham yang
+    sama di beberapa file (mis. window 6month dan broker_data.json).
+    """
+    stocks = output.get('stocks')
+    keys = list(output)
+    if not stocks or keys[-1] != 'stocks' or len(keys) < 2:
+        return json.dumps(output, indent=2, ensure_ascii=False, default=json_default)
+
+    old_stocks = old_output.get('stocks', {}) if old_text is not None else {}
+    cached = None
+    header = json.dumps({k: output[k] for k in keys[:-1]}, indent=2, ensure_ascii=False)
+    parts = [header[:-2] + ',' + STOCKS_OPEN]
+    for code, stock in stocks.items():
+        if len(parts) > 1:
+            parts.append(',\n')
+        fragment = None
+        if old_stocks.get(code) is stock:
+            if cached is None:
+                cached = _stock_fragments(old_text)
+            fragment = cached.get(code)
+        if fragment is not None:
+            parts.append(fragment)
+            continue
+        body = encoded.get(id(stock)) if encoded is not None else None
+        if body is None:
+            body = json.dumps(stock, indent=2, ensure_ascii=False, default=json_default).replace('\n', '\n    ')
+            if encoded is not None:
+                encoded[id(stock)] = body
+        parts.append(f'    {json.dumps(code, ensure_ascii=False)}: ')
+        parts.append(body)
+    parts.append('\n  }\n}')
+    return ''.join(parts)
+
+
+def write_output_with_delta(output_path, filename, output, manifest, previous=None, encoded=None):
+    """
+    Tulis file periode + delta dari versi sebelumnya, update entry manifest.
+    previous: (old_output, base_hash, old_text) jika file lama sudah dibaca (read_output)
+    encoded : cache teks saham bersama antar file (lihat encode_output)
+    Returns: manifest entry {hash, stocks, changed, delta}
+    """
+    filepath = os.path.join(output_path, filename)
+    old_output, base_hash, old_text = previous if previous is not None else read_output(filepath)
+
+    text = encode_output(output, old_output, old_text, encoded)
+    new_hash = sha256_text(text)
+
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, filepath)
+
+    old_entry = manifest['files'].get(filename, {})
+    old_hashes = old_entry.get('stocks', {})
+
+    # Hash saham yang objeknya identik dengan file lama dipakai ulang dari manifest
+    reuse = old_output is not None and old_entry.get('hash') == base_hash
+    old_stocks = old_output.get('stocks', {}) if old_output is not None else {}
+    stock_hashes = {}
+    for code, s in output.get('stocks', {}).items():
+        if reuse and old_stocks.get(code) is s and code in old_hashes:
+            stock_hashes[code] = old_hashes[code]
+        else:
+            stock_hashes[code] = stock_hash(s)
+    changed = sorted(c for c, h in stock_hashes.items() if old_hashes.get(c) != h)
+    changed += sorted(c for c in old_hashes if c not in stock_hashes)
+
+    entry = {'hash': new_hash, 'stocks': stock_hashes, 'changed': changed}
+    _finish_entry(output_path, filename, entry, old_entry, base_hash,
+                  lambda: build_delta(old_output, output, base_hash, new_hash) if old_output is not None else None)
+    manifest['files'][filename] = entry
+    return entry
+
+
+def _finish_entry(output_path, filename, entry, old_entry, base_hash, make_delta):
+    """Tulis deltas/<file> (make_delta() -> dokumen delta atau None) dan isi entry['delta']"""
+    new_hash = entry['hash']
+    delta = make_delta() if base_hash is not None and base_hash != new_hash else None
+    if delta is not None:
+        deltas_dir = os.path.join(output_path, 'deltas')
+        os.makedirs(deltas_dir, exist_ok=True)
+        delta_path = os.path.join(deltas_dir, filename)
+        tmp_path = delta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(delta, separators=(',', ':'), ensure_ascii=False, default=json_default))
+        os.replace(tmp_path, delta_path)
+        entry['delta'] = {
+            'base_hash': base_hash,
+            'file': f'deltas/{filename}',
+            'size': os.path.getsize(delta_path)
+        }
+    elif old_entry.get('delta') and base_hash == new_hash:
+        # Output tidak berubah: delta lama masih valid untuk client yang tertinggal satu versi
+        entry['delta'] = old_entry['delta']
+
+
+def patch_output(output_path, filename, stock_code, stock, manifest, meta_update=None, encoded=None):
+    """
+    Ganti satu saham di file periode tanpa parse/encode file penuh (intraday).
+    Teks saham lain dipakai apa adanya (byte file lama), hanya saham ini
+    yang di-parse dan di-encode; delta berisi saham ini saja.
+    stock None = saham dihapus. meta_update: key level file (mis. generated_at).
+    encoded: cache teks saham bersama antar file (lihat encode_output)
+    Returns: (entry, meta) atau None jika file tidak ada, manifest tidak cocok
+    dengan isi file atau format tidak dikenali (pakai write_output_with_delta)
+    """
+    filepath = os.path.join(output_path, filename)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'rb') as f:
+        old_data = f.read()
+    base_hash = hashlib.sha256(old_data).hexdigest()
+    old_entry = manifest['files'].get(filename, {})
+    start = old_data.find(STOCKS_OPEN_BYTES)
+    end = old_data.rfind(b'\n  }\n}')
+    if old_entry.get('hash') != base_hash or 'stocks' not in old_entry or start < 0 or end < start:
+        return None
+
+    try:
+        meta = json.loads(old_data[:start].rstrip(b',') + b'\n}')
+    except ValueError:
+        return None
+    meta.update(meta_update or {})
+    header = json.dumps(meta, indent=2, ensure_ascii=False)[:-2].encode('utf-8') + b','
+
+    # Potongan saham ini: dari key di indent 4 sampai key saham berikutnya
+    key = b'\n    ' + json.dumps(stock_code, ensure_ascii=False).encode('utf-8') + b': '
+    pos = old_data.find(key, start)
+    old_stock = None
+    if 0 <= pos < end:
+        frag_start = pos + 1
+        next_key = old_data.find(b'\n    "', frag_start)
+        frag_end = next_key - 1 if 0 <= next_key < end else end
+        old_stock = json.loads(old_data[frag_start + len(key) - 1:frag_end])
+
+    if stock is not None:
+        body = encoded.get(id(stock)) if encoded is not None else None
+        if body is None:
+            body = json.dumps(stock, indent=2, ensure_ascii=False, default=json_default).replace('\n', '\n    ')
+            if encoded is not None:
+                encoded[id(stock)] = body
+        fragment = f'    {json.dumps(stock_code, ensure_ascii=False)}: {body}'
+
+    if old_stock is not None and stock is not None:
+        view = memoryview(old_data)
+        data = b''.join((header, view[start:frag_start], fragment.encode('utf-8'), view[frag_end:]))
+    else:
+        # Saham baru / dihapus: susun ulang dari potongan semua saham (urut kode)
+        fragments = _stock_fragments(old_data.decode('utf-8'))
+        fragments.pop(stock_code, None)
+        if stock is not None:
+            fragments[stock_code] = fragment
+        if fragments:
+            text = header.decode('utf-8') + STOCKS_OPEN + ',\n'.join(
+                fragments[c] for c in sorted(fragments)) + '\n  }\n}'
+        else:
+            text = json.dumps(dict(meta, stocks={}), indent=2, ensure_ascii=False)
+        data = text.encode('utf-8')
+    new_hash = hashlib.sha256(data).hexdigest()
+
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, filepath)
+
+    stock_hashes = dict(old_entry['stocks'])
+    if stock is None:
+        stock_hashes.pop(stock_code, None)
+    else:
+        stock_hashes[stock_code] = stock_hash(stock)
+    stock_hashes = {c: stock_hashes[c] for c in sorted(stock_hashes)}
+    changed = [stock_code] if old_entry['stocks'].get(stock_code) != stock_hashes.get(stock_code) else []
+
+    entry = {'hash': new_hash, 'stocks': stock_hashes, 'changed': changed}
+    old_part = {'stocks': {stock_code: old_stock} if old_stock is not None else {}}
+    new_part = dict(meta, stocks={stock_code: stock} if stock is not None else {})
+    _finish_entry(output_path, filename, entry, old_entry, base_hash,
+                  lambda: build_delta(old_part, new_part, base_hash, new_hash))
+    manifest['files'][filename] = entry
+    return entry, meta
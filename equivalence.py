@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Harness equivalence + regresi performa untuk engine analytics.
+
+Setiap jalur yang lebih cepat (ingestion, cache, engine alternatif) harus
+menghasilkan angka yang sama dengan jalur sekarang: process_stock_folder ->
+filter_data_by_period (semua calculate_*). Harness ini menjalankan engine
+referensi dan engine kandidat berdampingan pada tree Analisis/ asli dan/atau
+tree sintetis, lalu:
+
+- membandingkan setiap field output (data penuh + window 7/30/90/180 hari)
+  dengan toleransi absolut per field
+- mencatat waktu (min dari --repeat run) dan peak memori (tracemalloc)
+  kedua engine
+- membandingkan dengan baseline tersimpan (--baseline DIR): output engine
+  referensi vs output baseline (angka "hari ini") dan waktu/memori vs
+  baseline (maks. --max-slowdown / --max-memory lebih besar)
+
+Exit code 1 jika ada selisih di atas toleransi atau regresi performa.
+
+Engine (kontrak: fn(stock_code, base_path, window_days) -> {'full', 'windows'}):
+    current   process_stock_folder + filter_data_by_period (referensi)
+    flows     flows disimpan ke cache (.json/.bin) lalu dibaca ulang ->
+              build_stock_data (jalur intraday / work queue)
+    cached    window lewat AnalyticsCache tier disk (JSON round-trip)
+    modul:fungsi   engine eksternal dengan kontrak yang sama
+
+Toleransi: default exact (0) untuk semua field - output sudah dibulatkan,
+engine yang setara harus identik. Engine yang mengubah urutan penjumlahan
+float bisa diberi --tolerance FIELD=ABS (nama field terakhir di path,
+mis. whale_buyavg=0.01) atau --tolerance '*=0.01' untuk semua angka.
+
+Tree sintetis (--synthetic STOCKS:DAYS[:BROKERS]) dibuat deterministik
+(--seed) dengan format CSV kumulatif yang sama dengan export broker.
+
+CLI:
+    python equivalence.py [--input Analisis] [--stocks BBTN,ANTM] [--synthetic 20:250:40]
+                          [--candidate flows] [--reference current] [--repeat 3]
+                          [--tolerance FIELD=ABS] [--baseline DIR] [--save-baseline]
+                          [--max-slowdown 0.25] [--max-memory 0.25] [--no-real]
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import io
+import contextlib
+import random
+import shutil
+import tempfile
+import importlib
+import tracemalloc
+from datetime import date, timedelta
+
+import generate_data
+from analytics_cache import AnalyticsCache
+from broker_flows import load_flows
+from records import json_default
+
+WINDOW_DAYS = sorted({p['days'] for p in generate_data.PERIODS} | {180})
+
+DEFAULT_TOLERANCES = {}     # field -> selisih absolut maksimum ('*' = semua angka)
+DEFAULT_MAX_SLOWDOWN = 0.25
+DEFAULT_MAX_MEMORY = 0.25
+MAX_EXAMPLES = 5
+DEFAULT_REPEAT = 3          # waktu = min dari beberapa run (kurangi noise)
+
+MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+
+
+# ===== ENGINES =====
+def stock_snapshot(stock_data, window_days, cache=None):
+    """Data penuh (tanpa field internal '_...') + window per jumlah hari"""
+    n = len(stock_data['daily'])
+    return {
+        'full': {k: v for k, v in stock_data.items() if not k.startswith('_')},
+        'windows': {str(days): generate_data.filter_data_by_period(stock_data, min(days, n), cache=cache)
+                    for days in window_days}
+    }
+
+
+def engine_current(stock_code, base_path, window_days):
+    stock_data = generate_data.process_stock_folder(stock_code, base_path)
+    if not stock_data:
+        return None
+    return stock_snapshot(stock_data, window_days)
+
+
+def engine_flows(stock_code, base_path, window_days):
+    flows_dir = tempfile.mkdtemp(prefix='eq_flows_')
+    try:
+        if not generate_data.process_stock_folder(stock_code, base_path, flows_dir):
+            return None
+        flows = load_flows(stock_code, flows_dir)
+        return stock_snapshot(generate_data.build_stock_data(stock_code, flows), window_days)
+    finally:
+        shutil.rmtree(flows_dir, ignore_errors=True)
+
+
+def engine_cached(stock_code, base_path, window_days):
+    cache_dir = tempfile.mkdtemp(prefix='eq_cache_')
+    try:
+        stock_data = generate_data.process_stock_folder(stock_code, base_path)
+        if not stock_data:
+            return None
+        stock_snapshot(stock_data, window_days, AnalyticsCache(cache_dir=cache_dir))
+        # Cache baru di folder yang sama: semua window dibaca dari disk
+        return stock_snapshot(stock_data, window_days, AnalyticsCache(cache_dir=cache_dir))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+ENGINES = {
+    'current': engine_current,
+    'flows': engine_flows,
+    'cached': engine_cached,
+}
+
+
+def resolve_engine(spec):
+    """Nama engine bawaan atau 'modul:fungsi'"""
+    if spec in ENGINES:
+        return ENGINES[spec]
+    if ':' not in spec:
+        raise ValueError(f"Unknown engine '{spec}' (use {', '.join(ENGINES)} or module:function)")
+    module_name, func_name = spec.split(':', 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def run_engine(engine, base_path, stocks, window_days=WINDOW_DAYS, repeat=1, memory=True):
+    """
+    Jalankan engine untuk semua saham.
+    Returns: (outputs {saham: snapshot JSON-normal}, {seconds, peak_mb})
+    """
+    outputs = None
+    best = None
+    quiet = contextlib.redirect_stdout(io.StringIO())  # log per saham dari process_stock_folder
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        with quiet:
+            results = {code: engine(code, base_path, window_days) for code in stocks}
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        if outputs is None:
+            outputs = normalize(results)
+
+    metrics = {'seconds': round(best, 4)}
+    if memory:
+        tracemalloc.start()
+        with quiet:
+            for code in stocks:
+                engine(code, base_path, window_days)
+        metrics['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return outputs, metrics
+
+
+def normalize(value):
+    """Bentuk JSON murni (Row -> dict, tuple -> list) supaya bisa dibandingkan/disimpan"""
+    return json.loads(json.dumps(value, default=json_default))
+
+
+# ===== DIFF =====
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def diff_outputs(expected, actual, tolerances=None):
+    """
+    Bandingkan dua struktur output secara rekursif.
+    Returns: {field: {count, max_diff, examples: [(path, expected, actual)]}}
+    """
+    tolerances = DEFAULT_TOLERANCES if tolerances is None else tolerances
+    default_tol = tolerances.get('*', 0)
+    report = {}
+
+    def record(field, path, a, b, delta=None):
+        entry = report.setdefault(field, {'count': 0, 'max_diff': None, 'examples': []})
+        entry['count'] += 1
+        if delta is not None:
+            entry['max_diff'] = delta if entry['max_diff'] is None else max(entry['max_diff'], delta)
+        if len(entry['examples']) < MAX_EXAMPLES:
+            entry['examples'].append(('/'.join(path), a, b))
+
+    def walk(a, b, path, field):
+        if isinstance(a, dict) and isinstance(b, dict):
+            for key in a.keys() | b.keys():
+                if key not in a or key not in b:
+                    record(key, path + [key], a.get(key, '<missing>'), b.get(key, '<missing>'))
+                else:
+                    walk(a[key], b[key], path + [key], key)
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                record(field, path + ['len'], len(a), len(b))
+            for i, (x, y) in enumerate(zip(a, b)):
+                walk(x, y, path + [str(i)], field)
+        elif _is_number(a) and _is_number(b):
+            delta = abs(a - b)
+            if delta > tolerances.get(field, default_tol):
+                record(field, path, a, b, delta)
+        elif a != b:
+            record(field, path, a, b)
+
+    walk(expected, actual, [], '')
+    return report
+
+
+def print_diff(title, report):
+    if not report:
+        print(f"  [OK] {title}: identical within tolerance")
+        return
+    total = sum(entry['count'] for entry in report.values())
+    print(f"  [FAIL] {title}: {total} differences in {len(report)} fields")
+    for field, entry in sorted(report.items(), key=lambda item: -item[1]['count']):
+        max_diff = f", max diff {entry['max_diff']:g}" if entry['max_diff'] is not None else ""
+        print(f"    {field or '<root>'}: {entry['count']}{max_diff}")
+        for path, a, b in entry['examples'][:2]:
+            print(f"      {path}: {a!r} != {b!r}")
+
+
+# ===== SYNTHETIC TREE =====
+def trading_days(start, count):
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def synthetic_brokers(count):
+    """count kode broker registry, bergantian whale / retail (CAT_WHALE)"""
+    registry = generate_data.get_registry()
+    whale_mask = registry.mask(generate_data.CAT_WHALE)
+    groups = ([], [])
+    for i, code in enumerate(registry.codes):
+        if code and len(code) <= 3:
+            groups[0 if whale_mask[i] else 1].append(code)
+    whales, retail = groups
+    alternating = [code for pair in zip(whales, retail) for code in pair]
+    rest = whales[len(retail):] + retail[len(whales):]
+    return (alternating + rest)[:count]
+
+
+def make_synthetic_tree(root, stocks=20, days=250, brokers=40, seed=1):
+    """
+    Tree Analisis sintetis: <root>/<CODE>/<MONYY>/<DD>.csv kumulatif sejak
+    hari pertama (format export broker). Broker diambil bergantian dari
+    whale dan retail registry, jadi kedua grup selalu punya flow (brokers >= 2).
+    Returns: daftar kode saham
+    """
+    rng = random.Random(seed)
+    broker_codes = synthetic_brokers(brokers)
+    dates = trading_days(date(2025, 1, 2), days)
+    stock_codes = [f"S{i:03d}" for i in range(stocks)]
+
+    for stock_code in stock_codes:
+        price = rng.uniform(100, 5000)
+        cum = {b: [0, 0.0, 0, 0.0] for b in broker_codes}   # buy_lot, buy_val, sell_lot, sell_val
+        for day in dates:
+            price = max(50.0, price * (1 + rng.gauss(0, 0.02)))
+            for b in broker_codes:
+                if rng.random() < 0.6:
+                    lot = rng.randint(1, 5000)
+                    cum[b][0] += lot
+                    cum[b][1] += lot * 100 * price * rng.uniform(0.99, 1.01)
+                if rng.random() < 0.6:
+                    lot = rng.randint(1, 5000)
+                    cum[b][2] += lot
+                    cum[b][3] += lot * 100 * price * rng.uniform(0.99, 1.01)
+
+            folder = os.path.join(root, stock_code, f"{MONTHS[day.month - 1]}{day.year % 100:02d}")
+            os.makedirs(folder, exist_ok=True)
+            lines = [
+                f"{stock_code}ToBrokerCode\t{stock_code}\tStart\t{dates[0]:%Y-%m-%d}\tEnd\t{day:%Y-%m-%d}\tMode\tValue",
+                "Investor\tAll\tBoard\tRG",
+                "BY\tBLot\tBVal\tBAvg\t#\tSL\tSLot\tSVal\tSAvg"
+            ]
+            for i, b in enumerate(broker_codes, 1):
+                buy_lot, buy_val, sell_lot, sell_val = cum[b]
+                buy_avg = buy_val / (buy_lot * 100) if buy_lot else 0
+                sell_avg = sell_val / (sell_lot * 100) if sell_lot else 0
+                lines.append(f"{b}\t{buy_lot:,}\t{round(buy_val):,}\t{buy_avg:.2f}\t{i}\t{b}\t"
+                             f"{sell_lot:,}\t{round(sell_val):,}\t{sell_avg:.2f}")
+            with open(os.path.join(folder, f"{day.day}.csv"), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+    return stock_codes
+
+
+# ===== BASELINE =====
+def load_baseline(baseline_dir):
+    path = os.path.join(baseline_dir, 'metrics.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_baseline_outputs(baseline_dir, tree):
+    path = os.path.join(baseline_dir, f'outputs_{tree}.json.gz')
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(baseline_dir, metrics, outputs_by_tree):
+    """Simpan/replace baseline tree yang dijalankan (tree lain di baseline dipertahankan)"""
+    os.makedirs(baseline_dir, exist_ok=True)
+    metrics = dict(load_baseline(baseline_dir), **metrics)
+    for tree, outputs in outputs_by_tree.items():
+        with gzip.open(os.path.join(baseline_dir, f'outputs_{tree}.json.gz'), 'wt', encoding='utf-8') as f:
+            json.dump(outputs, f, separators=(',', ':'), sort_keys=True)
+    with open(os.path.join(baseline_dir, 'metrics.json'), 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+
+
+def check_performance(tree, engine_name, metrics, baseline, max_slowdown, max_memory):
+    """Daftar pesan regresi waktu/memori terhadap baseline"""
+    old = baseline.get(tree, {}).get(engine_name)
+    if not old:
+        return []
+    failures = []
+    if old.get('seconds') and metrics['seconds'] > old['seconds'] * (1 + max_slowdown):
+        failures.append(f"{tree}/{engine_name}: {metrics['seconds']:.3f}s vs baseline {old['seconds']:.3f}s "
+                        f"(> +{max_slowdown:.0%})")
+    if old.get('peak_mb') and metrics.get('peak_mb') and metrics['peak_mb'] > old['peak_mb'] * (1 + max_memory):
+        failures.append(f"{tree}/{engine_name}: peak {metrics['peak_mb']:.1f} MB vs baseline "
+                        f"{old['peak_mb']:.1f} MB (> +{max_memory:.0%})")
+    return failures
+
+
+# ===== MAIN =====
+def compare_tree(tree, base_path, stocks, reference, candidate, tolerances, repeat, memory):
+    """Jalankan kedua engine pada satu tree. Returns: (ref_outputs, {engine: metrics}, diff report)"""
+    print(f"\n[*] {tree}: {len(stocks)} stocks from {base_path}")
+    ref_outputs, ref_metrics = run_engine(resolve_engine(reference), base_path, stocks, repeat=repeat, memory=memory)
+    cand_outputs, cand_metrics = run_engine(resolve_engine(candidate), base_path, stocks, repeat=repeat, memory=memory)
+    for name, metrics in ((reference, ref_metrics), (candidate, cand_metrics)):
+        peak = f", peak {metrics['peak_mb']:.1f} MB" if 'peak_mb' in metrics else ""
+        print(f"  {name:<10} {metrics['seconds']:.3f}s{peak}")
+    report = diff_outputs(ref_outputs, cand_outputs, tolerances)
+    print_diff(f"{candidate} vs {reference}", report)
+    return ref_outputs, {reference: ref_metrics, candidate: cand_metrics}, report
+
+
+def parse_tolerances(values):
+    tolerances = dict(DEFAULT_TOLERANCES)
+    for value in values:
+        field, _, tol = value.partition('=')
+        tolerances[field.strip()] = float(tol)
+    return tolerances
+
+
+def main():
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(__doc__)
+        return 0
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    base_path = option('--input', 'Analisis')
+    reference = option('--reference', 'current')
+    candidate = option('--candidate', 'flows')
+    repeat = int(option('--repeat', DEFAULT_REPEAT))
+    baseline_dir = option('--baseline')
+    max_slowdown = float(option('--max-slowdown', DEFAULT_MAX_SLOWDOWN))
+    max_memory = float(option('--max-memory', DEFAULT_MAX_MEMORY))
+    seed = int(option('--seed', 1))
+    memory = '--no-memory' not in args
+    tolerances = parse_tolerances([args[i + 1] for i, a in enumerate(args) if a == '--tolerance'])
+
+    try:
+        resolve_engine(reference)
+        resolve_engine(candidate)
+    except (ValueError, ImportError, AttributeError) as e:
+        print(f"Error: {e}")
+        return 2
+
+    trees = []
+    if '--no-real' not in args:
+        if not os.path.isdir(base_path):
+            print(f"Error: input not found: {base_path}")
+            return 2
+        stocks = option('--stocks')
+        stocks = [s.strip().upper() for s in stocks.split(',')] if stocks else \
+            sorted(d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d)))
+        trees.append((os.path.basename(os.path.normpath(base_path)).lower(), base_path, stocks))
+
+    synthetic_root = None
+    spec = option('--synthetic')
+    if spec:
+        parts = [int(x) for x in spec.split(':')]
+        n_stocks, n_days = parts[0], parts[1]
+        n_brokers = parts[2] if len(parts) > 2 else 40
+        if n_brokers < 2:
+            print("Error: --synthetic needs at least 2 brokers (one whale, one retail)")
+            return 1
+        synthetic_root = tempfile.mkdtemp(prefix='eq_synthetic_')
+        print(f"[*] Building synthetic tree {n_stocks} stocks x {n_days} days x {n_brokers} brokers (seed {seed})")
+        codes = make_synthetic_tree(synthetic_root, n_stocks, n_days, n_brokers, seed)
+        # v2: broker whale/retail bergantian (baseline tree sintetis lama tidak dipakai)
+        trees.append((f"synthetic-v2-{n_stocks}x{n_days}x{n_brokers}-s{seed}", synthetic_root, codes))
+
+    if not trees:
+        print("Error: nothing to compare (use the real tree and/or --synthetic)")
+        return 2
+
+    baseline = load_baseline(baseline_dir) if baseline_dir else {}
+    failures = []
+    metrics_by_tree = {}
+    outputs_by_tree = {}
+    try:
+        for tree, path, stocks in trees:
+            ref_outputs, metrics, report = compare_tree(tree, path, stocks, reference, candidate,
+                                                        tolerances, repeat, memory)
+            if report:
+                failures.append(f"{tree}: {candidate} differs from {reference}")
+            metrics_by_tree[tree] = metrics
+            outputs_by_tree[tree] = ref_outputs
+
+            if baseline_dir and '--save-baseline' not in args:
+                old_outputs = load_baseline_outputs(baseline_dir, tree)
+                if old_outputs is None:
+                    print(f"  [*] No baseline outputs for {tree}")
+                else:
+                    old_report = diff_outputs(old_outputs, ref_outputs, tolerances)
+                    print_diff(f"{reference} vs baseline", old_report)
+                    if old_report:
+                        failures.append(f"{tree}: {reference} output differs from baseline")
+                for name, engine_metrics in metrics.items():
+                    failures += check_performance(tree, name, engine_metrics, baseline, max_slowdown, max_memory)
+    finally:
+        if synthetic_root:
+            shutil.rmtree(synthetic_root, ignore_errors=True)
+
+    if baseline_dir and '--save-baseline' in args:
+        save_baseline(baseline_dir, metrics_by_tree, outputs_by_tree)
+        print(f"\n[OK] Baseline saved to {baseline_dir}")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"[FAIL] {failure}")
+        return 1
+    print("[OK] All checks passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
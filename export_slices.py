@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Dimensi export broker: investor, board, mode.
+
+Header setiap CSV membawa variant export-nya:
+
+    ANTMToBrokerCode  ANTM  Start 2026-02-18  End 2026-02-18  Mode  Value
+    Investor  All  Board  RG
+
+Satu hari bisa punya beberapa export (mis. 18.csv = All/All Trade,
+18_foreign.csv = Foreign/RG). Semua file dibaca sekali (satu pass parse),
+variant diambil dari header, lalu slice dipilih per run:
+
+    all                          semua file; jika satu tanggal punya beberapa
+                                 variant, dipilih yang paling "All"
+    board=RG                     hanya export board RG
+    investor=Foreign,board=RG    foreign di pasar reguler
+
+Variant adalah dimensi flows: dari pass parse yang sama dibuat flows per
+variant (differencing per variant) dan disimpan di flows cache:
+
+    <flows>/variants/<variant>/<CODE>.json|.bin   mis. variants/all.rg.value/
+    <flows>/variants/<CODE>.json                  fingerprint input + daftar variant
+
+Slice dipilih saat analytics (slice_flows): flows variant yang cocok digabung
+per tanggal, jadi ganti slice tidak perlu parse ulang selama input sama.
+Output slice non-default ditulis ke file sendiri (<periode>.<slice_key>.json,
+mis. 1week.board-rg.json); file periode default dan broker index hanya
+ditulis oleh slice default.
+"""
+
+import os
+import json
+
+from broker_flows import extract_flows, merge_flows, save_flows, load_flows, tmp_path_for
+
+DIMENSIONS = ('investor', 'board', 'mode')
+
+DEFAULT_VARIANT = {'investor': 'All', 'board': 'All Trade', 'mode': 'Value'}
+
+VARIANTS_DIR = 'variants'
+
+_HEADER_KEYS = {'Investor': 'investor', 'Board': 'board', 'Mode': 'mode'}
+
+
+def parse_variant(lines):
+    """(investor, board, mode) dari 2 baris header pertama; yang tidak ada -> default"""
+    variant = dict(DEFAULT_VARIANT)
+    for line in lines[:2]:
+        parts = [p.strip() for p in line.rstrip('\r\n').split('\t')]
+        for i, part in enumerate(parts[:-1]):
+            key = _HEADER_KEYS.get(part)
+            if key and parts[i + 1]:
+                variant[key] = parts[i + 1]
+    return variant
+
+
+def _norm(value):
+    return value.strip().lower().replace('_', ' ')
+
+
+def parse_slice(spec):
+    """'all' / None -> {} ; 'investor=Foreign,board=RG' -> {'investor': 'foreign', 'board': 'rg'}"""
+    if not spec or spec == 'all':
+        return {}
+    result = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            raise ValueError(f"Invalid slice item: {item} (use dimension=value)")
+        key, value = item.split('=', 1)
+        key = key.strip().lower()
+        if key not in DIMENSIONS:
+            raise ValueError(f"Unknown slice dimension: {key} (use {', '.join(DIMENSIONS)})")
+        result[key] = _norm(value)
+    return result
+
+
+def slice_label(slice_dims):
+    return ','.join(f"{k}={slice_dims[k]}" for k in DIMENSIONS if k in slice_dims) or 'all'
+
+
+def slice_key(slice_dims):
+    """Suffix nama file output: {'investor': 'foreign', 'board': 'rg'} -> 'investor-foreign+board-rg'"""
+    return '+'.join(f"{k}-{slice_dims[k].replace(' ', '_')}" for k in DIMENSIONS if k in slice_dims)
+
+
+def variant_key(variant):
+    """Nama folder flows satu variant: All/RG/Value -> 'all.rg.value'"""
+    return '.'.join(_norm(variant.get(k, DEFAULT_VARIANT[k])).replace(' ', '_') for k in DIMENSIONS)
+
+
+def matches(variant, slice_dims):
+    return all(_norm(variant.get(k, '')) == v for k, v in slice_dims.items())
+
+
+def _preference(variant):
+    """Urutan pilihan jika satu tanggal punya beberapa variant: All dulu"""
+    return tuple(_norm(variant[k]) != _norm(DEFAULT_VARIANT[k]) for k in DIMENSIONS)
+
+
+def select_days(cumulative_data, slice_dims=None):
+    """
+    Hari (hasil read_csv_file_cumulative, urut tanggal) yang masuk slice,
+    satu record per tanggal.
+    """
+    slice_dims = slice_dims or {}
+    by_date = {}
+    for record in cumulative_data:
+        variant = record.get('variant', DEFAULT_VARIANT)
+        if not matches(variant, slice_dims):
+            continue
+        date = record['date_start']
+        current = by_date.get(date)
+        if current is None or _preference(variant) < _preference(current.get('variant', DEFAULT_VARIANT)):
+            by_date[date] = record
+    return list(by_date.values())
+
+
+def variant_inventory(cumulative_data):
+    """{'investor/board/mode': jumlah hari} untuk laporan"""
+    counts = {}
+    for record in cumulative_data:
+        variant = record.get('variant', DEFAULT_VARIANT)
+        key = '/'.join(variant[k] for k in DIMENSIONS)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+# ===== FLOWS PER VARIANT =====
+def variant_flows(stock_code, cumulative_data):
+    """Flows per variant (satu record per tanggal per variant): {key: (variant, flows)}"""
+    days = {}
+    for record in cumulative_data:
+        variant = record.get('variant', DEFAULT_VARIANT)
+        _, by_date = days.setdefault(variant_key(variant), (variant, {}))
+        by_date.setdefault(record['date_start'], record)
+    return {key: (variant, extract_flows(stock_code, [by_date[d] for d in sorted(by_date)]))
+            for key, (variant, by_date) in days.items()}
+
+
+def slice_flows(stock_code, variants, slice_dims):
+    """Flows satu slice dari flows per variant (None jika tidak ada variant yang cocok)"""
+    matching = sorted((v for v in variants.values() if matches(v[0], slice_dims)), key=lambda v: _preference(v[0]))
+    if not matching:
+        return None
+    return merge_flows(stock_code, [flows for _, flows in matching])
+
+
+def _index_path(flows_dir, stock_code):
+    return os.path.join(flows_dir, VARIANTS_DIR, f'{stock_code}.json')
+
+
+def save_variant_flows(stock_code, variants, flows_dir, inputs, keys=None):
+    """
+    Simpan flows per variant; index (fingerprint input) ditulis terakhir.
+    keys: hanya flows variant ini yang ditulis ulang (intraday)
+    """
+    for key, (_, flows) in variants.items():
+        if keys is None or key in keys:
+            save_flows(flows, os.path.join(flows_dir, VARIANTS_DIR, key))
+    path = _index_path(flows_dir, stock_code)
+    tmp_path = tmp_path_for(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'inputs': inputs, 'variants': {key: v for key, (v, _) in variants.items()}}, f)
+    os.replace(tmp_path, path)
+
+
+def load_variant_flows(stock_code, flows_dir, inputs):
+    """
+    Flows per variant dari cache jika fingerprint input sama (None jika perlu
+    parse ulang). inputs None = tanpa cek fingerprint (intraday: satu file
+    berubah dan langsung di-differencing ke variant-nya)
+    """
+    path = _index_path(flows_dir, stock_code)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (ValueError, OSError):
+        return None
+    if inputs is not None and index.get('inputs') != inputs:
+        return None
+    variants = {}
+    for key, variant in index.get('variants', {}).items():
+        flows = load_flows(stock_code, os.path.join(flows_dir, VARIANTS_DIR, key))
+        if flows is None:
+            return None
+        variants[key] = (variant, flows)
+    return variants
@@ -9,6 +9,12 @@ SUPPORTS MULTIPLE TIME PERIODS:
 - 1month.json  (last 30 days)
 - 3month.json  (last 90 days)
 - 6month.json  (last 180 days)
+
+CLI (semua opsi: python generate_data.py --help):
+    python generate_data.py --input <Analisis> --output <dir>
+    python generate_data.py --stocks BBTN,ANTM,BRIS --periods 1week
+    python generate_data.py --periods 1month,45 --formats full,lite
+    python generate_data.py --only-changed
 """
 
 import os
@@ -16,6 +22,26 @@ import json
 from datetime import datetime, timedelta
 from collections import OrderedDict
 
+from broker_registry import load_registry, CAT_WHALE, DEFAULT_REGISTRY_FILE
+from broker_flows import extract_flows, aggregate_flows, broker_mask, save_flows, load_flows, truncate_flows
+from broker_footprint import FootprintTensor, write_outputs as write_footprint_outputs
+from topstok import load_topstok, select_universe, order_by_liquidity
+from topstok_store import open_session, current_session_date
+from backup_system import create_snapshot
+from delta_feed import load_manifest, save_manifest, read_output, write_output_with_delta
+from analytics_cache import AnalyticsCache, source_version, flows_version
+from concentration import ConcentrationIndex
+from streaks import StreakIndex
+from records import column
+from comovement import OUTPUT_FILE as CORRELATION_FILE, update_correlation
+from rollups import DEFAULT_CHART_POINTS, MIN_CHART_POINTS, write_lite
+from month_archive import ARCHIVE_EXT, read_lines, list_members, member_path
+from alerts import load_rules as load_alert_rules, write_index_with_alerts
+from checkpoint import RunCheckpoint, run_signature, inputs_fingerprint
+from export_slices import (DEFAULT_VARIANT, DIMENSIONS, parse_variant, parse_slice, slice_label, slice_key,
+                           select_days, variant_inventory, variant_flows, slice_flows, save_variant_flows,
+                           load_variant_flows)
+
 # Shark brokers (institusional) - sesuai referensi broker_saham_indonesia.md
 SHARK_BROKERS = {
     'AK', 'CC', 'BK', 'GW', 'AI', 'KZ', 'DX', 'DD', 'RX', 'KK', 'CG',
@@ -50,28 +76,38 @@ def format_date_for_display(date_str):
     except:
         return date_str
 
+# Periods to generate
+PERIODS = [
+    {'name': '1week', 'days': 7, 'label': '1 Minggu'},
+    {'name': '1month', 'days': 30, 'label': '1 Bulan'},
+    {'name': '3month', 'days': 90, 'label': '3 Bulan'},
+    {'name': '6month', 'days': 180, 'label': '6 Bulan'}
+]
+
+# Default input/output (override: --input / --output)
+DEFAULT_BASE_PATH = r'C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham\Analisis'
+DEFAULT_OUTPUT_PATH = r'C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham'
+
+# Output yang bisa dipilih dengan --formats
+OUTPUT_FORMATS = ('full', 'lite', 'screener', 'index')
+
+INPUTS_STATE_FILE = 'inputs.json'
+# Versi kode AnalyticsCache: generate_data.py + modul yang ikut menentukan isi
+# window (agregasi broker_flows/records, analytics, rollup/LTTB)
+ANALYTICS_SOURCES = ('broker_flows.py', 'records.py', 'concentration.py', 'streaks.py', 'rollups.py')
+
+_REGISTRY = None
+
+def get_registry():
+    """Broker registry (dibangun sekali dari broker_saham_indonesia.md + SHARK_BROKERS)"""
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = load_registry(whale_codes=SHARK_BROKERS)
+    return _REGISTRY
+
 def get_broker_name(code):
     """Get broker name from code"""
-    broker_names = {
-        'CC': 'Mandiri Sekuritas', 'XL': 'Stockbit', 'PD': 'IPOT',
-        'YP': 'Mirae Asset', 'NI': 'BNI Sekuritas', 'KI': 'Kingsford',
-        'SQ': 'BCA Sekuritas', 'DR': 'RHB/Danareksa', 'EP': 'MNC Sekuritas',
-        'BK': 'JP Morgan', 'GR': 'Gundalah', 'ZP': 'Maybank Sekuritas',
-        'YU': 'Yuanta Sekuritas', 'XC': 'Ajaib Sekuritas', 'AK': 'UBS Sekuritas',
-        'KK': 'Phillip Sekuritas', 'OD': 'BRI Danareksa', 'AZ': 'Asia Trade',
-        'DX': 'Bahana Sekuritas', 'TP': 'OCBC Sekuritas', 'AR': 'Artha Sekuritas',
-        'XA': 'NH Korindo', 'YB': 'Yulie Sekuritas', 'DH': 'Sinarmas Sekuritas',
-        'CP': 'Ciptadana Sekuritas', 'AT': 'Phintraco Sekuritas', 'YJ': 'Lotus Andalan',
-        'HD': 'KGI Sekuritas', 'RG': 'RHB Sekuritas', 'BQ': 'Korea Investment',
-        'HP': 'Hanson Sekuritas', 'IF': 'Samuel Sekuritas', 'MU': 'Mandiri Investasi',
-        'LS': 'Lippo Sekuritas', 'AG': 'Agra Sekuritas', 'TF': 'Trust Sekuritas',
-        'LG': 'Trimegah Sekuritas', 'MG': 'MNC Sekuritas', 'AI': 'UOB Kay Hian',
-        'MR': 'Mandiri Manajemen', 'CM': 'CIMB Sekuritas', 'VS': 'Valbury Sekuritas',
-        'YT': 'Yulie Sekuritas', 'PT': 'Pioneer Investama', 'NL': 'NASD',
-        'MZ': 'MNC Sekuritas', 'TN': 'Trimegah Tbk', 'TH': 'Tech Sekuritas',
-        'RX': 'Macquarie Sekuritas'
-    }
-    return broker_names.get(code, f'Broker {code}')
+    return get_registry().name(code)
 
 # ===== BEI TICK SIZE FUNCTIONS =====
 def get_bei_tick_size(price):
@@ -114,8 +150,12 @@ def round_price_by_purpose(price, purpose):
         return round_to_bei_tick(price, True)
 
 # ===== CALCULATION FUNCTIONS =====
-def calculate_signals_and_recommendation(summary, daily):
-    """Calculate score, signals, and recommendation"""
+def calculate_signals_and_recommendation(summary, daily, last_price=None):
+    """
+    Calculate score, signals, and recommendation.
+    last_price: real last price (e.g. TopStok store); default uses the most
+    recent whale buyavg as proxy.
+    """
     s = summary
     score = 0
     signals = []
@@ -135,11 +175,12 @@ def calculate_signals_and_recommendation(summary, daily):
     avg_retail_buy = s.get('retail_buyavg', 0)
 
     # Get last price (most recent whale buyavg as proxy)
-    last_price = None
-    for d in reversed(daily):
-        if d.get('whale_buyavg', 0) > 0:
-            last_price = d.get('whale_buyavg', 0)
-            break
+    if not last_price or last_price <= 0:
+        last_price = None
+        for d in reversed(daily):
+            if d.get('whale_buyavg', 0) > 0:
+                last_price = d.get('whale_buyavg', 0)
+                break
 
     # ===== NEW LOGIC: Check if whale is distributing to retail =====
     # If retail owns MORE than whale AND retail buys at HIGHER price → whale is distributing
@@ -737,12 +778,13 @@ def read_csv_file_cumulative(file_path):
         'whale_sellavg': 0,
         'retail_buyavg': 0,
         'retail_sellavg': 0,
+        'variant': dict(DEFAULT_VARIANT),
         'brokers': {}
     }
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        # File biasa atau member arsip bulanan (month_archive.py)
+        lines = read_lines(file_path)
 
         if len(lines) > 0:
             start_date, end_date = parse_date_from_header(lines[0])
@@ -750,8 +792,13 @@ def read_csv_file_cumulative(file_path):
             result['date_end'] = end_date
             if start_date:
                 result['date_display'] = format_date_for_display(start_date)
+            # (investor, board, mode) dari header - lihat export_slices.py
+            result['variant'] = parse_variant(lines)
 
         data_start_idx = 3
+        registry = get_registry()
+        # Mask dihitung sekali; intern kode baru mengosongkan cache mask registry
+        whale_mask = registry.mask(CAT_WHALE)
 
         shark_total_buy_val = 0
         shark_total_sell_val = 0
@@ -776,7 +823,10 @@ def read_csv_file_cumulative(file_path):
                 continue
 
             if broker_code not in result['brokers']:
-                result['brokers'][broker_code] = {'buy': 0, 'sell': 0, 'buyavg': 0, 'sellavg': 0, 'buy_lot': 0, 'sell_lot': 0}
+                broker_id = registry.intern(broker_code)
+                if broker_id >= len(whale_mask):
+                    whale_mask = registry.mask(CAT_WHALE)
+                result['brokers'][broker_code] = {'id': broker_id, 'buy': 0, 'sell': 0, 'buyavg': 0, 'sellavg': 0, 'buy_lot': 0, 'sell_lot': 0}
 
             try:
                 buy_lot_str = parts[1].replace(',', '') if parts[1] else '0'
@@ -807,7 +857,7 @@ def read_csv_file_cumulative(file_path):
             result['brokers'][broker_code]['buy_lot'] = buy_lot
             result['brokers'][broker_code]['sell_lot'] = sell_lot
 
-            if broker_code in SHARK_BROKERS:
+            if whale_mask[result['brokers'][broker_code]['id']]:
                 shark_total_buy_val += buy_val
                 shark_total_sell_val += sell_val
                 shark_total_buy_avg += buy_avg * buy_val
@@ -832,58 +882,65 @@ def read_csv_file_cumulative(file_path):
 
     return result
 
-def scan_stock_folder(stock_path):
-    """Scan all CSV files in stock folder and its subfolders."""
+def extract_date_from_path(path, folder_name):
+    """Tanggal YYYY-MM-DD dari <MONYY>/<day>.csv (None jika tidak dikenali)"""
     import re
-    csv_files = []
-
-    def extract_date_from_path(path, folder_name):
-        month = None
-        if 'JAN' in folder_name:
-            month = '01'
-        elif 'FEB' in folder_name:
-            month = '02'
-        elif 'MAR' in folder_name:
-            month = '03'
-        elif 'APR' in folder_name:
-            month = '04'
-        elif 'MAY' in folder_name:
-            month = '05'
-        elif 'JUN' in folder_name:
-            month = '06'
-        elif 'JUL' in folder_name:
-            month = '07'
-        elif 'AUG' in folder_name:
-            month = '08'
-        elif 'SEP' in folder_name:
-            month = '09'
-        elif 'OCT' in folder_name:
-            month = '10'
-        elif 'NOV' in folder_name:
-            month = '11'
-        elif 'DEC' in folder_name or 'DES' in folder_name:
-            month = '12'
-
-        year_match = re.search(r'(\d{2,4})$', folder_name)
-        if year_match:
-            year_suffix = year_match.group(1)
-            if len(year_suffix) == 2:
-                year = '20' + year_suffix
-            else:
-                year = year_suffix
+    month = None
+    if 'JAN' in folder_name:
+        month = '01'
+    elif 'FEB' in folder_name:
+        month = '02'
+    elif 'MAR' in folder_name:
+        month = '03'
+    elif 'APR' in folder_name:
+        month = '04'
+    elif 'MAY' in folder_name:
+        month = '05'
+    elif 'JUN' in folder_name:
+        month = '06'
+    elif 'JUL' in folder_name:
+        month = '07'
+    elif 'AUG' in folder_name:
+        month = '08'
+    elif 'SEP' in folder_name:
+        month = '09'
+    elif 'OCT' in folder_name:
+        month = '10'
+    elif 'NOV' in folder_name:
+        month = '11'
+    elif 'DEC' in folder_name or 'DES' in folder_name:
+        month = '12'
+
+    year_match = re.search(r'(\d{2,4})$', folder_name)
+    if year_match:
+        year_suffix = year_match.group(1)
+        if len(year_suffix) == 2:
+            year = '20' + year_suffix
         else:
-            year = '2026'
-
-        filename = os.path.basename(path).replace('.csv', '')
-        try:
-            day = int(filename)
-            day_str = f"{day:02d}"
-        except ValueError:
-            return None
+            year = year_suffix
+    else:
+        year = '2026'
 
-        if month and year and day:
-            return f"{year}-{month}-{day_str}"
+    # <DD>.csv, atau <DD>_<apa saja>.csv untuk export variant lain di hari yang sama
+    filename = os.path.basename(path).replace('.csv', '')
+    day_match = re.match(r'(\d{1,2})(?:_.*)?$', filename)
+    if not day_match:
         return None
+    day = int(day_match.group(1))
+    day_str = f"{day:02d}"
+
+    if month and year and day:
+        return f"{year}-{month}-{day_str}"
+    return None
+
+def scan_stock_folder(stock_path):
+    """
+    Scan all CSV files in stock folder and its subfolders, including members
+    of packed monthly archives (<MONYY>.zip). A loose CSV wins over an archive
+    member with the same date and file name.
+    """
+    csv_files = []
+    archived = []
 
     for root, dirs, files in os.walk(stock_path):
         for file in files:
@@ -893,12 +950,50 @@ def scan_stock_folder(stock_path):
                 date_str = extract_date_from_path(file_path, folder_name)
                 if date_str:
                     csv_files.append((file_path, date_str, file))
+            elif file.endswith(ARCHIVE_EXT):
+                archive_path = os.path.join(root, file)
+                folder_name = file[:-len(ARCHIVE_EXT)]
+                for member in list_members(archive_path):
+                    date_str = extract_date_from_path(member, folder_name)
+                    if date_str:
+                        archived.append((member_path(archive_path, member), date_str, member))
+
+    if archived:
+        loose = {(date_str, name) for _, date_str, name in csv_files}
+        csv_files += [entry for entry in archived if (entry[1], entry[2]) not in loose]
 
     csv_files.sort(key=lambda x: x[1] if x[1] else '9999-99-99')
     return csv_files
 
-def process_stock_folder(stock_code, base_path):
-    """Process all CSV files for a stock with all calculations"""
+def read_day_file(file_path, date_str):
+    """read_csv_file_cumulative + tanggal dari path (inventory)"""
+    data = read_csv_file_cumulative(file_path)
+    data['date_start'] = date_str
+    if data['date_start']:
+        data['date_display'] = format_date_for_display(data['date_start'])
+    return data
+
+def process_stock_folder(stock_code, base_path, flows_dir=None, max_days=None, slice_dims=None):
+    """
+    Process all CSV files for a stock with all calculations.
+    flows_dir: if set, per-broker daily flows are saved there (broker_flows.py)
+    max_days: window-pruned loading - only the last max_days dates plus the one
+              before them (differencing base) are read; the earlier days come
+              from the flows cache, so running *_cum_* fields, insight peaks
+              and streaks match a full load. Without a flows cache that
+              covers the earlier dates, or when the window mixes export
+              variants, all files are read. A pruned run does not update
+              the flows cache.
+    slice_dims: export slice (export_slices.parse_slice), default all. The
+              default slice is also built from per-variant flows, so
+              cumulative files of different variants are never differenced
+              against each other. Every
+              full parse also saves per-variant flows (flows/variants/); a
+              slice is selected from them (export_slices.slice_flows) and
+              reuses them without parsing while the inputs are unchanged.
+              Slices are never pruned; the default flows cache is only
+              written for the default slice.
+    """
     stock_path = os.path.join(base_path, stock_code)
 
     if not os.path.exists(stock_path):
@@ -911,290 +1006,97 @@ def process_stock_folder(stock_code, base_path):
         print(f"No CSV files found in {stock_path}")
         return None
 
-    print(f"  Found {len(csv_files)} CSV files")
-
-    cumulative_data = []
-    for file_path, date_str, filename in csv_files:
-        data = read_csv_file_cumulative(file_path)
-        data['date_start'] = date_str
-        if data['date_start']:
-            data['date_display'] = format_date_for_display(data['date_start'])
-        cumulative_data.append(data)
-
-    daily_data = []
-    prev_cumulative = {}
-
-    total_shark_cum_buy = 0
-    total_shark_cum_sell = 0
-    total_retail_cum_buy = 0
-    total_retail_cum_sell = 0
-
-    total_shark_buyavg_weighted = 0
-    total_shark_sellavg_weighted = 0
-    total_retail_buyavg_weighted = 0
-    total_retail_sellavg_weighted = 0
-
-    total_shark_cum_buy_lot = 0
-    total_shark_cum_sell_lot = 0
-    total_retail_cum_buy_lot = 0
-    total_retail_cum_sell_lot = 0
-
-    total_shark_buy_lot_for_avg = 0
-    total_shark_sell_lot_for_avg = 0
-    total_retail_buy_lot_for_avg = 0
-    total_retail_sell_lot_for_avg = 0
-
-    all_brokers_data = {}
-
-    for i, cum_data in enumerate(cumulative_data):
-        day_num = i + 1
-
-        daily_shark_buy = 0
-        daily_shark_sell = 0
-        daily_retail_buy = 0
-        daily_retail_sell = 0
-        daily_shark_buy_lot = 0
-        daily_shark_sell_lot = 0
-        daily_retail_buy_lot = 0
-        daily_retail_sell_lot = 0
-
-        daily_shark_buyavg_weighted = 0
-        daily_shark_sellavg_weighted = 0
-        daily_retail_buyavg_weighted = 0
-        daily_retail_sellavg_weighted = 0
-
-        for broker_code, broker_cum in cum_data['brokers'].items():
-            prev_buy = prev_cumulative.get(broker_code, {}).get('buy', 0)
-            prev_sell = prev_cumulative.get(broker_code, {}).get('sell', 0)
-            prev_buy_lot = prev_cumulative.get(broker_code, {}).get('buy_lot', 0)
-            prev_sell_lot = prev_cumulative.get(broker_code, {}).get('sell_lot', 0)
-
-            if broker_cum['buy'] < prev_buy or prev_buy == 0:
-                daily_buy = broker_cum['buy']
-            else:
-                daily_buy = broker_cum['buy'] - prev_buy
-
-            if broker_cum['sell'] < prev_sell or prev_sell == 0:
-                daily_sell = broker_cum['sell']
-            else:
-                daily_sell = broker_cum['sell'] - prev_sell
-
-            if broker_cum.get('buy_lot', 0) < prev_buy_lot or prev_buy_lot == 0:
-                daily_buy_lot = broker_cum.get('buy_lot', 0)
-            else:
-                daily_buy_lot = broker_cum.get('buy_lot', 0) - prev_buy_lot
-
-            if broker_cum.get('sell_lot', 0) < prev_sell_lot or prev_sell_lot == 0:
-                daily_sell_lot = broker_cum.get('sell_lot', 0)
-            else:
-                daily_sell_lot = broker_cum.get('sell_lot', 0) - prev_sell_lot
-
-            daily_buyavg = broker_cum.get('buyavg', 0)
-            daily_sellavg = broker_cum.get('sellavg', 0)
-
-            buy_lot_for_avg = daily_buy_lot if daily_buy_lot > 0 else 0
-            sell_lot_for_avg = daily_sell_lot if daily_sell_lot > 0 else 0
-
-            if broker_code not in all_brokers_data:
-                category = 'whale' if broker_code in SHARK_BROKERS else 'retail'
-                all_brokers_data[broker_code] = {
-                    'code': broker_code,
-                    'name': get_broker_name(broker_code),
-                    'category': category,
-                    'buy': 0,
-                    'sell': 0,
-                    'buyavg': 0,
-                    'sellavg': 0,
-                    'buyavg_weighted': 0,
-                    'sellavg_weighted': 0
-                }
-
-            if daily_buy > 0 or daily_sell > 0:
-                all_brokers_data[broker_code]['buy'] += daily_buy
-                all_brokers_data[broker_code]['sell'] += daily_sell
-                all_brokers_data[broker_code]['buyavg'] = daily_buyavg
-                all_brokers_data[broker_code]['sellavg'] = daily_sellavg
-                all_brokers_data[broker_code]['buyavg_weighted'] = (
-                    all_brokers_data[broker_code].get('buyavg_weighted', 0) + daily_buyavg * daily_buy
-                )
-                all_brokers_data[broker_code]['sellavg_weighted'] = (
-                    all_brokers_data[broker_code].get('sellavg_weighted', 0) + daily_sellavg * daily_sell
-                )
-
-            if broker_code in SHARK_BROKERS:
-                daily_shark_buy += daily_buy
-                daily_shark_sell += daily_sell
-                daily_shark_buy_lot += daily_buy_lot
-                daily_shark_sell_lot += daily_sell_lot
-                if buy_lot_for_avg > 0:
-                    daily_shark_buyavg_weighted += daily_buyavg * buy_lot_for_avg
-                if sell_lot_for_avg > 0:
-                    daily_shark_sellavg_weighted += daily_sellavg * sell_lot_for_avg
-            else:
-                daily_retail_buy += daily_buy
-                daily_retail_sell += daily_sell
-                daily_retail_buy_lot += daily_buy_lot
-                daily_retail_sell_lot += daily_sell_lot
-                if buy_lot_for_avg > 0:
-                    daily_retail_buyavg_weighted += daily_buyavg * buy_lot_for_avg
-                if sell_lot_for_avg > 0:
-                    daily_retail_sellavg_weighted += daily_sellavg * sell_lot_for_avg
-
-        today_shark_buy_lot = 0
-        today_shark_sell_lot = 0
-        today_retail_buy_lot = 0
-        today_retail_sell_lot = 0
-
-        for broker_code in cum_data['brokers']:
-            if broker_code not in prev_cumulative:
-                lot = cum_data['brokers'][broker_code].get('buy_lot', 0)
-            else:
-                curr_lot = cum_data['brokers'][broker_code].get('buy_lot', 0)
-                prev_lot = prev_cumulative[broker_code].get('buy_lot', 0)
-                if curr_lot < prev_lot or prev_lot == 0:
-                    lot = curr_lot
-                else:
-                    lot = curr_lot - prev_lot
-
-            if broker_code in SHARK_BROKERS:
-                today_shark_buy_lot += max(0, lot)
+    if slice_dims:
+        return build_slice_data(stock_code, csv_files, flows_dir, slice_dims)
+
+    dates = sorted({date_str for _, date_str, _ in csv_files})
+    inputs = inputs_fingerprint(csv_files) if flows_dir else None
+    all_files = csv_files
+    seed = None
+    base_date = None
+    if max_days is not None and len(dates) > max_days:
+        skipped = len(dates) - max_days
+        seed = recent_seed(stock_code, flows_dir, dates[:skipped]) if flows_dir else None
+        if seed is None:
+            print(f"  Found {len(csv_files)} CSV files (no flows cache for the earlier days, reading all)")
+        else:
+            base_date = dates[skipped - 1]
+            total = len(csv_files)
+            csv_files = [entry for entry in csv_files if entry[1] >= base_date]
+            print(f"  Found {total} CSV files (reading last {max_days} days + 1 base)")
+    else:
+        print(f"  Found {len(csv_files)} CSV files")
+
+    # Satu pass parse untuk semua variant, lalu pilih slice default
+    parsed = [read_day_file(file_path, date_str) for file_path, date_str, filename in csv_files]
+
+    if seed is not None:
+        # Window + base satu variant saja: differencing berurutan sama dengan
+        # differencing per variant. Campuran variant -> baca semua file
+        cumulative_data = select_days(parsed)
+        if len(variant_inventory(parsed)) == 1 and len(cumulative_data) == len(parsed) \
+                and cumulative_data[0]['date_start'] == base_date:
+            base = cumulative_data.pop(0)
+            return build_stock_data(stock_code, extract_flows(stock_code, cumulative_data, base, seed))
+        print(f"  Mixed export variants in the window, reading all {len(all_files)} CSV files")
+        parsed = [read_day_file(file_path, date_str) for file_path, date_str, filename in all_files]
+
+    # Differencing hanya di dalam satu variant; slice default = gabungan per tanggal
+    variants = variant_flows(stock_code, parsed)
+    flows = slice_flows(stock_code, variants, {})
+    if flows_dir:
+        save_flows(flows, flows_dir)
+        save_variant_flows(stock_code, variants, flows_dir, inputs)
+
+    return build_stock_data(stock_code, flows)
+
+def build_slice_data(stock_code, csv_files, flows_dir, slice_dims):
+    """process_stock_folder untuk slice non-default: flows per variant dari cache atau satu pass parse"""
+    inputs = inputs_fingerprint(csv_files)
+    variants = load_variant_flows(stock_code, flows_dir, inputs) if flows_dir else None
+    if variants is None:
+        print(f"  Found {len(csv_files)} CSV files")
+        parsed = [read_day_file(file_path, date_str) for file_path, date_str, filename in csv_files]
+        variants = variant_flows(stock_code, parsed)
+        if flows_dir:
+            save_variant_flows(stock_code, variants, flows_dir, inputs)
+    else:
+        print(f"  Variant flows from cache ({len(variants)} variants)")
 
-        for broker_code in cum_data['brokers']:
-            if broker_code not in prev_cumulative:
-                lot = cum_data['brokers'][broker_code].get('sell_lot', 0)
-            else:
-                curr_lot = cum_data['brokers'][broker_code].get('sell_lot', 0)
-                prev_lot = prev_cumulative[broker_code].get('sell_lot', 0)
-                if curr_lot < prev_lot or prev_lot == 0:
-                    lot = curr_lot
-                else:
-                    lot = curr_lot - prev_lot
+    flows = slice_flows(stock_code, variants, slice_dims)
+    if flows is None:
+        available = {'/'.join(v[k] for k in DIMENSIONS): len(f['dates']) for v, f in variants.values()}
+        print(f"  No files for slice {slice_label(slice_dims)} (available: {available})")
+        return None
+    return build_stock_data(stock_code, flows)
 
-            if broker_code in SHARK_BROKERS:
-                today_shark_sell_lot += max(0, lot)
-            else:
-                today_retail_sell_lot += max(0, lot)
+def recent_seed(stock_code, flows_dir, dates):
+    """
+    --recent: flows cache terpotong sampai hari base (dates = tanggal inventory
+    sebelum window, termasuk base). None jika cache tidak ada atau tanggalnya
+    tidak sama dengan inventory (cache tertinggal / hari lama hilang). Isi
+    hari lama diasumsikan tidak berubah sejak cache ditulis (sama seperti
+    intraday.py)
+    """
+    flows = load_flows(stock_code, flows_dir)
+    if flows is None or flows['dates'][:len(dates)] != dates:
+        return None
+    return truncate_flows(flows, len(dates))
 
-        for broker_code in cum_data['brokers']:
-            if broker_code not in prev_cumulative:
-                lot = cum_data['brokers'][broker_code].get('buy_lot', 0)
-            else:
-                curr_lot = cum_data['brokers'][broker_code].get('buy_lot', 0)
-                prev_lot = prev_cumulative[broker_code].get('buy_lot', 0)
-                if curr_lot < prev_lot or prev_lot == 0:
-                    lot = curr_lot
-                else:
-                    lot = curr_lot - prev_lot
-
-            if broker_code not in SHARK_BROKERS:
-                today_retail_buy_lot += max(0, lot)
-
-        daily_shark_buyavg = daily_shark_buyavg_weighted / today_shark_buy_lot if today_shark_buy_lot > 0 else 0
-        daily_shark_sellavg = daily_shark_sellavg_weighted / today_shark_sell_lot if today_shark_sell_lot > 0 else 0
-        daily_retail_buyavg = daily_retail_buyavg_weighted / today_retail_buy_lot if today_retail_buy_lot > 0 else 0
-        daily_retail_sellavg = daily_retail_sellavg_weighted / today_retail_sell_lot if today_retail_sell_lot > 0 else 0
-
-        total_shark_cum_buy += daily_shark_buy
-        total_shark_cum_sell += daily_shark_sell
-        total_retail_cum_buy += daily_retail_buy
-        total_retail_cum_sell += daily_retail_sell
-        total_shark_cum_buy_lot += daily_shark_buy_lot
-        total_shark_cum_sell_lot += daily_shark_sell_lot
-        total_retail_cum_buy_lot += daily_retail_buy_lot
-        total_retail_cum_sell_lot += daily_retail_sell_lot
-
-        if today_shark_buy_lot > 0:
-            total_shark_buyavg_weighted += daily_shark_buyavg * today_shark_buy_lot
-        if today_shark_sell_lot > 0:
-            total_shark_sellavg_weighted += daily_shark_sellavg * today_shark_sell_lot
-        if today_retail_buy_lot > 0:
-            total_retail_buyavg_weighted += daily_retail_buyavg * today_retail_buy_lot
-        if today_retail_sell_lot > 0:
-            total_retail_sellavg_weighted += daily_retail_sellavg * today_retail_sell_lot
-
-        total_shark_buy_lot_for_avg += today_shark_buy_lot
-        total_shark_sell_lot_for_avg += today_shark_sell_lot
-        total_retail_buy_lot_for_avg += today_retail_buy_lot
-        total_retail_sell_lot_for_avg += today_retail_sell_lot
-
-        shark_net = daily_shark_buy - daily_shark_sell
-        retail_net = daily_retail_buy - daily_retail_sell
-        shark_net_lot = total_shark_cum_buy_lot - total_shark_cum_sell_lot
-        retail_net_lot = total_retail_cum_buy_lot - total_retail_cum_sell_lot
-
-        daily_data.append({
-            'day': day_num,
-            'date': cum_data['date_start'] or 'Unknown',
-            'date_display': cum_data['date_display'] or 'Unknown',
-            'date_end': cum_data['date_end'] or 'Unknown',
-            'whale_buy': round(daily_shark_buy, 2),
-            'retail_buy': round(daily_retail_buy, 2),
-            'whale_sell': round(daily_shark_sell, 2),
-            'retail_sell': round(daily_retail_sell, 2),
-            'whale_buyavg': round(daily_shark_buyavg, 2),
-            'whale_sellavg': round(daily_shark_sellavg, 2),
-            'retail_buyavg': round(daily_retail_buyavg, 2),
-            'retail_sellavg': round(daily_retail_sellavg, 2),
-            'whale_cum_buy': round(total_shark_cum_buy, 2),
-            'retail_cum_buy': round(total_retail_cum_buy, 2),
-            'whale_cum_sell': round(total_shark_cum_sell, 2),
-            'retail_cum_sell': round(total_retail_cum_sell, 2),
-            'whale_net': round(shark_net, 2),
-            'retail_net': round(retail_net, 2),
-            'whale_cum_net': round(total_shark_cum_buy - total_shark_cum_sell, 2),
-            'retail_cum_net': round(total_retail_cum_buy - total_retail_cum_sell, 2),
-            'whale_cum_buy_lot': round(total_shark_cum_buy_lot),
-            'whale_cum_sell_lot': round(total_shark_cum_sell_lot),
-            'retail_cum_buy_lot': round(total_retail_cum_buy_lot),
-            'retail_cum_sell_lot': round(total_retail_cum_sell_lot),
-            'whale_net_lot': round(shark_net_lot),
-            'retail_net_lot': round(retail_net_lot)
-        })
-
-        prev_cumulative = cum_data['brokers']
-
-    summary_shark_buyavg = total_shark_buyavg_weighted / total_shark_buy_lot_for_avg if total_shark_buy_lot_for_avg > 0 else 0
-    summary_shark_sellavg = total_shark_sellavg_weighted / total_shark_sell_lot_for_avg if total_shark_sell_lot_for_avg > 0 else 0
-    summary_retail_buyavg = total_retail_buyavg_weighted / total_retail_buy_lot_for_avg if total_retail_buy_lot_for_avg > 0 else 0
-    summary_retail_sellavg = total_retail_sellavg_weighted / total_retail_sell_lot_for_avg if total_retail_sell_lot_for_avg > 0 else 0
+def build_stock_data(stock_code, flows, whale_mask=None):
+    """
+    Build whale/retail daily + summary + brokers from per-broker flows and run
+    all analytics. whale_mask: mask per registry ID (default: SHARK_BROKERS).
+    """
+    registry = get_registry()
+    if whale_mask is None:
+        whale_mask = registry.mask(CAT_WHALE)
+    column_mask = broker_mask(flows, whale_mask, registry)
+    daily_data, summary, brokers_list = aggregate_flows(flows, column_mask, registry)
 
     first_date = daily_data[0]['date'] if daily_data else 'Unknown'
     last_date = daily_data[-1].get('date_end', daily_data[-1].get('date', 'Unknown')) if daily_data else 'Unknown'
 
-    brokers_list = []
-    for code, data in all_brokers_data.items():
-        data['net'] = round(data['buy'] - data['sell'], 2)
-        data['total'] = round(data['buy'] + data['sell'], 2)
-        data['buy'] = round(data['buy'], 2)
-        data['sell'] = round(data['sell'], 2)
-        data['buyavg'] = round(data.get('buyavg_weighted', data['buy']) / data['buy'], 2) if data['buy'] > 0 else 0
-        data['sellavg'] = round(data.get('sellavg_weighted', data['sell']) / data['sell'], 2) if data['sell'] > 0 else 0
-        brokers_list.append(data)
-
-    brokers_list.sort(key=lambda x: x['total'], reverse=True)
-
-    # Build summary
-    summary = {
-        'whale_buy': round(total_shark_cum_buy, 2),
-        'retail_buy': round(total_retail_cum_buy, 2),
-        'whale_sell': round(total_shark_cum_sell, 2),
-        'retail_sell': round(total_retail_cum_sell, 2),
-        'whale_buyavg': round(summary_shark_buyavg, 2),
-        'retail_buyavg': round(summary_retail_buyavg, 2),
-        'whale_sellavg': round(summary_shark_sellavg, 2),
-        'retail_sellavg': round(summary_retail_sellavg, 2),
-        'whale_net': round(total_shark_cum_buy - total_shark_cum_sell, 2),
-        'retail_net': round(total_retail_cum_buy - total_retail_cum_sell, 2),
-        'total_buy': round(total_shark_cum_buy + total_retail_cum_buy, 2),
-        'total_sell': round(total_shark_cum_sell + total_retail_cum_sell, 2),
-        'whale_cum_buy_lot': round(total_shark_cum_buy_lot),
-        'whale_cum_sell_lot': round(total_shark_cum_sell_lot),
-        'retail_cum_buy_lot': round(total_retail_cum_buy_lot),
-        'retail_cum_sell_lot': round(total_retail_cum_sell_lot),
-        'whale_net_lot': round(total_shark_cum_buy_lot - total_shark_cum_sell_lot),
-        'retail_net_lot': round(total_retail_cum_buy_lot - total_retail_cum_sell_lot)
-    }
-
     # ===== ALL CALCULATIONS DONE IN PYTHON =====
 
     # 1. Calculate signals and recommendation
@@ -1223,14 +1125,24 @@ def process_stock_folder(stock_code, base_path):
         'volatilityTrend': vt_data,
         'priceRecommendation': price_data,
         'confidence': confidence_data,
-        'insights': insights_data
+        'insights': insights_data,
+        # Internal (tidak ikut ke JSON output): flow per broker untuk tahap lanjutan
+        '_flows': flows,
+        # Internal: versi data untuk key AnalyticsCache
+        '_version': flows_version(flows, column_mask),
+        # Internal: prefix sum per broker untuk metrik konsentrasi per window
+        '_concentration': ConcentrationIndex(flows, column_mask),
+        # Internal: run-length streak per broker + regime whale
+        '_streaks': StreakIndex(flows, column_mask, registry, [d['whale_net'] for d in daily_data])
     }
 
-def filter_data_by_period(stock_data, period_days):
+def filter_data_by_period(stock_data, period_days, last_price=None, cache=None):
     """
     Filter daily data by period and RECALCULATE all metrics.
 
     period_days: number of days to include (7, 30, 90, 180)
+    last_price: optional real last price (TopStok store) instead of the proxy
+    cache: optional AnalyticsCache - identical windows are computed once
     Returns: new stock_data with filtered and recalculated data
     """
     if not stock_data or not stock_data.get('daily'):
@@ -1243,6 +1155,14 @@ def filter_data_by_period(stock_data, period_days):
     if not filtered_daily:
         return None
 
+    if cache is not None and stock_data.get('_version'):
+        start = len(all_daily) - len(filtered_daily)
+        key = cache.fingerprint(stock_data['code'], start, len(all_daily), stock_data['_version'], last_price)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        return cache.put(key, filter_data_by_period(stock_data, period_days, last_price))
+
     # RECALCULATE summary based on filtered data
     # Start from zeros and recalculate cumulative
     summary_filtered = {
@@ -1266,48 +1186,29 @@ def filter_data_by_period(stock_data, period_days):
     brokers_filtered = []
     broker_map = {}  # code -> broker data
 
-    for day_data in filtered_daily:
-        summary_filtered['whale_buy'] += day_data.get('whale_buy', 0)
-        summary_filtered['retail_buy'] += day_data.get('retail_buy', 0)
-        summary_filtered['whale_sell'] += day_data.get('whale_sell', 0)
-        summary_filtered['retail_sell'] += day_data.get('retail_sell', 0)
-
-        # Calculate lot positions (cumulative from filtered period start)
-        summary_filtered['whale_cum_buy_lot'] += day_data.get('whale_buy_lot', 0)
-        summary_filtered['whale_cum_sell_lot'] += day_data.get('whale_sell_lot', 0)
-        summary_filtered['retail_cum_buy_lot'] += day_data.get('retail_buy_lot', 0)
-        summary_filtered['retail_cum_sell_lot'] += day_data.get('retail_sell_lot', 0)
-
-    # Calculate averages from filtered period
-    total_whale_buy_vol = sum(d.get('whale_buy', 0) for d in filtered_daily)
-    total_whale_sell_vol = sum(d.get('whale_sell', 0) for d in filtered_daily)
-    total_retail_buy_vol = sum(d.get('retail_buy', 0) for d in filtered_daily)
-    total_retail_sell_vol = sum(d.get('retail_sell', 0) for d in filtered_daily)
-
-    if total_whale_buy_vol > 0:
-        # Weighted average buy price
-        whale_buy_avg = sum(d.get('whale_buyavg', 0) * d.get('whale_buy', 0) for d in filtered_daily if d.get('whale_buy', 0) > 0) / total_whale_buy_vol
-        summary_filtered['whale_buyavg'] = round(whale_buy_avg, 2)
-    else:
-        summary_filtered['whale_buyavg'] = 0
-
-    if total_whale_sell_vol > 0:
-        whale_sell_avg = sum(d.get('whale_sellavg', 0) * d.get('whale_sell', 0) for d in filtered_daily if d.get('whale_sell', 0) > 0) / total_whale_sell_vol
-        summary_filtered['whale_sellavg'] = round(whale_sell_avg, 2)
-    else:
-        summary_filtered['whale_sellavg'] = 0
-
-    if total_retail_buy_vol > 0:
-        retail_buy_avg = sum(d.get('retail_buyavg', 0) * d.get('retail_buy', 0) for d in filtered_daily if d.get('retail_buy', 0) > 0) / total_retail_buy_vol
-        summary_filtered['retail_buyavg'] = round(retail_buy_avg, 2)
-    else:
-        summary_filtered['retail_buyavg'] = 0
-
-    if total_retail_sell_vol > 0:
-        retail_sell_avg = sum(d.get('retail_sellavg', 0) * d.get('retail_sell', 0) for d in filtered_daily if d.get('retail_sell', 0) > 0) / total_retail_sell_vol
-        summary_filtered['retail_sellavg'] = round(retail_sell_avg, 2)
-    else:
-        summary_filtered['retail_sellavg'] = 0
+    # Agregat window = sum atas slice kolom (records.column), urutan penjumlahan
+    # sama dengan loop per baris sehingga hasil float identik
+    cols = {field: column(filtered_daily, field) for field in (
+        'whale_buy', 'retail_buy', 'whale_sell', 'retail_sell',
+        'whale_buyavg', 'whale_sellavg', 'retail_buyavg', 'retail_sellavg',
+        'whale_buy_lot', 'whale_sell_lot', 'retail_buy_lot', 'retail_sell_lot')}
+    for field in ('whale_buy', 'retail_buy', 'whale_sell', 'retail_sell'):
+        summary_filtered[field] = sum(cols[field])
+
+    # Calculate lot positions (cumulative from filtered period start)
+    summary_filtered['whale_cum_buy_lot'] = sum(cols['whale_buy_lot'])
+    summary_filtered['whale_cum_sell_lot'] = sum(cols['whale_sell_lot'])
+    summary_filtered['retail_cum_buy_lot'] = sum(cols['retail_buy_lot'])
+    summary_filtered['retail_cum_sell_lot'] = sum(cols['retail_sell_lot'])
+
+    # Calculate averages from filtered period (rata-rata tertimbang volume)
+    for side in ('whale_buy', 'whale_sell', 'retail_buy', 'retail_sell'):
+        volume = summary_filtered[side]
+        if volume > 0:
+            weighted = sum(avg * vol for avg, vol in zip(cols[side + 'avg'], cols[side]) if vol > 0)
+            summary_filtered[side + 'avg'] = round(weighted / volume, 2)
+        else:
+            summary_filtered[side + 'avg'] = 0
 
     summary_filtered['whale_net'] = summary_filtered['whale_buy'] - summary_filtered['whale_sell']
     summary_filtered['retail_net'] = summary_filtered['retail_buy'] - summary_filtered['retail_sell']
@@ -1318,9 +1219,9 @@ def filter_data_by_period(stock_data, period_days):
 
     # Recalculate brokers for filtered period
     broker_totals = {}
-    for day_data in filtered_daily:
+    for day_brokers in column(filtered_daily, 'brokers', ()):
         # Aggregate broker data from daily
-        for broker_data in day_data.get('brokers', []):
+        for broker_data in day_brokers:
             code = broker_data.get('code')
             if code not in broker_totals:
                 broker_totals[code] = {
@@ -1365,11 +1266,17 @@ def filter_data_by_period(stock_data, period_days):
 
     # RECALCULATE all analytics with filtered data
     vt_data_filtered = calculate_volatility_and_trend(filtered_daily, summary_filtered)
-    signal_data_filtered = calculate_signals_and_recommendation(summary_filtered, filtered_daily)
+    signal_data_filtered = calculate_signals_and_recommendation(summary_filtered, filtered_daily, last_price)
     price_data_filtered = calculate_price_recommendations(summary_filtered, filtered_daily, vt_data_filtered, signal_data_filtered)
     confidence_data_filtered = calculate_confidence_score(summary_filtered, vt_data_filtered, signal_data_filtered, price_data_filtered, signal_data_filtered['recommendation'])
     insights_data_filtered = generate_insights(summary_filtered, filtered_daily, vt_data_filtered)
 
+    # Konsentrasi broker untuk window ini (prefix sum, O(broker))
+    concentration = stock_data.get('_concentration')
+    concentration_data = concentration.window(len(all_daily) - len(filtered_daily)) if concentration else None
+    streaks = stock_data.get('_streaks')
+    streaks_data = streaks.window(len(all_daily) - len(filtered_daily)) if streaks else None
+
     # Create new filtered stock data
     return {
         'code': stock_data['code'],
@@ -1382,111 +1289,522 @@ def filter_data_by_period(stock_data, period_days):
         'recommendation': signal_data_filtered,
         'priceRecommendation': price_data_filtered,
         'confidence': confidence_data_filtered,
-        'insights': insights_data_filtered
+        'insights': insights_data_filtered,
+        'concentration': concentration_data,
+        'streaks': streaks_data
     }
 
-def main():
-    base_path = r'C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham\Analisis'
-    output_path = r'C:\Users\Hendra.LAPTOP-M9SC6TF3\Saham'
-
-    # Define periods to generate
-    periods = [
-        {'name': '1week', 'days': 7, 'label': '1 Minggu'},
-        {'name': '1month', 'days': 30, 'label': '1 Bulan'},
-        {'name': '3month', 'days': 90, 'label': '3 Bulan'},
-        {'name': '6month', 'days': 180, 'label': '6 Bulan'}
-    ]
+def stock_windows(stock_data, periods, last_price=None, cache=None, include_default=True):
+    """Window per periode satu saham (+ 'broker_data' = 180 hari untuk file default)"""
+    windows = {}
+    for period in periods:
+        # Saham dengan hari lebih sedikit dari periode: pakai semua data yang ada
+        days = min(len(stock_data['daily']), period['days'])
+        windows[period['name']] = filter_data_by_period(stock_data, days, last_price, cache)
+    if include_default:
+        windows['broker_data'] = filter_data_by_period(stock_data, 180, last_price, cache)
+    return windows
+
+def new_analytics_cache(cache_dir=None):
+    """AnalyticsCache dengan versi = hash kode analytics (cache disk lama otomatis tidak terpakai)"""
+    return AnalyticsCache(cache_dir=cache_dir, version=source_version(
+        os.path.abspath(__file__),
+        *(os.path.join(os.path.dirname(os.path.abspath(__file__)), name) for name in ANALYTICS_SOURCES)))
+
+def parse_periods(spec):
+    """
+    '1week,45,broker_data' -> (periods, broker_data). Selain nama PERIODS,
+    angka hari ('45', '45d', '45day') = periode custom -> file 45day.json
+    """
+    by_name = {p['name']: p for p in PERIODS}
+    periods = []
+    broker_data = False
+    for token in spec.split(','):
+        token = token.strip().lower()
+        if not token:
+            continue
+        if token == 'broker_data':
+            broker_data = True
+            continue
+        period = by_name.get(token)
+        if period is None:
+            digits = token[:-3] if token.endswith('day') else token[:-1] if token.endswith('d') else token
+            if not digits.isdigit() or int(digits) <= 0:
+                raise ValueError(f"Unknown period '{token}' (use {', '.join(by_name)}, broker_data or a day count)")
+            days = int(digits)
+            period = {'name': f'{days}day', 'days': days, 'label': f'{days} Hari'}
+        if period not in periods:
+            periods.append(period)
+    if not periods and not broker_data:
+        raise ValueError("No periods selected")
+    periods.sort(key=lambda p: p['days'])
+    return periods, broker_data
+
+def parse_formats(spec):
+    """'full,lite' -> tuple format (urutan OUTPUT_FORMATS)"""
+    selected = {token.strip().lower() for token in spec.split(',') if token.strip()}
+    unknown = selected - set(OUTPUT_FORMATS)
+    if unknown or not selected:
+        raise ValueError(f"Unknown output format: {', '.join(sorted(unknown)) or spec!r} "
+                         f"(choose from {', '.join(OUTPUT_FORMATS)})")
+    return tuple(f for f in OUTPUT_FORMATS if f in selected)
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate period JSON files from broker CSV exports')
+    parser.add_argument('--input', default=None,
+                        help=f'Analisis folder with one sub-folder per stock (default: {DEFAULT_BASE_PATH})')
+    parser.add_argument('--output', default=None,
+                        help=f'Output folder for the period JSONs (default: {DEFAULT_OUTPUT_PATH})')
+    parser.add_argument('--stocks', default=None,
+                        help='Comma-separated stock codes to regenerate (e.g. BBTN,ANTM). Other stocks '
+                             'already in the output files are kept as they are')
+    parser.add_argument('--periods', default=None,
+                        help='Comma-separated periods to write: ' + ', '.join(p['name'] for p in PERIODS)
+                             + ', broker_data, or a day count for a custom period (45 -> 45day.json). '
+                             'Default: all standard periods + broker_data')
+    parser.add_argument('--only-changed', action='store_true',
+                        help=f'Skip stocks whose CSV inputs are unchanged since they were last written to '
+                             f'every selected period file (<output>/{INPUTS_STATE_FILE})')
+    parser.add_argument('--formats', default=','.join(OUTPUT_FORMATS),
+                        help='Outputs to write: full (period JSON + delta + manifest), lite (lite_<period>.json), '
+                             'screener (screener index + alerts), index (broker_index/leaderboard). '
+                             'Default: all')
+    parser.add_argument('--universe', default='all',
+                        help="Stocks to process: all (default), top:N (by TopStok TVal) or top:N:tfrq. "
+                             "Deferred stocks keep their previous entries in the outputs")
+    parser.add_argument('--topstok', default=None,
+                        help='TopStok snapshot used for universe selection and ordering '
+                             '(default: <output>/TopStok/topstok.csv)')
+    parser.add_argument('--backup', action='store_true',
+                        help='Snapshot dashboard.html and the period JSONs into the '
+                             'content-addressed backup store after generation')
+    parser.add_argument('--topstok-store', default=None,
+                        help='TopStok time-series store (topstok_store.py); latest session '
+                             'last prices replace the whale buyavg proxy for lastPrice')
+    parser.add_argument('--recent', type=int, default=None, metavar='DAYS',
+                        help='Short-horizon refresh: read only the last DAYS files per stock '
+                             '(+1 differencing base) and write only periods of at most DAYS days. '
+                             'Earlier days come from the flows cache (stocks without one are read '
+                             'in full); flows cache and broker index are left untouched')
+    parser.add_argument('--slice', default='all',
+                        help="Export slice: all (default) or dimension=value pairs such as board=RG or "
+                             "investor=Foreign,board=RG. A non-default slice writes its own files "
+                             "(1week.board-rg.json, ...) and never the default outputs or broker index")
+    parser.add_argument('--no-resume', action='store_true',
+                        help='Ignore per-stock checkpoints left by an interrupted run '
+                             '(<output>/checkpoint) and process every stock again')
+    def chart_points(value):
+        points = int(value)
+        if points < MIN_CHART_POINTS:
+            raise argparse.ArgumentTypeError(f"must be at least {MIN_CHART_POINTS}")
+        return points
+
+    parser.add_argument('--chart-points', type=chart_points, default=DEFAULT_CHART_POINTS,
+                        help='Point budget of the downsampled chart series in lite_<period>.json '
+                             f'(default {DEFAULT_CHART_POINTS}, minimum {MIN_CHART_POINTS})')
+    parser.add_argument('--alert-rules', default=None,
+                        help='Signal-transition rules for alerts/events.jsonl '
+                             '(default: alert_rules.json next to this script, else built-in rules)')
+    parser.add_argument('--analytics-cache', default=None,
+                        help='Directory for the on-disk analytics cache shared across runs '
+                             '(identical windows are always memoized in memory)')
+    return parser.parse_args(argv)
+
+def prepare_run(args, base_path, output_path):
+    """
+    Parameter run dari argumen CLI: periode, universe (urut likuiditas), slice,
+    last price. Returns: dict atau None (error sudah dicetak)
+    """
+    try:
+        periods, broker_data = parse_periods(args.periods) if args.periods else (PERIODS, True)
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
+    if args.recent is not None:
+        all_periods = periods
+        periods = [p for p in periods if p['days'] <= args.recent]
+        broker_data = broker_data and args.recent >= 180
+        if not periods and not broker_data:
+            print(f"Error: --recent {args.recent} is shorter than every period "
+                  f"({', '.join(p['name'] for p in all_periods)})")
+            return None
 
     try:
         stock_folders = [d for d in os.listdir(base_path)
                         if os.path.isdir(os.path.join(base_path, d))]
     except FileNotFoundError:
         print(f"Base path not found: {base_path}")
-        return
-
-    # STEP 1: Process all stocks with FULL data first
-    print("=" * 60)
-    print("STEP 1: Processing all stock data (full period)...")
-    print("=" * 60)
+        return None
 
-    stocks_data_full = {}
-    for stock_code in sorted(stock_folders):
-        print(f"Processing {stock_code}...")
-        stock_data = process_stock_folder(stock_code, base_path)
-        if stock_data:
-            stocks_data_full[stock_code] = stock_data
-            print(f"  Date range: {stock_data['date_start']} to {stock_data['date_end']}")
-            print(f"  Total days: {len(stock_data['daily'])}")
+    try:
+        slice_dims = parse_slice(args.slice)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
+    if slice_dims:
+        print(f"[*] Export slice: {slice_label(slice_dims)}")
 
-    print(f"\n[OK] Processed {len(stocks_data_full)} stocks with full data")
+    available = {d.upper(): d for d in stock_folders}
 
-    # STEP 2: Generate JSON for each period
-    print("\n" + "=" * 60)
-    print("STEP 2: Generating period-specific JSON files...")
-    print("=" * 60)
-
-    for period in periods:
-        print(f"\n[*] Generating {period['label']} data ({period['days']} days)...")
+    # Universe selection + liquidity ordering (TopStok TVal/TFrq)
+    topstok_path = args.topstok or os.path.join(output_path, 'TopStok', 'topstok.csv')
+    snapshot = load_topstok(topstok_path) if os.path.exists(topstok_path) else None
+    try:
+        stock_folders, deferred = select_universe(stock_folders, snapshot, args.universe)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
+    if deferred:
+        print(f"[*] Universe {args.universe}: {len(stock_folders)} stocks, {len(deferred)} deferred "
+              f"(previous entries kept)")
+
+    # --stocks: hanya saham ini yang dihitung ulang (urutan likuiditas dipertahankan).
+    # Saham deferred tetap bagian dari universe (broker index dari flows cache,
+    # urutan sama dengan run --universe all)
+    universe = order_by_liquidity(stock_folders + deferred, snapshot) if deferred else stock_folders
+    if args.stocks:
+        requested = [code.strip().upper() for code in args.stocks.split(',') if code.strip()]
+        missing = [code for code in requested if code not in available]
+        if missing:
+            print(f"Error: stock folder not found in {base_path}: {', '.join(missing)}")
+            return None
+        wanted = {available[code] for code in requested}
+        stock_folders = [d for d in universe if d in wanted] + sorted(wanted - set(universe))
 
-        stocks_data_period = {}
+    last_prices = {}
+    if args.topstok_store:
+        session_date = current_session_date(args.topstok_store)
+        if session_date:
+            last_prices = open_session(args.topstok_store, session_date).latest_prices()
+            print(f"[*] Using TopStok last prices from session {session_date} ({len(last_prices)} stocks)")
 
-        for stock_code, stock_data in stocks_data_full.items():
-            # Skip if not enough days for this period
-            if len(stock_data['daily']) < period['days']:
-                # Use available data
-                filtered_data = filter_data_by_period(stock_data, len(stock_data['daily']))
-            else:
-                filtered_data = filter_data_by_period(stock_data, period['days'])
+    return {
+        'periods': periods,
+        'stocks': stock_folders,
+        'universe': universe,
+        # Run parsial: hanya run['stocks'] yang diganti di file periode; saham
+        # deferred (--universe top:N) tidak dihapus dari output
+        'partial': bool(args.stocks) or args.only_changed or bool(deferred),
+        'formats': formats,
+        'slice_dims': slice_dims,
+        'last_prices': last_prices,
+        'max_days': args.recent,
+        'write_default': broker_data,
+        'chart_points': args.chart_points,
+        # Path rules alert disimpan di manifest (dipakai ulang oleh intraday.py)
+        'alert_rules': os.path.abspath(args.alert_rules) if args.alert_rules else None
+    }
 
+def results_signature(run, code_version):
+    """Signature parameter yang menentukan hasil per saham (checkpoint / work queue)"""
+    return run_signature(
+        periods=[p['name'] for p in run['periods']],
+        broker_data=run['write_default'],
+        recent=run['max_days'],
+        slice=slice_label(run['slice_dims']),
+        code=code_version,
+        registry=source_version(DEFAULT_REGISTRY_FILE)
+    )
+
+def compute_stock_record(stock_code, base_path, run, flows_dir=None, cache=None):
+    """
+    Hasil satu saham untuk assembly: (record, flows) atau (None, None).
+    record = {date_start, date_end, days, windows: {periode: data}}
+    """
+    stock_data = process_stock_folder(stock_code, base_path, flows_dir, run['max_days'], run['slice_dims'])
+    if not stock_data:
+        return None, None
+    record = {
+        'date_start': stock_data['date_start'],
+        'date_end': stock_data['date_end'],
+        'days': len(stock_data['daily']),
+        'windows': stock_windows(stock_data, run['periods'], run['last_prices'].get(stock_code),
+                                 cache, run['write_default'])
+    }
+    return record, stock_data['_flows']
+
+def input_key(run, code_version):
+    """Bagian token input yang sama untuk semua saham satu run"""
+    return run_signature(
+        recent=run['max_days'],
+        slice=slice_label(run['slice_dims']),
+        code=code_version,
+        registry=source_version(DEFAULT_REGISTRY_FILE)
+    )
+
+def input_token(key, inputs, last_price):
+    """Token input satu saham (--only-changed): file CSV + last price + input_key"""
+    return run_signature(key=key, inputs=inputs, last_price=last_price)
+
+def load_inputs_state(output_path):
+    """{file periode: {saham: token input}} dari run sebelumnya"""
+    path = os.path.join(output_path, INPUTS_STATE_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            pass
+    return {}
+
+def save_inputs_state(output_path, state):
+    path = os.path.join(output_path, INPUTS_STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def period_filename(name, slice_dims=None):
+    """'1week' -> '1week.json'; slice non-default -> '1week.board-rg.json' (file default tidak ditimpa)"""
+    return f"{name}.{slice_key(slice_dims)}.json" if slice_dims else f"{name}.json"
+
+def output_filenames(run):
+    """File periode yang ditulis run ini"""
+    names = [p['name'] for p in run['periods']] + (['broker_data'] if run['write_default'] else [])
+    return [period_filename(name, run['slice_dims']) for name in names]
+
+def builds_index(run):
+    """Broker index/leaderboard (+ korelasi) hanya dari run penuh slice default"""
+    return run['max_days'] is None and not run['slice_dims'] and 'index' in run['formats']
+
+def is_up_to_date(inputs_state, run, stock_code, token):
+    """Token saham sama di semua file periode yang dipilih (--only-changed)"""
+    return all(inputs_state.get(filename, {}).get(stock_code) == token for filename in output_filenames(run))
+
+def universe_tensor(run, flows_by_stock, flows_dir):
+    """
+    Run parsial: broker index tetap mencakup seluruh universe (urutan sama
+    dengan run penuh) - flows saham yang tidak diproses diambil dari flows
+    cache. Returns: FootprintTensor atau None untuk slice non-default (flows
+    cache hanya berisi slice default; lihat builds_index)
+    """
+    if run['slice_dims']:
+        print("[*] Partial run with an export slice: broker index left untouched")
+        return None
+    tensor = FootprintTensor()
+    extra = [code for code in flows_by_stock if code not in run['universe']]
+    for stock_code in list(run['universe']) + extra:
+        flows = flows_by_stock[stock_code] if stock_code in flows_by_stock else load_flows(stock_code, flows_dir)
+        if flows is not None:
+            tensor.update_stock(flows)
+    return tensor
+
+def write_run_outputs(output_path, run, windows_by_stock, tensor=None, alert_rules=None, input_tokens=None):
+    """
+    STEP 2/3: broker index, file periode (+ screener index, alert transisi,
+    versi lite), broker_data.json dan manifest dari window per saham.
+    Run parsial (run['partial']): saham di run['stocks'] diganti/dihapus di
+    file periode yang sudah ada, saham lain dipakai apa adanya.
+    input_tokens: {saham: token} untuk --only-changed run berikutnya
+    """
+    periods = run['periods']
+    slice_dims = run['slice_dims']
+    if alert_rules is None:
+        alert_rules = load_alert_rules(run.get('alert_rules'))
+    chart_points = run.get('chart_points', DEFAULT_CHART_POINTS)
+    formats = run.get('formats', OUTPUT_FORMATS)
+    replace = set(run['stocks']) if run.get('partial') else None
+    input_tokens = input_tokens or {}
+
+    # Broker footprint index + leaderboard (broker x saham x hari); selalu
+    # semua periode standar walaupun --periods hanya memilih sebagian. Slice
+    # non-default tidak pernah menimpa index slice default
+    if tensor is not None and 'index' in formats and not slice_dims:
+        index_periods = PERIODS + [p for p in periods if p not in PERIODS]
+        write_footprint_outputs(tensor, output_path, [(p['name'], p['days']) for p in index_periods], get_broker_name)
+        print("[OK] Saved broker_index.json and broker_leaderboard.json")
+
+        # Korelasi whale flow antar saham dari flows cache; incremental - saham
+        # yang tidak berubah tidak dihitung ulang
+        registry = get_registry()
+        result = update_correlation(output_path, os.path.join(output_path, 'flows'),
+                                    registry, registry.mask(CAT_WHALE))
+        if result is not None:
+            print(f"[OK] Saved {CORRELATION_FILE} ({len(result['changed'])} stocks changed)")
+
+    # Manifest (hash per file & per saham) + delta feeds vs previous outputs
+    manifest = load_manifest(output_path)
+    inputs_state = load_inputs_state(output_path)
+
+    def publish(filename, label, days, window_key):
+        """Tulis satu file periode + turunannya. Returns: (jumlah saham, jumlah berubah)"""
+        previous = None
+        stocks = {}
+        if replace is not None:
+            previous = read_output(os.path.join(output_path, filename))
+            if previous[0] is not None:
+                stocks = {code: s for code, s in previous[0].get('stocks', {}).items() if code not in replace}
+        for stock_code, windows in windows_by_stock.items():
+            filtered_data = windows.get(window_key)
             if filtered_data:
-                stocks_data_period[stock_code] = filtered_data
+                stocks[stock_code] = filtered_data
 
-        # Generate JSON for this period
         output = {
             'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'period': period['label'],
-            'days': period['days'],
-            'stocks': stocks_data_period
+            'period': label,
+            'days': days,
+            'stocks': {code: stocks[code] for code in sorted(stocks)}
         }
+        if slice_dims:
+            output = {'slice': slice_label(slice_dims), **output}
+
+        changed = sorted(replace) if replace is not None else None
+        source_hash = None
+        if 'full' in formats:
+            entry = write_output_with_delta(output_path, filename, output, manifest, previous)
+            changed, source_hash = entry['changed'], entry['hash']
+            old_tokens = inputs_state.get(filename, {})
+            tokens = {}
+            for code in output['stocks']:
+                if code in windows_by_stock or (replace is not None and code in replace):
+                    token = input_tokens.get(code)
+                else:
+                    token = old_tokens.get(code)
+                if token:
+                    tokens[code] = token
+            inputs_state[filename] = tokens
+        if 'screener' in formats:
+            write_index_with_alerts(output_path, filename, output, changed if 'full' in formats else None,
+                                    alert_rules)
+        if 'lite' in formats:
+            write_lite(output_path, filename, output, source_hash, chart_points, changed)
+        return len(output['stocks']), changed
 
-        filename = f"{period['name']}.json"
-        filepath = os.path.join(output_path, filename)
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
+    # STEP 2: Generate JSON for each period
+    print("\n" + "=" * 60)
+    print("STEP 2: Generating period-specific JSON files...")
+    print("=" * 60)
 
-        print(f"  [OK] Saved to {filename} ({len(stocks_data_period)} stocks)")
+    for period in periods:
+        print(f"\n[*] Generating {period['label']} data ({period['days']} days)...")
+        filename = period_filename(period['name'], slice_dims)
+        count, changed = publish(filename, period['label'], period['days'], period['name'])
+        changed_note = f", {len(changed)} changed" if 'full' in formats else ""
+        print(f"  [OK] Saved to {filename} ({count} stocks{changed_note})")
 
     # STEP 3: Also save the default broker_data.json (alias to 6month)
-    print(f"\n[*] Generating broker_data.json (alias to 6month)...")
-
-    # Use 6month data as default
-    six_month_data = {
-        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'period': '6 Bulan (Default)',
-        'days': 180,
-        'stocks': {}
-    }
+    if run['write_default']:
+        filename = period_filename('broker_data', slice_dims)
+        print(f"\n[*] Generating {filename} (alias to 6month)...")
+        count, _ = publish(filename, '6 Bulan (Default)', 180, 'broker_data')
+        print(f"  [OK] Saved to {filename} ({count} stocks)")
+
+    if 'full' in formats:
+        manifest['generated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        manifest['alert_rules'] = run.get('alert_rules')
+        save_manifest(output_path, manifest)
+        save_inputs_state(output_path, inputs_state)
+    return manifest
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Path absolut: fingerprint input (--only-changed) sama dengan work_queue
+    base_path = os.path.abspath(args.input or DEFAULT_BASE_PATH)
+    output_path = args.output or DEFAULT_OUTPUT_PATH
+
+    run = prepare_run(args, base_path, output_path)
+    if run is None:
+        return
+    periods = run['periods']
 
-    for stock_code, stock_data in stocks_data_full.items():
-        filtered_data = filter_data_by_period(stock_data, 180)
-        if filtered_data:
-            six_month_data['stocks'][stock_code] = filtered_data
+    try:
+        alert_rules = load_alert_rules(args.alert_rules)
+    except ValueError as e:
+        print(f"Error: alert rules: {e}")
+        return
 
-    default_filepath = os.path.join(output_path, 'broker_data.json')
-    with open(default_filepath, 'w', encoding='utf-8') as f:
-        json.dump(six_month_data, f, indent=2, ensure_ascii=False)
+    # STEP 1: Process all stocks with FULL data first
+    print("=" * 60)
+    print("STEP 1: Processing all stock data (full period)...")
+    print("=" * 60)
+
+    flows_dir = os.path.join(output_path, 'flows')
+
+    # Window identik (6month/broker_data, saham < 30 hari) dihitung sekali
+    analytics_cache = new_analytics_cache(args.analytics_cache)
+
+    # Checkpoint per saham: run yang terputus dilanjutkan dari saham terakhir yang selesai
+    checkpoint = RunCheckpoint(os.path.join(output_path, 'checkpoint'),
+                               results_signature(run, analytics_cache.version))
+    if args.no_resume:
+        checkpoint.finish()
+
+    # --only-changed: token input per saham dibandingkan dengan run sebelumnya
+    token_key = input_key(run, analytics_cache.version)
+    inputs_state = load_inputs_state(output_path) if args.only_changed else None
+
+    windows_by_stock = {}
+    input_tokens = {}
+    processed = []
+    flows_by_stock = {}
+    tensor = FootprintTensor() if builds_index(run) else None
+    for stock_code in run['stocks']:
+        last_price = run['last_prices'].get(stock_code)
+        inputs = inputs_fingerprint(scan_stock_folder(os.path.join(base_path, stock_code)))
+        token = input_token(token_key, inputs, last_price)
+        if inputs_state is not None and is_up_to_date(inputs_state, run, stock_code, token):
+            continue
+        print(f"Processing {stock_code}...")
+        processed.append(stock_code)
+        input_tokens[stock_code] = token
 
-    print(f"  [OK] Saved to broker_data.json ({len(six_month_data['stocks'])} stocks)")
+        record = checkpoint.load(stock_code, inputs, last_price)
+        if record is not None:
+            print("  Resumed from checkpoint")
+            flows = record['_flows']
+        else:
+            record, flows = compute_stock_record(stock_code, base_path, run, flows_dir, analytics_cache)
+            if record is None:
+                continue
+            checkpoint.save(stock_code, inputs, last_price, record, flows)
+
+        windows_by_stock[stock_code] = record['windows']
+        if tensor is not None and run['partial']:
+            flows_by_stock[stock_code] = flows
+        elif tensor is not None:
+            tensor.update_stock(flows)
+        print(f"  Date range: {record['date_start']} to {record['date_end']}")
+        print(f"  Total days: {record['days']}")
+
+    print(f"\n[OK] Processed {len(windows_by_stock)} stocks with full data"
+          + (f" ({checkpoint.resumed} from checkpoint)" if checkpoint.resumed else ""))
+
+    if run['partial']:
+        skipped = len(run['stocks']) - len(processed)
+        if skipped:
+            print(f"[*] {skipped} stocks unchanged since the last run, skipped")
+        if not processed:
+            checkpoint.finish()
+            print("[OK] Outputs are up to date")
+            return
+        run = dict(run, stocks=processed)
+        if tensor is not None:
+            tensor = universe_tensor(run, flows_by_stock, flows_dir)
+
+    write_run_outputs(output_path, run, windows_by_stock, tensor, alert_rules, input_tokens)
+
+    # Manifest sudah ditulis: semua output final, checkpoint dibuang
+    checkpoint.finish()
+
+    stats = analytics_cache.stats()
+    print(f"[*] Analytics cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, {stats['misses']} computed")
 
     print("\n" + "=" * 60)
-    print("[DONE] ALL DONE! Generated files:")
-    print("   - 1week.json   (1 Minggu / 7 hari)")
-    print("   - 1month.json  (1 Bulan / 30 hari)")
-    print("   - 3month.json  (3 Bulan / 90 hari)")
-    print("   - 6month.json  (6 Bulan / 180 hari)")
-    print("   - broker_data.json (default, 6 bulan)")
+    print("[DONE] ALL DONE! Generated files:"
+          + ("" if run['formats'] == OUTPUT_FORMATS else f" (formats: {', '.join(run['formats'])})"))
+    for period in periods:
+        print(f"   - {period_filename(period['name'], run['slice_dims']):<13} ({period['label']} / {period['days']} hari)")
+    if run['write_default']:
+        print(f"   - {period_filename('broker_data', run['slice_dims'])} (default, 6 bulan)")
     print("=" * 60)
 
+    if args.backup:
+        name, stats = create_snapshot(output_path, os.path.join(output_path, 'backups'), label='generate_data')
+        print(f"[OK] Backup snapshot {name}: {stats['full']} full, {stats['delta']} delta, "
+              f"{stats['dedup']} unchanged ({stats['bytes'] / 1024:.1f} KB written)")
+
 if __name__ == '__main__':
     main()
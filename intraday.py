@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Intraday recompute untuk satu saham.
+
+Selama jam bursa CSV kumulatif beberapa saham di-export ulang berkali-kali.
+Daripada menjalankan generate_data.main() untuk semua saham dan semua periode,
+mode ini hanya memproses satu file:
+
+1. load flows per variant dari cache (<output>/flows/variants/, ditulis generator)
+2. differencing ulang hari terakhir saja di variant export file ini (header
+   Investor/Board/Mode; replace jika tanggal sama, append jika tanggal baru -
+   lihat broker_flows.update_day), lalu slice default digabung ulang
+   (export_slices.slice_flows) dan disimpan ke <output>/flows/<CODE>.json
+3. baris daily hanya diagregasi untuk hari yang berubah: baris dan total
+   berjalan hari sebelumnya diambil dari state window per saham
+   (<output>/flows/intraday/<CODE>.json); lalu filter_data_by_period untuk
+   setiap periode (window yang identik dihitung sekali)
+4. ganti potongan teks saham tersebut di file periode + delta + manifest
+   (delta_feed.patch_output, saham lain tidak di-parse; push_server.py
+   langsung mengirim update ke dashboard); baris screener index, transisi
+   sinyal (alerts.py) dan baris lite_<periode>.json juga hanya untuk saham ini
+5. token input saham di inputs.json diperbarui, jadi generate_data
+   --only-changed berikutnya tidak memproses ulang saham ini
+
+Rules alert: --alert-rules, default path yang dipakai run generate_data
+terakhir (manifest.json 'alert_rules').
+
+Usage:
+    python intraday.py <Analisis/CODE/MONYY/DD.csv> [--output DIR] [--stock CODE]
+                       [--topstok-store DIR] [--alert-rules FILE]
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+
+from broker_flows import new_flows, save_flows, update_day, broker_mask, aggregate_daily, new_totals
+from broker_registry import CAT_WHALE
+from delta_feed import load_manifest, save_manifest, read_output, write_output_with_delta, patch_output
+from generate_data import (PERIODS, extract_date_from_path, filter_data_by_period, get_registry,
+                           format_date_for_display, read_csv_file_cumulative, scan_stock_folder,
+                           new_analytics_cache, input_key, input_token, load_inputs_state, save_inputs_state)
+from export_slices import DEFAULT_VARIANT, DIMENSIONS, variant_key, slice_flows, load_variant_flows, save_variant_flows
+from analytics_cache import flows_version
+from concentration import ConcentrationIndex
+from streaks import StreakIndex
+from records import compact_rows
+from checkpoint import inputs_fingerprint
+from alerts import load_rules as load_alert_rules, write_index_with_alerts, patch_index_with_alerts
+from rollups import write_lite, patch_lite
+from topstok_store import open_session, current_session_date
+
+# State window per saham (baris daily + total berjalan): <flows>/intraday/<CODE>.json
+STATE_DIR = 'intraday'
+
+
+def stock_code_from_path(file_path):
+    """Analisis/<CODE>/<MONYY>/<DD>.csv -> CODE"""
+    return os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(file_path)))).upper()
+
+
+def period_targets(periods=PERIODS):
+    """(filename, days) untuk semua file periode + broker_data.json (alias 6 bulan)"""
+    return [(f"{p['name']}.json", p['days']) for p in periods] + [('broker_data.json', 180)]
+
+
+def stock_input_token(csv_files, last_price, code_version):
+    """Token input saham seperti run generate_data default (tanpa --recent / --slice)"""
+    key = input_key({'max_days': None, 'slice_dims': {}}, code_version)
+    return input_token(key, inputs_fingerprint(csv_files), last_price)
+
+
+def _state_path(flows_dir, stock_code):
+    return os.path.join(flows_dir, STATE_DIR, f'{stock_code}.json')
+
+
+def load_window_state(flows_dir, stock_code):
+    path = _state_path(flows_dir, stock_code)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def save_window_state(flows_dir, stock_code, state):
+    path = _state_path(flows_dir, stock_code)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(state, separators=(',', ':')))
+    os.replace(tmp_path, path)
+
+
+def window_source(stock_code, flows, flows_dir, code_version, keep=0, old_version=None):
+    """
+    stock_data minimal untuk filter_data_by_period (daily + index
+    konsentrasi/streak), tanpa analytics histori penuh build_stock_data.
+
+    keep: jumlah hari awal yang tidak berubah sejak update sebelumnya. Jika
+    state (<flows>/intraday/<CODE>.json) dibuat dari flows versi old_version,
+    baris daily dan total berjalan hari-hari itu diambil dari state, jadi
+    hanya hari sesudahnya yang diagregasi (broker_flows.aggregate_daily).
+    """
+    registry = get_registry()
+    column_mask = broker_mask(flows, registry.mask(CAT_WHALE), registry)
+    n_days = len(flows['dates'])
+
+    state = load_window_state(flows_dir, stock_code) if old_version else None
+    if state is None or state.get('version') != old_version or state.get('code') != code_version \
+            or keep not in (len(state['daily']), len(state['daily']) - 1):
+        keep = 0
+    if keep == 0:
+        daily, totals = [], new_totals()
+    else:
+        daily = state['daily'][:keep]
+        totals = state['totals'] if keep == len(state['daily']) else state['totals_prev']
+
+    if keep < n_days - 1:
+        rows, totals = aggregate_daily(flows, column_mask, keep, n_days - 1, totals)
+        daily += rows
+    totals_prev = {g: dict(t) for g, t in totals.items()}
+    rows, totals = aggregate_daily(flows, column_mask, n_days - 1, n_days, totals)
+    daily += rows
+
+    version = flows_version(flows, column_mask)
+    save_window_state(flows_dir, stock_code, {
+        'code': code_version, 'version': version, 'daily': daily, 'totals_prev': totals_prev, 'totals': totals
+    })
+    return {
+        'code': stock_code,
+        'daily': compact_rows(daily),
+        '_version': version,
+        '_concentration': ConcentrationIndex(flows, column_mask),
+        '_streaks': StreakIndex(flows, column_mask, registry, [d['whale_net'] for d in daily])
+    }
+
+
+def recompute_stock(file_path, output_path, stock_code=None, flows_dir=None, last_price=None, periods=PERIODS,
+                    alert_rules=None):
+    """
+    Proses ulang satu file CSV intraday dan update file periode.
+    alert_rules: path rules (default: path dari manifest run terakhir)
+    Returns: dict {code, date, variant, action, changed (filenames), ms}
+    """
+    started = time.perf_counter()
+    if not os.path.isfile(file_path):
+        raise ValueError(f"File not found: {file_path}")
+    stock_code = (stock_code or stock_code_from_path(file_path)).upper()
+    flows_dir = flows_dir or os.path.join(output_path, 'flows')
+
+    variants = load_variant_flows(stock_code, flows_dir, None)
+    if variants is None:
+        raise ValueError(f"No cached flows for {stock_code} in {flows_dir} - run generate_data.py first")
+
+    date_str = extract_date_from_path(file_path, os.path.basename(os.path.dirname(file_path)))
+    if not date_str:
+        raise ValueError(f"Cannot determine date from path: {file_path}")
+    cum_data = read_csv_file_cumulative(file_path)
+    cum_data['date_start'] = date_str
+    cum_data['date_display'] = format_date_for_display(date_str)
+
+    # Differencing di dalam variant export file ini (header), bukan di slice
+    # default: export Foreign/RG tidak pernah menggantikan hari variant All
+    variant = cum_data.get('variant', DEFAULT_VARIANT)
+    key = variant_key(variant)
+    _, vflows = variants.get(key) or (variant, new_flows(stock_code))
+    registry = get_registry()
+    # Slice default = flows variant ini saja: hari sebelum hari terakhir tidak berubah
+    single = list(variants) == [key]
+    old_version = flows_version(vflows, broker_mask(vflows, registry.mask(CAT_WHALE), registry)) if single else None
+    n_old = len(vflows['dates'])
+    action = update_day(vflows, cum_data)
+    variants[key] = (variant, vflows)
+
+    stock_path = os.path.dirname(os.path.dirname(os.path.abspath(file_path)))
+    csv_files = scan_stock_folder(stock_path)
+    save_variant_flows(stock_code, variants, flows_dir, inputs_fingerprint(csv_files), keys=(key,))
+    flows = slice_flows(stock_code, variants, {})
+    save_flows(flows, flows_dir)
+
+    code_version = new_analytics_cache().version
+    keep = n_old - 1 if action == 'replaced' else n_old
+    stock_data = window_source(stock_code, flows, flows_dir, code_version, keep, old_version)
+    n_days = len(stock_data['daily'])
+
+    manifest = load_manifest(output_path)
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    alert_rules = load_alert_rules(alert_rules or manifest.get('alert_rules'))
+    inputs_state = load_inputs_state(output_path)
+    token = stock_input_token(csv_files, last_price, code_version)
+    windows = {}
+    encoded = {}
+    changed = []
+    for filename, days in period_targets(periods):
+        key = min(days, n_days)
+        if key not in windows:
+            windows[key] = filter_data_by_period(stock_data, key, last_price)
+        stock = windows[key] or None
+
+        # Hanya potongan teks saham ini yang diganti (file lain tidak di-parse)
+        patched = patch_output(output_path, filename, stock_code, stock, manifest, {'generated_at': generated_at},
+                               encoded)
+        if patched is None:
+            output = rewrite_output(output_path, filename, stock_code, stock, manifest, generated_at)
+            if output is None:
+                # File periode belum ada: tidak bisa dibuat dari satu saham saja
+                continue
+            entry, meta = manifest['files'][filename], {k: v for k, v in output.items() if k != 'stocks'}
+        else:
+            entry, meta = patched
+            output = None
+
+        tokens = inputs_state.setdefault(filename, {})
+        if stock is not None:
+            tokens[stock_code] = token
+        else:
+            tokens.pop(stock_code, None)
+        if entry['changed']:
+            changed.append(filename)
+            if output is None and patch_index_with_alerts(output_path, filename, meta, stock_code, stock,
+                                                          entry['changed'], alert_rules) is not None \
+                    and patch_lite(output_path, filename, meta, stock_code, stock, entry['hash']) is not None:
+                continue
+            output = output or read_output(os.path.join(output_path, filename))[0]
+            write_index_with_alerts(output_path, filename, output, entry['changed'], alert_rules)
+            write_lite(output_path, filename, output, entry['hash'], changed=entry['changed'])
+
+    manifest['generated_at'] = generated_at
+    save_manifest(output_path, manifest)
+    save_inputs_state(output_path, inputs_state)
+
+    return {
+        'code': stock_code,
+        'date': date_str,
+        'variant': '/'.join(variant[k] for k in DIMENSIONS),
+        'action': action,
+        'changed': changed,
+        'ms': (time.perf_counter() - started) * 1000
+    }
+
+
+def rewrite_output(output_path, filename, stock_code, stock, manifest, generated_at):
+    """Jalur penuh (manifest tidak cocok / format lama): parse file periode, ganti saham, tulis ulang"""
+    output, base_hash, text = read_output(os.path.join(output_path, filename))
+    if output is None:
+        return None
+    new_output = dict(output)
+    new_output['generated_at'] = generated_at
+    stocks = dict(output.get('stocks', {}))
+    if stock is not None:
+        stocks[stock_code] = stock
+    else:
+        stocks.pop(stock_code, None)
+    new_output['stocks'] = {code: stocks[code] for code in sorted(stocks)}
+    write_output_with_delta(output_path, filename, new_output, manifest, (output, base_hash, text))
+    return new_output
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python intraday.py <Analisis/CODE/MONYY/DD.csv> [--output DIR] [--stock CODE] "
+              "[--topstok-store DIR] [--alert-rules FILE]")
+        return
+
+    file_path = sys.argv[1]
+    args = sys.argv[2:]
+    output_path = args[args.index('--output') + 1] if '--output' in args else os.path.dirname(os.path.abspath(__file__))
+    stock_code = args[args.index('--stock') + 1] if '--stock' in args else None
+    store_dir = args[args.index('--topstok-store') + 1] if '--topstok-store' in args else None
+    rules_path = args[args.index('--alert-rules') + 1] if '--alert-rules' in args else None
+
+    last_price = None
+    if store_dir:
+        session_date = current_session_date(store_dir)
+        if session_date:
+            latest = open_session(store_dir, session_date).latest((stock_code or stock_code_from_path(file_path)).upper())
+            last_price = latest['last'] if latest and latest['last'] > 0 else None
+
+    try:
+        result = recompute_stock(file_path, output_path, stock_code, last_price=last_price,
+                                 alert_rules=rules_path and os.path.abspath(rules_path))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"[OK] {result['code']} {result['date']} ({result['variant']}) {result['action']} - "
+          f"{len(result['changed'])} files changed in {result['ms']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
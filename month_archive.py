@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Arsip bulanan untuk export broker (Analisis/<CODE>/<MONYY>/<DD>.csv).
+
+Bulan yang sudah tutup berisi puluhan file kecil per saham; ratusan saham x
+bertahun-tahun = ribuan inode, directory walk dan open/stat. Bulan tutup
+bisa di-pack menjadi satu zip per bulan:
+
+    Analisis/<CODE>/<MONYY>.zip     member: <DD>.csv (ZIP_DEFLATED)
+
+Ingestion (generate_data.scan_stock_folder / read_csv_file_cumulative) membaca
+member langsung dari zip tanpa extract. Path member ditulis seperti path biasa
+di dalam arsip: Analisis/ANTM/JAN26.zip/15.csv. Central directory zip adalah
+index member, jadi baca satu member = satu seek, dan arsip yang sudah dibuka
+dipakai ulang (ZipFile di-cache).
+
+CLI:
+    python month_archive.py pack <Analisis> [--stock CODE] [--keep]
+    python month_archive.py list <Analisis/CODE/MONYY.zip>
+"""
+
+import os
+import io
+import shutil
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+
+ARCHIVE_EXT = '.zip'
+MAX_OPEN_ARCHIVES = 16
+
+_open_archives = OrderedDict()
+
+
+def split_member_path(path):
+    """'.../JAN26.zip/15.csv' -> ('.../JAN26.zip', '15.csv'), path biasa -> (path, None)"""
+    norm = path.replace('\\', '/')
+    marker = ARCHIVE_EXT + '/'
+    i = norm.lower().rfind(marker)
+    if i < 0:
+        return path, None
+    return path[:i + len(ARCHIVE_EXT)], norm[i + len(marker):]
+
+
+def member_path(archive_path, member):
+    return os.path.join(archive_path, member)
+
+
+def open_archive(archive_path):
+    """ZipFile dari cache (LRU kecil, arsip lama ditutup)"""
+    zf = _open_archives.get(archive_path)
+    if zf is not None:
+        _open_archives.move_to_end(archive_path)
+        return zf
+    zf = zipfile.ZipFile(archive_path, 'r')
+    _open_archives[archive_path] = zf
+    while len(_open_archives) > MAX_OPEN_ARCHIVES:
+        _, old = _open_archives.popitem(last=False)
+        old.close()
+    return zf
+
+
+def close_archives():
+    while _open_archives:
+        _, zf = _open_archives.popitem()
+        zf.close()
+
+
+def read_lines(path, encoding='utf-8'):
+    """readlines() untuk file biasa atau member arsip"""
+    archive_path, member = split_member_path(path)
+    if member is None:
+        with open(path, 'r', encoding=encoding) as f:
+            return f.readlines()
+    data = open_archive(archive_path).read(member)
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding).readlines()
+
+
+def list_members(archive_path, suffix='.csv'):
+    """Nama member (dari central directory, tanpa membaca isi)"""
+    return [name for name in open_archive(archive_path).namelist()
+            if name.endswith(suffix) and '/' not in name]
+
+
+def pack_month(month_dir, keep=False):
+    """
+    Pack <month_dir>/*.csv -> <month_dir>.zip, verifikasi isi, lalu hapus folder
+    (kecuali keep). Returns: (archive_path, jumlah file)
+    """
+    files = sorted(f for f in os.listdir(month_dir) if f.endswith('.csv'))
+    if not files:
+        return None, 0
+
+    archive_path = month_dir.rstrip('/\\') + ARCHIVE_EXT
+    tmp_path = archive_path + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        # Member yang sudah ada di arsip lama (pack sebelumnya) ikut dibawa
+        if os.path.exists(archive_path):
+            with zipfile.ZipFile(archive_path, 'r') as old:
+                for name in old.namelist():
+                    if name not in files:
+                        zf.writestr(old.getinfo(name), old.read(name))
+        for name in files:
+            zf.write(os.path.join(month_dir, name), name)
+
+    with zipfile.ZipFile(tmp_path, 'r') as zf:
+        for name in files:
+            with open(os.path.join(month_dir, name), 'rb') as f:
+                if zf.read(name) != f.read():
+                    raise IOError(f"Verification failed for {name} in {tmp_path}")
+
+    # Handle arsip lama yang masih di-cache harus ditutup dulu (Windows menolak replace)
+    zf = _open_archives.pop(archive_path, None)
+    if zf is not None:
+        zf.close()
+    os.replace(tmp_path, archive_path)
+    if not keep:
+        shutil.rmtree(month_dir)
+    return archive_path, len(files)
+
+
+def closed_month_dirs(stock_path, today=None):
+    """Folder bulan yang sudah tutup (sebelum bulan berjalan), urut tanggal"""
+    from generate_data import extract_date_from_path
+
+    current = (today or datetime.now()).strftime('%Y-%m')
+    result = []
+    for name in os.listdir(stock_path):
+        path = os.path.join(stock_path, name)
+        if not os.path.isdir(path):
+            continue
+        date_str = extract_date_from_path(os.path.join(path, '1.csv'), name)
+        if date_str and date_str[:7] < current:
+            result.append((date_str[:7], path))
+    return [path for _, path in sorted(result)]
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ('pack', 'list'):
+        print("Usage:")
+        print("  python month_archive.py pack <Analisis> [--stock CODE] [--keep]")
+        print("  python month_archive.py list <Analisis/CODE/MONYY.zip>")
+        return
+
+    if sys.argv[1] == 'list':
+        zf = open_archive(sys.argv[2])
+        for info in zf.infolist():
+            print(f"{info.filename:<12}{info.file_size:>10,}{info.compress_size:>10,}")
+        return
+
+    base_path = sys.argv[2]
+    args = sys.argv[3:]
+    only = args[args.index('--stock') + 1].upper() if '--stock' in args else None
+    keep = '--keep' in args
+
+    total_files = 0
+    total_archives = 0
+    for stock_code in sorted(os.listdir(base_path)):
+        stock_path = os.path.join(base_path, stock_code)
+        if not os.path.isdir(stock_path) or (only and stock_code != only):
+            continue
+        for month_dir in closed_month_dirs(stock_path):
+            archive_path, count = pack_month(month_dir, keep)
+            if archive_path:
+                total_files += count
+                total_archives += 1
+                print(f"  [OK] {stock_code}/{os.path.basename(archive_path)} ({count} files)")
+
+    print(f"\n[OK] Packed {total_files} files into {total_archives} archives")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Local push server (Server-Sent Events) untuk dashboard.
+
+Generator menulis manifest.json setelah setiap regenerasi (delta_feed.py).
+Server ini mengawasi manifest tersebut dan mengirim event ke semua dashboard
+yang terbuka begitu ada perubahan, jadi dashboard tidak perlu reload atau
+polling setiap file periode:
+
+    event: update
+    data: {"generated_at": ..., "files": {"1week.json": {
+              "hash": <sha256 file baru>,
+              "changed": {"ANTM": <hash saham>, ...},
+              "removed": [...],
+              "delta": {"base_hash": ..., "file": "deltas/1week.json", "size": ...}
+          }, ...}}
+
+Dashboard yang memegang versi dengan hash == delta.base_hash cukup mengambil
+delta, lainnya mengambil file penuh. Server juga melayani file statis dari
+folder output (dashboard.html, *.json, deltas/) sehingga EventSource berjalan
+di origin yang sama.
+
+Usage:
+    python push_server.py [output_dir] [--host 127.0.0.1] [--port 8765]
+    lalu buka http://127.0.0.1:8765/dashboard.html
+"""
+
+import os
+import json
+import asyncio
+from urllib.parse import unquote, urlsplit
+
+POLL_INTERVAL = 0.25
+KEEPALIVE_INTERVAL = 15
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.md': 'text/plain; charset=utf-8',
+}
+
+
+def read_manifest(output_path):
+    path = os.path.join(output_path, 'manifest.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def manifest_changes(old, new):
+    """
+    Bandingkan dua manifest -> event payload (None jika tidak ada file berubah).
+
+    Perbandingan memakai hash per saham, bukan field 'changed' manifest, supaya
+    tetap benar walau server melewatkan beberapa regenerasi.
+    """
+    old_files = (old or {}).get('files', {})
+    files = {}
+    for filename, entry in new.get('files', {}).items():
+        prev = old_files.get(filename, {})
+        if prev.get('hash') == entry.get('hash'):
+            continue
+        prev_stocks = prev.get('stocks', {})
+        stocks = entry.get('stocks', {})
+        info = {
+            'hash': entry.get('hash'),
+            'changed': {c: h for c, h in sorted(stocks.items()) if prev_stocks.get(c) != h},
+            'removed': sorted(c for c in prev_stocks if c not in stocks)
+        }
+        if entry.get('delta'):
+            info['delta'] = entry['delta']
+        files[filename] = info
+
+    if not files:
+        return None
+    return {'generated_at': new.get('generated_at'), 'files': files}
+
+
+def manifest_summary(manifest):
+    """Hash file saat ini (event 'hello' untuk client yang baru connect)"""
+    files = (manifest or {}).get('files', {})
+    return {
+        'generated_at': (manifest or {}).get('generated_at'),
+        'files': {name: entry.get('hash') for name, entry in sorted(files.items())}
+    }
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class PushServer:
+    """HTTP server kecil: /events (SSE) + file statis dari output_path"""
+
+    def __init__(self, output_path, poll_interval=POLL_INTERVAL):
+        self.output_path = os.path.abspath(output_path)
+        self.poll_interval = poll_interval
+        self.clients = set()
+        self.manifest = read_manifest(self.output_path)
+        self._manifest_stat = self._stat_manifest()
+
+    def _stat_manifest(self):
+        try:
+            st = os.stat(os.path.join(self.output_path, 'manifest.json'))
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def broadcast(self, event, data):
+        message = format_event(event, data)
+        for queue in list(self.clients):
+            queue.put_nowait(message)
+
+    async def watch_manifest(self):
+        """Polling stat() manifest (murah) dan broadcast saat berubah"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            stat = self._stat_manifest()
+            if stat is None or stat == self._manifest_stat:
+                continue
+            manifest = read_manifest(self.output_path)
+            if manifest is None:
+                # Sedang ditulis / tidak valid, coba lagi di poll berikutnya
+                continue
+            self._manifest_stat = stat
+            changes = manifest_changes(self.manifest, manifest)
+            self.manifest = manifest
+            if changes:
+                n_stocks = sum(len(f['changed']) for f in changes['files'].values())
+                print(f"[PUSH] {len(changes['files'])} files, {n_stocks} stock updates -> {len(self.clients)} clients")
+                self.broadcast('update', changes)
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while True:
+                line = await reader.readline()
+                if not line or line in (b'\r\n', b'\n'):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2:
+                return
+            method, path = parts[0], urlsplit(parts[1]).path
+
+            if method != 'GET':
+                await self._send(writer, 405, b'Method Not Allowed')
+            elif path == '/events':
+                await self._serve_events(writer)
+            else:
+                await self._serve_file(writer, path)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, body, content_type='text/plain; charset=utf-8'):
+        reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed'}.get(status, '')
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _serve_file(self, writer, path):
+        rel = unquote(path).lstrip('/') or 'dashboard.html'
+        file_path = os.path.abspath(os.path.join(self.output_path, rel))
+        if not file_path.startswith(self.output_path + os.sep) or not os.path.isfile(file_path):
+            await self._send(writer, 404, b'Not Found')
+            return
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        content_type = CONTENT_TYPES.get(os.path.splitext(file_path)[1].lower(), 'application/octet-stream')
+        await self._send(writer, 200, body, content_type)
+
+    async def _serve_events(self, writer):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+            b"retry: 2000\n\n"
+        )
+        writer.write(format_event('hello', manifest_summary(self.manifest)))
+        await writer.drain()
+
+        queue = asyncio.Queue()
+        self.clients.add(queue)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    message = b": keepalive\n\n"
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self.clients.discard(queue)
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"[OK] Push server on http://{host}:{port}/dashboard.html (watching {self.output_path})")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.watch_manifest())
+
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    host = args[args.index('--host') + 1] if '--host' in args else '127.0.0.1'
+    port = int(args[args.index('--port') + 1]) if '--port' in args else 8765
+    positional = [a for i, a in enumerate(args) if not a.startswith('--') and (i == 0 or not args[i - 1].startswith('--'))]
+    output_path = positional[0] if positional else os.path.dirname(os.path.abspath(__file__))
+
+    try:
+        asyncio.run(PushServer(output_path).serve(host, port))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Record ringkas untuk baris daily dan agregat broker.
+
+Setiap baris daily dulu berupa dict 26 key (+ 26 objek float), dan window
+periode semua saham ditahan sampai assembly. Di sini baris satu saham
+disimpan kolom per field:
+
+    RowColumns   {field: array('d') / array('q') / list}  satu per saham
+    Rows         view urutan baris [start, end) ke RowColumns; slice -> Rows
+    Row          view satu baris (__slots__: kolom + index), dibuat saat diakses
+
+Window periode (daily[-N:]) hanya menyimpan satu Rows (3 slot), bukan N
+objek Row, dan agregat window memakai column(rows, field) = slice array.
+
+Row berperilaku seperti dict read-only (get, [], keys, items, in, ==
+terhadap dict) sehingga analytics tetap memakai d.get('whale_buy', 0).
+Tipe nilai dipertahankan persis (kolom int -> 'q', float -> 'd', campuran
+atau string -> list), jadi JSON output identik. Konversi ke dict hanya saat
+serialisasi: json.dumps(..., default=json_default).
+"""
+
+from array import array
+from collections.abc import Mapping, Sequence
+
+
+def _column(values):
+    """array('q') jika semua int, array('d') jika semua float, selain itu list"""
+    kinds = {type(v) for v in values}
+    if kinds == {int}:
+        try:
+            return array('q', values)
+        except OverflowError:
+            return list(values)
+    if kinds == {float}:
+        return array('d', values)
+    return list(values)
+
+
+class RowColumns:
+    """Kolom semua baris satu tabel (urutan field = urutan key dict asal)"""
+    __slots__ = ('fields', 'columns')
+
+    def __init__(self, fields, columns):
+        self.fields = fields
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+
+class Row(Mapping):
+    """Satu baris (view read-only ke RowColumns)"""
+    __slots__ = ('_table', '_i')
+
+    def __init__(self, table, i):
+        self._table = table
+        self._i = i
+
+    def __getitem__(self, key):
+        return self._table.columns[key][self._i]
+
+    def get(self, key, default=None):
+        col = self._table.columns.get(key)
+        return default if col is None else col[self._i]
+
+    def __contains__(self, key):
+        return key in self._table.columns
+
+    def __iter__(self):
+        return iter(self._table.fields)
+
+    def __len__(self):
+        return len(self._table.fields)
+
+    def keys(self):
+        return self._table.fields
+
+    def items(self):
+        i = self._i
+        columns = self._table.columns
+        return [(f, columns[f][i]) for f in self._table.fields]
+
+    def to_dict(self):
+        i = self._i
+        columns = self._table.columns
+        return {f: columns[f][i] for f in self._table.fields}
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            other = other.to_dict()
+        elif not isinstance(other, Mapping):
+            return NotImplemented
+        return self.to_dict() == dict(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Row({self.to_dict()!r})"
+
+
+class Rows(Sequence):
+    """Baris [start, end) sebuah RowColumns (list read-only, slice tanpa copy)"""
+    __slots__ = ('_table', '_start', '_end')
+
+    def __init__(self, table, start=0, end=None):
+        self._table = table
+        self._start = start
+        self._end = len(table) if end is None else end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return Rows(self._table, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Rows index out of range')
+        return Row(self._table, self._start + index)
+
+    def __iter__(self):
+        table = self._table
+        for i in range(self._start, self._end):
+            yield Row(table, i)
+
+    def column(self, field, default=0):
+        """Nilai satu field untuk semua baris (slice array, tanpa objek Row)"""
+        col = self._table.columns.get(field)
+        if col is None:
+            return [default] * len(self)
+        return col[self._start:self._end]
+
+    def to_list(self):
+        return [row.to_dict() for row in self]
+
+    def __eq__(self, other):
+        if isinstance(other, Rows):
+            other = other.to_list()
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return self.to_list() == [dict(r) for r in other]
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Rows({self.to_list()!r})"
+
+
+def column(rows, field, default=0):
+    """rows.column(field) untuk Rows, [r.get(field, default)] untuk list dict"""
+    if isinstance(rows, Rows):
+        return rows.column(field, default)
+    return [r.get(field, default) for r in rows]
+
+
+def compact_rows(rows):
+    """List dict dengan key yang sama -> Rows (satu RowColumns bersama)"""
+    if not rows:
+        return []
+    fields = tuple(rows[0])
+    if any(len(r) != len(fields) or tuple(r) != fields for r in rows):
+        return rows  # key tidak seragam: biarkan dict
+    return Rows(RowColumns(fields, {f: _column([r[f] for r in rows]) for f in fields}))
+
+
+def json_default(obj):
+    """default= untuk json.dumps: Row -> dict, Rows -> list dict"""
+    if isinstance(obj, Row):
+        return obj.to_dict()
+    if isinstance(obj, Rows):
+        return obj.to_list()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
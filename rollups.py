@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Rollup mingguan/bulanan + seri chart yang di-downsample (LTTB).
+
+File periode panjang membawa semua baris daily (26 field per hari) padahal
+chart dashboard cukup dengan beberapa ratus titik. Generator juga menulis
+versi ringan per periode:
+
+    lite_<periode>.json   sama dengan file periode, tetapi per saham:
+                          - 'daily' dihapus, 'days' = jumlah hari asli
+                          - 'chart'   : baris field chart pada index hasil LTTB
+                                        (maksimal --chart-points titik)
+                          - 'rollups' : {'weekly': [...], 'monthly': [...]}
+                          - 'source_hash' (level file) = hash file periode penuh
+                          JSON kompak dengan satu saham per baris, jadi update
+                          intraday (patch_lite) hanya mengganti baris saham itu
+
+Rollup per minggu (ISO) / bulan: jumlah flow, VWAP harga rata-rata
+(whale/retail buy & sell, bobot nilai), high/low proxy harga (semua avg > 0)
+dan posisi kumulatif di akhir periode.
+
+LTTB (Largest-Triangle-Three-Buckets) memilih titik yang paling menjaga bentuk
+seri; index dipilih dari beberapa seri penentu bentuk (CHART_SHAPE_FIELDS)
+lalu digabung supaya semua chart memakai label yang sama.
+"""
+
+import os
+import json
+from datetime import datetime
+
+from records import json_default
+
+DEFAULT_CHART_POINTS = 120
+
+CHART_FIELDS = (
+    'day', 'date', 'date_display',
+    'whale_cum_net', 'retail_cum_net',
+    'whale_buyavg', 'whale_sellavg', 'retail_buyavg', 'retail_sellavg',
+    'whale_net_lot', 'retail_net_lot',
+    'whale_flow', 'retail_flow'
+)
+
+CHART_SHAPE_FIELDS = ('whale_cum_net', 'retail_cum_net', 'whale_buyavg', 'whale_net_lot')
+
+# Minimal 3 titik LTTB per seri penentu bentuk
+MIN_CHART_POINTS = 3 * len(CHART_SHAPE_FIELDS)
+
+_PRICE_FIELDS = ('whale_buyavg', 'whale_sellavg', 'retail_buyavg', 'retail_sellavg')
+
+
+def lttb_indices(values, budget):
+    """Index titik terpilih (selalu termasuk titik pertama & terakhir)"""
+    n = len(values)
+    if budget >= n or n <= 2:
+        return list(range(n))
+    if budget < 3:
+        return [0, n - 1][:max(budget, 1)]
+
+    selected = [0]
+    bucket = (n - 2) / (budget - 2)
+    a = 0
+    for i in range(budget - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        # Rata-rata bucket berikutnya sebagai titik ketiga segitiga
+        next_start = end
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        if next_start >= n:
+            avg_x, avg_y = n - 1, values[n - 1]
+        else:
+            count = next_end - next_start
+            avg_x = (next_start + next_end - 1) / 2
+            avg_y = sum(values[next_start:next_end]) / count
+
+        ax, ay = a, values[a]
+        best, best_area = start, -1.0
+        for j in range(start, min(end, n - 1)):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def chart_indices(daily, budget=DEFAULT_CHART_POINTS):
+    """Gabungan index LTTB dari seri penentu bentuk (total <= budget)"""
+    n = len(daily)
+    if n <= budget:
+        return list(range(n))
+    if budget < MIN_CHART_POINTS:
+        # Terlalu sedikit untuk semua seri: LTTB seri pertama saja
+        return lttb_indices([d.get(CHART_SHAPE_FIELDS[0], 0) or 0 for d in daily], budget)
+    per_field = budget // len(CHART_SHAPE_FIELDS)
+    selected = set()
+    for field in CHART_SHAPE_FIELDS:
+        selected.update(lttb_indices([d.get(field, 0) or 0 for d in daily], per_field))
+    return sorted(selected)
+
+
+def chart_series(daily, budget=DEFAULT_CHART_POINTS):
+    """{'fields': CHART_FIELDS, 'rows': [...]} pada index terpilih; flow = kumulatif dalam window"""
+    whale_flow = retail_flow = 0
+    flows = []
+    for d in daily:
+        whale_flow += d.get('whale_net', 0) or 0
+        retail_flow += d.get('retail_net', 0) or 0
+        flows.append((round(whale_flow, 2), round(retail_flow, 2)))
+
+    rows = []
+    for i in chart_indices(daily, budget):
+        d = daily[i]
+        values = dict(d, whale_flow=flows[i][0], retail_flow=flows[i][1])
+        rows.append([values.get(f) for f in CHART_FIELDS])
+    return {'fields': list(CHART_FIELDS), 'rows': rows}
+
+
+def _bucket_key(date_str, resolution):
+    date = datetime.strptime(date_str, '%Y-%m-%d')
+    if resolution == 'week':
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    return date.strftime('%Y-%m')
+
+
+def _vwap(rows, avg_field, value_field):
+    total = sum(r.get(value_field, 0) for r in rows if r.get(value_field, 0) > 0)
+    if total <= 0:
+        return 0
+    return round(sum(r.get(avg_field, 0) * r.get(value_field, 0)
+                     for r in rows if r.get(value_field, 0) > 0) / total, 2)
+
+
+def rollup(daily, resolution='week'):
+    """Rollup daily per minggu ISO ('week') atau bulan ('month')"""
+    buckets = []
+    current_key = None
+    for d in daily:
+        key = _bucket_key(d['date'], resolution)
+        if key != current_key:
+            buckets.append((key, []))
+            current_key = key
+        buckets[-1][1].append(d)
+
+    result = []
+    for key, rows in buckets:
+        last = rows[-1]
+        prices = [r.get(f, 0) for r in rows for f in _PRICE_FIELDS if r.get(f, 0) > 0]
+        whale_buy = sum(r.get('whale_buy', 0) for r in rows)
+        whale_sell = sum(r.get('whale_sell', 0) for r in rows)
+        retail_buy = sum(r.get('retail_buy', 0) for r in rows)
+        retail_sell = sum(r.get('retail_sell', 0) for r in rows)
+        result.append({
+            'period': key,
+            'date_start': rows[0]['date'],
+            'date_end': last.get('date_end', last['date']),
+            'days': len(rows),
+            'whale_buy': round(whale_buy, 2),
+            'whale_sell': round(whale_sell, 2),
+            'retail_buy': round(retail_buy, 2),
+            'retail_sell': round(retail_sell, 2),
+            'whale_net': round(whale_buy - whale_sell, 2),
+            'retail_net': round(retail_buy - retail_sell, 2),
+            'whale_buyavg': _vwap(rows, 'whale_buyavg', 'whale_buy'),
+            'whale_sellavg': _vwap(rows, 'whale_sellavg', 'whale_sell'),
+            'retail_buyavg': _vwap(rows, 'retail_buyavg', 'retail_buy'),
+            'retail_sellavg': _vwap(rows, 'retail_sellavg', 'retail_sell'),
+            'price_high': round(max(prices), 2) if prices else 0,
+            'price_low': round(min(prices), 2) if prices else 0,
+            'whale_cum_net': last.get('whale_cum_net', 0),
+            'retail_cum_net': last.get('retail_cum_net', 0),
+            'whale_net_lot': last.get('whale_net_lot', 0),
+            'retail_net_lot': last.get('retail_net_lot', 0)
+        })
+    return result
+
+
+def lite_stock(stock, budget=DEFAULT_CHART_POINTS):
+    """Data saham tanpa daily + chart downsample + rollups"""
+    daily = stock.get('daily') or []
+    lite = {k: v for k, v in stock.items() if k != 'daily'}
+    lite['days'] = len(daily)
+    lite['chart'] = chart_series(daily, budget)
+    lite['rollups'] = {'weekly': rollup(daily, 'week'), 'monthly': rollup(daily, 'month')}
+    return lite
+
+
+def lite_filename(period_filename):
+    """'6month.json' -> 'lite_6month.json'"""
+    return f"lite_{period_filename}"
+
+
+def write_lite(output_path, period_filename, output, source_hash=None, budget=None, changed=None):
+    """
+    Tulis lite_<periode>.json dari dict file periode.
+    budget : jumlah titik chart; None = budget file lite yang sudah ada
+             (update intraday mengikuti --chart-points run terakhir), atau
+             DEFAULT_CHART_POINTS
+    changed: kode saham yang berubah (manifest); saham lain dipakai ulang dari
+    file lite sebelumnya jika budget-nya sama
+    """
+    path = os.path.join(output_path, lite_filename(period_filename))
+    old = {}
+    if (changed is not None or budget is None) and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                old = json.load(f)
+        except (ValueError, OSError):
+            old = {}
+    if budget is None:
+        budget = old.get('chart_points') or DEFAULT_CHART_POINTS
+    previous = old.get('stocks', {}) if changed is not None and old.get('chart_points') == budget else {}
+    changed = set(changed or ())
+
+    lite = {k: v for k, v in output.items() if k != 'stocks'}
+    lite['source_hash'] = source_hash
+    lite['chart_points'] = budget
+    lite['stocks'] = {}
+    for code, stock in output.get('stocks', {}).items():
+        if code in previous and code not in changed:
+            lite['stocks'][code] = previous[code]
+        else:
+            lite['stocks'][code] = lite_stock(stock, budget)
+
+    return _save_lite(path, {k: v for k, v in lite.items() if k != 'stocks'},
+                      {code: _encode(stock) for code, stock in lite['stocks'].items()})
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=json_default)
+
+
+LITE_STOCKS_OPEN = ',"stocks":{\n'
+
+
+def _save_lite(path, meta, encoded):
+    """JSON kompak, satu saham per baris (patch_lite mengganti satu baris saja)"""
+    lines = ',\n'.join(f'{_encode(code)}:{encoded[code]}' for code in encoded)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(_encode(meta)[:-1] + LITE_STOCKS_OPEN + lines + '\n}}')
+    os.replace(tmp_path, path)
+    return path
+
+
+def patch_lite(output_path, period_filename, meta, stock_code, stock, source_hash):
+    """
+    Ganti satu saham di lite_<periode>.json (intraday) tanpa parse saham lain;
+    budget chart mengikuti file yang ada. stock None = saham dihapus.
+    Returns: path, atau None jika file belum ada / format lama (pakai write_lite)
+    """
+    path = os.path.join(output_path, lite_filename(period_filename))
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    pos = text.find(LITE_STOCKS_OPEN)
+    if pos < 0 or not text.endswith('\n}}'):
+        return None
+    budget = json.loads(text[:pos] + '}').get('chart_points') or DEFAULT_CHART_POINTS
+
+    encoded = {}
+    for line in text[pos + len(LITE_STOCKS_OPEN):-3].split('\n'):
+        if line:
+            key_end = line.index('":') + 1
+            encoded[json.loads(line[:key_end])] = line[key_end + 1:].rstrip(',')
+    if stock is None:
+        encoded.pop(stock_code, None)
+    else:
+        encoded[stock_code] = _encode(lite_stock(stock, budget))
+
+    lite_meta = dict(meta)
+    lite_meta['source_hash'] = source_hash
+    lite_meta['chart_points'] = budget
+    return _save_lite(path, lite_meta, {code: encoded[code] for code in sorted(encoded)})
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Refresh berprioritas dengan batas waktu per siklus.
+
+Saat data baru datang untuk banyak saham sekaligus (akhir hari, export ulang
+intraday), saham terpenting harus terbit duluan. Setiap siklus:
+
+1. saham yang input-nya berubah sejak terakhir ditulis (token input sama
+   dengan generate_data --only-changed) menjadi kandidat
+2. kandidat diurutkan berdasarkan skor:
+       WATCHLIST_WEIGHT   jika ada di watchlist
+     + LIQUIDITY_WEIGHT   x peringkat likuiditas (TopStok TVal, 1 = paling ramai)
+     + STALENESS_WEIGHT   x jam sejak saham pertama kali terlihat berubah
+                          (output basi; 0 untuk perubahan baru)
+   Skor staleness tidak dibatasi, jadi saham yang terus ditunda akhirnya
+   menyalip saham watchlist
+3. saham diproses (process_stock_folder via compute_stock_record) sampai
+   estimasi waktu saham berikutnya + waktu publish melewati --budget detik
+   (minimal satu saham per siklus)
+4. hasil dipublish sebagai run parsial (write_run_outputs): file periode
+   ditulis atomic (tmp + os.replace) dan manifest terakhir, jadi dashboard
+   selalu melihat versi lama atau baru yang lengkap
+5. sisa kandidat ditunda - input mereka tetap berbeda dari inputs.json, jadi
+   siklus berikutnya memilihnya lagi dengan staleness yang lebih tinggi
+
+Ringkasan siklus terakhir (termasuk saham yang ditunda) ada di
+<output>/schedule.json; rata-rata waktu per saham dan waktu publish dari
+situ dipakai sebagai estimasi awal siklus berikutnya, dan 'pending_since'
+menyimpan sejak kapan setiap saham yang ditunda menunggu.
+
+Watchlist: <output>/watchlist.txt (atau --watchlist FILE), kode saham
+dipisah baris/koma, '#' = komentar.
+
+CLI:
+    python scheduler.py --input <Analisis> --output <dir> [--budget 60]
+                        [--watchlist FILE] [--interval 300] [opsi generate_data]
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+
+import generate_data
+from alerts import load_rules as load_alert_rules
+from checkpoint import inputs_fingerprint
+
+DEFAULT_BUDGET_SECONDS = 60
+
+WATCHLIST_WEIGHT = 2.0
+LIQUIDITY_WEIGHT = 1.0
+STALENESS_WEIGHT = 1.0      # per jam menunggu
+
+SCHEDULE_FILE = 'schedule.json'
+WATCHLIST_FILE = 'watchlist.txt'
+
+
+def load_watchlist(file_path):
+    """Set kode saham dari file watchlist (kosong jika file tidak ada)"""
+    if not file_path or not os.path.exists(file_path):
+        return set()
+    codes = set()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            codes.update(code.strip().upper() for code in line.split(',') if code.strip())
+    return codes
+
+
+def stock_priority(liquidity, in_watchlist, waiting_seconds):
+    """Skor prioritas (lebih besar = diproses lebih dulu)"""
+    return (WATCHLIST_WEIGHT * in_watchlist
+            + LIQUIDITY_WEIGHT * liquidity
+            + STALENESS_WEIGHT * max(waiting_seconds, 0) / 3600)
+
+
+def plan_cycle(run, base_path, output_path, code_version, watchlist, pending_since=None, now=None):
+    """
+    Kandidat siklus ini (saham dengan input berubah), urut skor menurun:
+    [{code, score, watch, waiting, since, token}, ...]
+    pending_since: {saham: epoch} dari schedule.json siklus sebelumnya
+    """
+    now = time.time() if now is None else now
+    pending_since = pending_since or {}
+    inputs_state = generate_data.load_inputs_state(output_path)
+    key = generate_data.input_key(run, code_version)
+    # run['universe'] sudah urut likuiditas (TopStok TVal) jika snapshot ada
+    ranked = run['universe'] + [code for code in run['stocks'] if code not in run['universe']]
+    n = len(ranked)
+
+    candidates = []
+    for i, stock_code in enumerate(ranked):
+        if stock_code not in run['stocks']:
+            continue
+        inputs = inputs_fingerprint(generate_data.scan_stock_folder(os.path.join(base_path, stock_code)))
+        token = generate_data.input_token(key, inputs, run['last_prices'].get(stock_code))
+        if generate_data.is_up_to_date(inputs_state, run, stock_code, token):
+            continue
+        watch = stock_code.upper() in watchlist
+        since = pending_since.get(stock_code, now)
+        candidates.append({
+            'code': stock_code,
+            'score': round(stock_priority(1 - i / n, watch, now - since), 4),
+            'watch': watch,
+            'waiting': round(max(now - since, 0)),
+            'since': since,
+            'token': token
+        })
+    candidates.sort(key=lambda c: (-c['score'], c['code']))
+    return candidates
+
+
+def load_schedule(output_path):
+    path = os.path.join(output_path, SCHEDULE_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            pass
+    return {}
+
+
+def save_schedule(output_path, schedule):
+    path = os.path.join(output_path, SCHEDULE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(schedule, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run_cycle(run, base_path, output_path, budget=DEFAULT_BUDGET_SECONDS, watchlist=(),
+              alert_rules=None, cache=None):
+    """
+    Satu siklus refresh. Returns: ringkasan (juga ditulis ke schedule.json)
+    """
+    started = time.perf_counter()
+    cache = cache or generate_data.new_analytics_cache()
+    previous = load_schedule(output_path)
+    candidates = plan_cycle(run, base_path, output_path, cache.version, watchlist,
+                            previous.get('pending_since'))
+
+    # Estimasi awal dari siklus sebelumnya
+    stock_estimate = previous.get('stock_seconds', 0)
+    publish_estimate = previous.get('publish_seconds', 0)
+
+    flows_dir = os.path.join(output_path, 'flows')
+    windows_by_stock = {}
+    flows_by_stock = {}
+    input_tokens = {}
+    processed = []
+    compute_seconds = 0
+    for candidate in candidates:
+        elapsed = time.perf_counter() - started
+        if processed and elapsed + stock_estimate + publish_estimate > budget:
+            break
+        stock_code = candidate['code']
+        print(f"Processing {stock_code} (score {candidate['score']:.2f})...")
+        t0 = time.perf_counter()
+        record, flows = generate_data.compute_stock_record(stock_code, base_path, run, flows_dir, cache)
+        compute_seconds += time.perf_counter() - t0
+        processed.append(stock_code)
+        input_tokens[stock_code] = candidate['token']
+        stock_estimate = compute_seconds / len(processed)
+        if record is None:
+            continue
+        windows_by_stock[stock_code] = record['windows']
+        flows_by_stock[stock_code] = flows
+
+    deferred = candidates[len(processed):]
+    publish_seconds = publish_estimate
+    if processed:
+        t0 = time.perf_counter()
+        cycle_run = dict(run, stocks=processed, partial=True)
+        tensor = None
+        if generate_data.builds_index(run):
+            tensor = generate_data.universe_tensor(cycle_run, flows_by_stock, flows_dir)
+        generate_data.write_run_outputs(output_path, cycle_run, windows_by_stock, tensor, alert_rules, input_tokens)
+        publish_seconds = time.perf_counter() - t0
+
+    schedule = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'budget': budget,
+        'elapsed': round(time.perf_counter() - started, 2),
+        'stock_seconds': round(stock_estimate, 3),
+        'publish_seconds': round(publish_seconds, 3),
+        'refreshed': processed,
+        'deferred': [{k: c[k] for k in ('code', 'score', 'watch', 'waiting')} for c in deferred],
+        'pending_since': {c['code']: c['since'] for c in deferred}
+    }
+    save_schedule(output_path, schedule)
+    return schedule
+
+
+def _option(args, name, default=None):
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print("Usage: python scheduler.py --input <Analisis> --output <dir> [--budget 60] "
+              "[--watchlist FILE] [--interval 300] [generate_data options]")
+        return
+    budget = float(_option(args, '--budget', DEFAULT_BUDGET_SECONDS))
+    watchlist_file = _option(args, '--watchlist')
+    interval = _option(args, '--interval')
+
+    gen_args = generate_data.parse_args(args)
+    base_path = os.path.abspath(gen_args.input or generate_data.DEFAULT_BASE_PATH)
+    output_path = gen_args.output or generate_data.DEFAULT_OUTPUT_PATH
+    try:
+        alert_rules = load_alert_rules(gen_args.alert_rules)
+    except ValueError as e:
+        print(f"Error: alert rules: {e}")
+        return
+    cache = generate_data.new_analytics_cache(gen_args.analytics_cache)
+
+    while True:
+        run = generate_data.prepare_run(gen_args, base_path, output_path)
+        if run is None:
+            return
+        watchlist = load_watchlist(watchlist_file or os.path.join(output_path, WATCHLIST_FILE))
+        schedule = run_cycle(run, base_path, output_path, budget, watchlist, alert_rules, cache)
+
+        print(f"\n[OK] Cycle done in {schedule['elapsed']:.1f}s (budget {budget:g}s): "
+              f"{len(schedule['refreshed'])} refreshed, {len(schedule['deferred'])} deferred")
+        if schedule['deferred']:
+            print("  Next: " + ', '.join(c['code'] for c in schedule['deferred'][:10])
+                  + (' ...' if len(schedule['deferred']) > 10 else ''))
+        if interval is None:
+            return
+        time.sleep(float(interval))
+
+
+if __name__ == '__main__':
+    main()
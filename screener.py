@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Screener index per periode.
+
+Dashboard membangun daftar trapped whale dan BUY dengan memfilter semua saham
+di file periode - file penuh (daily, brokers, ...) harus diunduh dulu. Generator
+juga menulis index ringkas per file periode:
+
+    screener_<periode>.json   (screener_1month.json, screener_broker_data.json, ...)
+
+    {
+      "period": ..., "days": ...,
+      "fields": ["code", "score", ...],
+      "rows": [["ANTM", 1, ...], ...],          satu baris per saham, urut kode
+      "order": {"score": ["BBTN", ...], ...}    kode saham pre-sorted (desc, null di akhir)
+    }
+
+Query (dijawab dari index saja, tanpa data per saham):
+
+    python screener.py screener_1month.json "score>2 and rrRatio>=2"
+    python screener.py screener_1month.json "trapped and discount>10" --sort discount
+    python screener.py screener_1month.json "recommendation==BUY" --sort score --top 6
+
+Ekspresi: perbandingan (> >= < <= == !=) antara field, angka, 'string' atau
+true/false/null, digabung and/or/not dan kurung. Field tanpa perbandingan =
+truthy. Identifier yang bukan field di sisi kanan perbandingan dibaca sebagai
+string (recommendation==BUY). Tidak memakai eval.
+"""
+
+import os
+import re
+import json
+from datetime import datetime
+
+FIELDS = (
+    'code', 'date_end', 'score', 'recommendation', 'strength', 'whaleSignal', 'priceTrend',
+    'isWhaleTrapped', 'whaleTrapLevel', 'isDistributing', 'trapped',
+    'lastPrice', 'avgWhaleBuy', 'discount', 'rrRatio', 'confidence', 'confidenceLevel',
+    'whale_net', 'retail_net', 'hhi_buy', 'hhi_sell', 'top5_share', 'active_brokers', 'whale_share'
+)
+
+ORDER_KEYS = ('score', 'discount', 'rrRatio', 'confidence', 'whale_net', 'top5_share', 'whale_share')
+
+
+def screener_row(stock_code, stock):
+    """Satu baris index dari data saham (format file periode)"""
+    rec = stock.get('recommendation') or {}
+    pr = stock.get('priceRecommendation') or {}
+    conf = stock.get('confidence') or {}
+    summary = stock.get('summary') or {}
+    concentration = stock.get('concentration') or {}
+
+    is_distributing = bool(pr.get('isDistributingToRetail') or rec.get('isDistributingToRetail'))
+    is_trapped = bool(pr.get('isWhaleTrapped'))
+    avg_buy = pr.get('avgWhaleBuy') or rec.get('avgWhaleBuy')
+    last_price = pr.get('lastPrice') or rec.get('lastPrice')
+    # Sama dengan dashboard: diskon harga terakhir terhadap rata-rata beli whale
+    discount = None
+    if pr.get('avgWhaleBuy') and pr.get('lastPrice') is not None:
+        discount = round((pr['avgWhaleBuy'] - pr['lastPrice']) / pr['avgWhaleBuy'] * 100, 2)
+
+    row = {
+        'code': stock_code,
+        'date_end': stock.get('date_end'),
+        'score': rec.get('score'),
+        'recommendation': rec.get('recommendation'),
+        'strength': rec.get('strength'),
+        'whaleSignal': rec.get('whaleSignal'),
+        'priceTrend': rec.get('priceTrend'),
+        'isWhaleTrapped': is_trapped and not is_distributing,
+        'whaleTrapLevel': 'DISTRIBUSI' if is_distributing else pr.get('whaleTrapLevel'),
+        'isDistributing': is_distributing,
+        'trapped': is_trapped or is_distributing,
+        'lastPrice': last_price,
+        'avgWhaleBuy': avg_buy,
+        'discount': discount,
+        'rrRatio': pr.get('rrRatio'),
+        'confidence': conf.get('confidenceScore'),
+        'confidenceLevel': conf.get('confidenceLevel'),
+        'whale_net': round(summary['whale_net'], 2) if summary.get('whale_net') is not None else None,
+        'retail_net': round(summary['retail_net'], 2) if summary.get('retail_net') is not None else None,
+        'hhi_buy': concentration.get('hhi_buy'),
+        'hhi_sell': concentration.get('hhi_sell'),
+        'top5_share': concentration.get('top5_share'),
+        'active_brokers': concentration.get('active_brokers'),
+        'whale_share': concentration.get('whale_share')
+    }
+    return [row[f] for f in FIELDS]
+
+
+def _order(rows, key):
+    """Kode saham urut key descending (null di akhir, seri -> kode)"""
+    i = FIELDS.index(key)
+    ranked = [r for r in rows if r[i] is not None]
+    ranked.sort(key=lambda r: (-r[i], r[0]))
+    return [r[0] for r in ranked] + [r[0] for r in rows if r[i] is None]
+
+
+def build_index(stocks, period_label=None, days=None):
+    return index_from_rows([screener_row(code, stocks[code]) for code in sorted(stocks)], period_label, days)
+
+
+def index_from_rows(rows, period_label=None, days=None):
+    """Dokumen index dari baris yang sudah urut kode"""
+    return {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'period': period_label,
+        'days': days,
+        'fields': list(FIELDS),
+        'rows': rows,
+        'order': {key: _order(rows, key) for key in ORDER_KEYS}
+    }
+
+
+def index_filename(period_filename):
+    """'1month.json' -> 'screener_1month.json'"""
+    return f"screener_{period_filename}"
+
+
+def write_index(output_path, period_filename, output):
+    """Tulis index untuk satu file periode (output = dict file periode). Returns: index"""
+    index = build_index(output.get('stocks', {}), output.get('period'), output.get('days'))
+    return _save_index(output_path, period_filename, index)
+
+
+def patch_index(output_path, period_filename, index, meta, stock_code, stock):
+    """
+    Index dengan satu saham diganti (intraday): baris saham lain dipakai dari
+    index lama, urutan dihitung ulang. stock None = saham dihapus. Returns: index baru
+    """
+    rows = [row for row in index['rows'] if row[0] != stock_code]
+    if stock is not None:
+        rows.append(screener_row(stock_code, stock))
+        rows.sort(key=lambda row: row[0])
+    return _save_index(output_path, period_filename, index_from_rows(rows, meta.get('period'), meta.get('days')))
+
+
+def _save_index(output_path, period_filename, index):
+    path = os.path.join(output_path, index_filename(period_filename))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(index, separators=(',', ':'), ensure_ascii=False))
+    os.replace(tmp_path, path)
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Query expression
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<num>-?\d+(?:\.\d+)?)
+  | (?P<str>'[^']*'|"[^"]*")
+  | (?P<op>>=|<=|==|!=|=|>|<|\(|\))
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+)""", re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not'}
+_CONSTANTS = {'true': True, 'false': False, 'null': None}
+
+_COMPARE = {
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '==': lambda a, b: a == b,
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Unexpected character at {pos}: {text[pos:pos + 10]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == 'num':
+            value = float(value) if '.' in value else int(value)
+        elif kind == 'str':
+            value = value[1:-1]
+        elif kind == 'name' and value.lower() in _KEYWORDS:
+            kind, value = 'op', value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent: or > and > not > perbandingan > atom"""
+
+    def __init__(self, tokens, fields):
+        self.tokens = tokens
+        self.pos = 0
+        self.fields = {f: i for i, f in enumerate(fields)}
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if token[0] is None or (value is not None and token != ('op', value)):
+            raise ValueError(f"Expected {value or 'value'} at token {self.pos + 1}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r} at token {self.pos + 1}")
+        return node
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.peek() == ('op', 'or'):
+            self.take()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else (lambda row: any(t(row) for t in terms))
+
+    def parse_and(self):
+        terms = [self.parse_not()]
+        while self.peek() == ('op', 'and'):
+            self.take()
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else (lambda row: all(t(row) for t in terms))
+
+    def parse_not(self):
+        if self.peek() == ('op', 'not'):
+            self.take()
+            inner = self.parse_not()
+            return lambda row: not inner(row)
+        return self.parse_compare()
+
+    def parse_compare(self):
+        if self.peek() == ('op', '('):
+            self.take()
+            node = self.parse_or()
+            self.take(')')
+            return node
+        left = self.parse_value(rhs=False)
+        kind, op = self.peek()
+        if kind != 'op' or op not in _COMPARE:
+            return lambda row: bool(left(row))
+        self.take()
+        right = self.parse_value(rhs=True)
+        compare = _COMPARE[op]
+
+        def node(row):
+            a, b = left(row), right(row)
+            if a is None or b is None:
+                return compare(a, b) if op in ('==', '=', '!=') else False
+            try:
+                return compare(a, b)
+            except TypeError:
+                return False
+        return node
+
+    def parse_value(self, rhs):
+        kind, value = self.take()
+        if kind in ('num', 'str'):
+            return lambda row: value
+        if kind == 'name':
+            if value in self.fields:
+                i = self.fields[value]
+                return lambda row: row[i]
+            if value.lower() in _CONSTANTS:
+                constant = _CONSTANTS[value.lower()]
+                return lambda row: constant
+            if rhs:
+                return lambda row: value
+            raise ValueError(f"Unknown field: {value} (fields: {', '.join(self.fields)})")
+        raise ValueError(f"Unexpected {value!r} at token {self.pos}")
+
+
+def compile_query(text, fields=FIELDS):
+    """Ekspresi -> fungsi(row list) -> bool"""
+    if not text or not text.strip():
+        return lambda row: True
+    return _Parser(_tokenize(text), fields).parse()
+
+
+def query(index, text, sort='score', top=None, ascending=False):
+    """Baris (dict) yang cocok, urut sort (memakai urutan pre-sorted index jika ada)"""
+    fields = index['fields']
+    match = compile_query(text, fields)
+    rows = {row[0]: row for row in index['rows']}
+
+    if sort in index['order']:
+        codes = index['order'][sort]
+        if ascending:
+            i = fields.index(sort)
+            codes = [c for c in reversed(codes) if rows[c][i] is not None] + \
+                    [c for c in codes if rows[c][i] is None]
+    elif sort in fields:
+        i = fields.index(sort)
+        codes = sorted(rows, key=lambda c: (rows[c][i] is None, rows[c][i] if rows[c][i] is not None else 0, c),
+                       reverse=not ascending)
+    else:
+        raise ValueError(f"Unknown sort field: {sort}")
+
+    result = []
+    for code in codes:
+        if match(rows[code]):
+            result.append(dict(zip(fields, rows[code])))
+            if top and len(result) >= top:
+                break
+    return result
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python screener.py <screener_<period>.json> [\"expression\"] "
+              "[--sort score] [--asc] [--top 20] [--json]")
+        return
+
+    args = sys.argv[2:]
+    sort = args[args.index('--sort') + 1] if '--sort' in args else 'score'
+    top = int(args[args.index('--top') + 1]) if '--top' in args else 20
+    for flag in ('--sort', '--top'):
+        if flag in args:
+            i = args.index(flag)
+            del args[i:i + 2]
+    as_json = '--json' in args
+    ascending = '--asc' in args
+    expression = ' '.join(a for a in args if a not in ('--json', '--asc'))
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        index = json.load(f)
+
+    try:
+        rows = query(index, expression, sort, top, ascending)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    if as_json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{index.get('period')}: {len(rows)} stocks" + (f" matching {expression}" if expression else ""))
+    def fmt(value, width, spec=''):
+        return f"{format(value, spec) if value is not None else '-':>{width}}"
+
+    print(f"{'Stock':<8}{'Rec':<7}{'Score':>7}{'RR':>7}{'Disc%':>8}{'Conf':>6}{'WhaleNet':>12}  Trap")
+    for r in rows:
+        print(f"{r['code']:<8}{r['recommendation'] or '-':<7}{fmt(r['score'], 7, '.2f')}{fmt(r['rrRatio'], 7, '.2f')}"
+              f"{fmt(r['discount'], 8, '.1f')}{fmt(r['confidence'], 6)}{fmt(r['whale_net'], 12, '.2f')}  "
+              f"{r['whaleTrapLevel'] if r['trapped'] else ''}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Streak akumulasi/distribusi per broker + regime whale.
+
+generate_insights hanya mencari satu hari puncak whale_cum_net. Modul ini
+memakai run-length encoding atas tanda net flow harian (buy - sell):
+
+- streak broker: run terakhir per broker (net buy / net sell berturut-turut
+  sampai hari terakhir; hari tanpa transaksi memutus streak), dengan total
+  net, net lot, harga rata-rata selama streak dan tanggal mulai
+  -> "AK net buy 9 hari berturut-turut"
+- regime whale: titik pergantian regime akumulasi/distribusi di net whale
+  harian (run searah minimal MIN_REGIME_DAYS hari dengan arah berbeda dari
+  regime sebelumnya)
+
+Run-length dihitung sekali per saham (StreakIndex di build_stock_data); setiap
+window periode hanya memotong run di awal window.
+
+Query seluruh universe dari flows cache:
+    python streaks.py <flows_dir> [--broker AK] [--min 5] [--top 30]
+"""
+
+from itertools import groupby
+
+MIN_STREAK_DAYS = 3
+MIN_REGIME_DAYS = 3
+TOP_BROKERS = 10
+MAX_REGIME_CHANGES = 5
+
+
+def _sign(x):
+    return 1 if x > 0 else -1 if x < 0 else 0
+
+
+def run_lengths(values):
+    """RLE tanda nilai: [(tanda, start, panjang), ...]"""
+    runs = []
+    start = 0
+    for sign, group in groupby(_sign(v) for v in values):
+        length = sum(1 for _ in group)
+        runs.append((sign, start, length))
+        start += length
+    return runs
+
+
+def last_run_start(values):
+    """Index awal run tanda terakhir (len(values) jika kosong / tanda 0)"""
+    n = len(values)
+    if not n or _sign(values[-1]) == 0:
+        return n
+    sign = _sign(values[-1])
+    i = n - 1
+    while i > 0 and _sign(values[i - 1]) == sign:
+        i -= 1
+    return i
+
+
+def regime_changes(values, min_days=MIN_REGIME_DAYS):
+    """
+    Titik pergantian regime: run searah >= min_days yang arahnya berbeda dari
+    run panjang sebelumnya. Returns: [(start, tanda, panjang), ...]
+    """
+    changes = []
+    regime = 0
+    for sign, start, length in run_lengths(values):
+        if sign == 0 or length < min_days:
+            continue
+        if sign != regime:
+            changes.append((start, sign, length))
+            regime = sign
+    return changes
+
+
+class StreakIndex:
+    """Run terakhir per broker + regime whale untuk satu saham"""
+
+    def __init__(self, flows, column_mask, registry, whale_net):
+        self.flows = flows
+        self.column_mask = column_mask
+        self.registry = registry
+        self.n_days = len(flows['dates'])
+        cols = flows['columns']
+        self.net = [[b - s for b, s in zip(buy_col, sell_col)]
+                    for buy_col, sell_col in zip(cols['buy'], cols['sell'])]
+        self.run_start = [last_run_start(net) for net in self.net]
+        self.regimes = regime_changes(whale_net)
+
+    def _broker_streak(self, b, start):
+        flows = self.flows
+        cols = flows['columns']
+        net = self.net[b]
+        direction = 'buy' if net[-1] > 0 else 'sell'
+        days = range(start, self.n_days)
+        value = sum(net[t] for t in days)
+        net_lot = sum(cols['buy_lot'][b][t] - cols['sell_lot'][b][t] for t in days)
+        vol_col, avg_col = (cols['buy'][b], cols['buyavg'][b]) if direction == 'buy' else \
+            (cols['sell'][b], cols['sellavg'][b])
+        vol = sum(vol_col[t] for t in days)
+        avg_price = sum(avg_col[t] * vol_col[t] for t in days) / vol if vol > 0 else 0
+        code = flows['brokers'][b]
+        length = self.n_days - start
+        return {
+            'code': code,
+            'name': self.registry.name(code),
+            'category': 'whale' if self.column_mask[b] else 'retail',
+            'direction': direction,
+            'days': length,
+            'net': round(value, 2),
+            'net_lot': round(net_lot),
+            'avgprice': round(avg_price, 2),
+            'since': flows['dates'][start],
+            'label': f"{code} net {direction} {length} hari berturut-turut"
+        }
+
+    def window(self, start=0, min_days=MIN_STREAK_DAYS, top=TOP_BROKERS):
+        """Streak broker (dipotong di awal window) + regime whale di dalam window"""
+        brokers = []
+        for b, run_start in enumerate(self.run_start):
+            s = max(run_start, start)
+            if self.n_days - s >= min_days:
+                brokers.append(self._broker_streak(b, s))
+        brokers.sort(key=lambda x: (-x['days'], -abs(x['net']), x['code']))
+
+        regimes = [{
+            'date': self.flows['dates'][s],
+            'regime': 'akumulasi' if sign > 0 else 'distribusi',
+            'days': length
+        } for s, sign, length in self.regimes if s >= start]
+
+        return {
+            'brokers': brokers[:top],
+            'whaleRegime': regimes[-MAX_REGIME_CHANGES:]
+        }
+
+
+def universe_streaks(flows_by_stock, registry, whale_mask, min_days=MIN_STREAK_DAYS, broker=None):
+    """Streak aktif semua saham (satu pass per saham): [(stock, streak), ...] urut panjang"""
+    from broker_flows import broker_mask
+
+    rows = []
+    for stock_code, flows in sorted(flows_by_stock.items()):
+        column_mask = broker_mask(flows, whale_mask, registry)
+        index = StreakIndex(flows, column_mask, registry, [])
+        for streak in index.window(0, min_days, top=None)['brokers']:
+            if broker is None or streak['code'] == broker:
+                rows.append((stock_code, streak))
+    rows.sort(key=lambda r: (-r[1]['days'], -abs(r[1]['net']), r[0], r[1]['code']))
+    return rows
+
+
+def main():
+    import sys
+    from broker_flows import load_flows, list_flows
+    from broker_registry import CAT_WHALE
+    from generate_data import get_registry
+
+    if len(sys.argv) < 2:
+        print("Usage: python streaks.py <flows_dir> [--broker AK] [--min 5] [--top 30]")
+        return
+
+    args = sys.argv[2:]
+    broker = args[args.index('--broker') + 1].upper() if '--broker' in args else None
+    min_days = int(args[args.index('--min') + 1]) if '--min' in args else MIN_STREAK_DAYS
+    top = int(args[args.index('--top') + 1]) if '--top' in args else 30
+
+    flows_dir = sys.argv[1]
+    flows_by_stock = {code: load_flows(code, flows_dir) for code in list_flows(flows_dir)}
+    flows_by_stock = {code: f for code, f in flows_by_stock.items() if f is not None}
+    registry = get_registry()
+    rows = universe_streaks(flows_by_stock, registry, registry.mask(CAT_WHALE), min_days, broker)
+    if not rows:
+        print("No active streaks")
+        return
+
+    print(f"{'Stock':<8}{'Broker':<8}{'Dir':<6}{'Days':>6}{'Net (M)':>12}{'Net Lot':>14}{'AvgPrice':>10}  Since")
+    for stock_code, s in rows[:top]:
+        print(f"{stock_code:<8}{s['code']:<8}{s['direction']:<6}{s['days']:>6}{s['net']:>12.2f}"
+              f"{s['net_lot']:>14,}{s['avgprice']:>10.0f}  {s['since']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+TopStok snapshot loader + universe selection.
+
+TopStok/topstok.csv adalah export tab-separated (Stock, Time, Last, Chg, Chg%,
+TVal, %Val, TLot, %Lot, TFrq, %Frq, Type, Stock Name, Corp. Action).
+Loader membaca ke kolom ber-tipe (array) + index per kode saham, dipakai
+generator untuk:
+- memilih universe: --universe top:N (urut TVal) atau top:N:tfrq
+- mengurutkan proses berdasarkan likuiditas (saham paling ramai duluan)
+
+CLI (pengganti daftar ticker hard-code di create_topstok.ps1/create_top45.ps1):
+    python topstok.py TopStok/topstok.csv --top 45 [--by tfrq] [--create-folders Analisis]
+"""
+
+import os
+from array import array
+
+# Tipe baris yang bukan saham biasa (waran / structured warrant)
+WARRANT_TYPES = {'S_WARI', 'WARI', 'WARI_CALL'}
+
+RANK_KEYS = ('tval', 'tfrq', 'tlot')
+
+
+def parse_time(time_str):
+    """'11:59:59' -> detik sejak tengah malam (-1 jika tidak valid)"""
+    try:
+        h, m, s = time_str.strip().split(':')
+        return int(h) * 3600 + int(m) * 60 + int(s)
+    except (ValueError, AttributeError):
+        return -1
+
+
+def format_time(seconds):
+    if seconds < 0:
+        return ''
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _num(value, cast=float):
+    value = value.strip().replace(',', '')
+    if not value or value == '-':
+        return cast(0)
+    try:
+        return cast(value)
+    except ValueError:
+        return cast(float(value))
+
+
+def is_equity(code, row_type):
+    """Kode saham biasa: 4 huruf dan bukan waran"""
+    return len(code) == 4 and code.isalpha() and row_type not in WARRANT_TYPES
+
+
+class TopStokSnapshot:
+    """Satu snapshot TopStok dalam bentuk kolom ber-tipe"""
+
+    def __init__(self):
+        self.codes = []
+        self.time = array('l')
+        self.last = array('d')
+        self.chg = array('d')
+        self.chg_pct = array('d')
+        self.tval = array('q')
+        self.pct_val = array('d')
+        self.tlot = array('q')
+        self.pct_lot = array('d')
+        self.tfrq = array('q')
+        self.pct_frq = array('d')
+        self.types = []
+        self.names = []
+        self.index = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def append(self, parts):
+        code = parts[0].strip().upper()
+        if not code or code in self.index:
+            return
+        self.index[code] = len(self.codes)
+        self.codes.append(code)
+        self.time.append(parse_time(parts[1]))
+        self.last.append(_num(parts[2]))
+        self.chg.append(_num(parts[3]))
+        self.chg_pct.append(_num(parts[4]))
+        self.tval.append(_num(parts[5], int))
+        self.pct_val.append(_num(parts[6]))
+        self.tlot.append(_num(parts[7], int))
+        self.pct_lot.append(_num(parts[8]))
+        self.tfrq.append(_num(parts[9], int))
+        self.pct_frq.append(_num(parts[10]))
+        self.types.append(parts[11].strip() if len(parts) > 11 else '')
+        self.names.append(parts[12].strip() if len(parts) > 12 else '')
+
+    def row(self, code):
+        """Satu baris sebagai dict (None jika kode tidak ada)"""
+        i = self.index.get(code)
+        if i is None:
+            return None
+        return {
+            'code': code,
+            'time': format_time(self.time[i]),
+            'last': self.last[i],
+            'chg': self.chg[i],
+            'chgPct': self.chg_pct[i],
+            'tval': self.tval[i],
+            'tlot': self.tlot[i],
+            'tfrq': self.tfrq[i],
+            'type': self.types[i],
+            'name': self.names[i]
+        }
+
+    def rank(self, key='tval', equity_only=True):
+        """Kode saham urut likuiditas (descending) berdasarkan tval/tfrq/tlot"""
+        if key not in RANK_KEYS:
+            raise ValueError(f"Unknown rank key: {key} (use {', '.join(RANK_KEYS)})")
+        values = getattr(self, key)
+        rows = range(len(self.codes))
+        if equity_only:
+            rows = [i for i in rows if is_equity(self.codes[i], self.types[i])]
+        ranked = sorted(rows, key=lambda i: (-values[i], self.codes[i]))
+        return [self.codes[i] for i in ranked]
+
+
+def load_topstok(file_path):
+    """Baca TopStok CSV (tab-separated, baris pertama header)"""
+    snapshot = TopStokSnapshot()
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        next(f, None)
+        for line in f:
+            parts = line.rstrip('\r\n').split('\t')
+            if len(parts) < 11:
+                continue
+            snapshot.append(parts)
+    return snapshot
+
+
+def parse_universe_spec(spec):
+    """
+    'all' -> None
+    'top:45' -> (45, 'tval')
+    'top:30:tfrq' -> (30, 'tfrq')
+    """
+    if not spec or spec == 'all':
+        return None
+    parts = spec.split(':')
+    if parts[0] != 'top' or len(parts) not in (2, 3):
+        raise ValueError(f"Invalid universe spec: {spec} (use all, top:N or top:N:tfrq)")
+    key = parts[2] if len(parts) == 3 else 'tval'
+    if key not in RANK_KEYS:
+        raise ValueError(f"Unknown rank key: {key} (use {', '.join(RANK_KEYS)})")
+    return int(parts[1]), key
+
+
+def order_by_liquidity(codes, snapshot, key='tval'):
+    """
+    Urutkan kode: yang ada di snapshot berdasarkan likuiditas (desc),
+    sisanya (tidak ada di snapshot) di belakang secara alfabetis.
+    """
+    if snapshot is None:
+        return sorted(codes)
+    ranked = {code: i for i, code in enumerate(snapshot.rank(key, equity_only=False))}
+    return sorted(codes, key=lambda c: (ranked.get(c, len(ranked)), c))
+
+
+def select_universe(available, snapshot, spec):
+    """
+    Pilih saham yang diproses dari folder yang tersedia.
+
+    Returns: (selected, deferred) - selected urut likuiditas, deferred = folder
+    yang tersedia tapi di luar universe (di-skip run ini).
+    """
+    parsed = parse_universe_spec(spec)
+    if parsed is None or snapshot is None:
+        if parsed is not None:
+            print("[WARN] TopStok snapshot not available - universe 'all' is used")
+        return order_by_liquidity(available, snapshot), []
+
+    top_n, key = parsed
+    top_codes = set(snapshot.rank(key)[:top_n])
+    selected = [c for c in available if c in top_codes]
+    deferred = sorted(c for c in available if c not in top_codes)
+    return order_by_liquidity(selected, snapshot, key), deferred
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python topstok.py <topstok.csv> [--top N] [--by tval|tfrq|tlot] [--create-folders <Analisis>]")
+        return
+
+    args = sys.argv[2:]
+    top_n = int(args[args.index('--top') + 1]) if '--top' in args else 30
+    key = args[args.index('--by') + 1] if '--by' in args else 'tval'
+    folder_root = args[args.index('--create-folders') + 1] if '--create-folders' in args else None
+
+    snapshot = load_topstok(sys.argv[1])
+    codes = snapshot.rank(key)[:top_n]
+
+    for rank, code in enumerate(codes, 1):
+        r = snapshot.row(code)
+        line = f"{rank:>3}. {code:<6}{r['last']:>10.0f}{r['tval'] / 1e9:>12.1f} M{r['tfrq']:>10,}"
+        if folder_root:
+            path = os.path.join(folder_root, code)
+            if not os.path.exists(path):
+                os.makedirs(path)
+                line += "  Created"
+            else:
+                line += "  Exists"
+        print(line)
+
+    print(f"\nTotal Top {len(codes)} stocks (by {key})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Append-only intraday TopStok time-series store.
+
+Setiap export TopStok hanya satu snapshot; kolom Time hilang saat export
+berikutnya menimpa file. Store ini menyimpan snapshot berulang per sesi:
+
+    <store_dir>/<YYYY-MM-DD>/
+        stocks.txt       kode saham (baris ke-i = stock id i), append-only
+        stock_id.bin     array 'q'  - stock id per baris
+        time.bin         array 'q'  - detik sejak tengah malam (kolom Time)
+        last.bin         array 'd'
+        chg_pct.bin      array 'd'
+        tval.bin         array 'q'
+        tlot.bin         array 'q'
+        tfrq.bin         array 'q'
+
+Append hanya menulis byte di akhir file kolom (mode 'ab'), jadi murah walau
+dilakukan berkali-kali per sesi. Baris yang tidak berubah sejak snapshot
+sebelumnya (Time dan TVal sama) di-skip. Saat dibuka, semua kolom dipotong
+ke panjang terpendek sehingga append yang terputus di tengah tidak merusak
+keselarasan kolom.
+
+CLI:
+    python topstok_store.py append <store_dir> <topstok.csv> [--date YYYY-MM-DD]
+    python topstok_store.py show <store_dir> <CODE> [--date YYYY-MM-DD]
+"""
+
+import os
+from array import array
+from datetime import datetime, timedelta
+
+from topstok import load_topstok, is_equity, format_time
+
+STORE_COLUMNS = (
+    ('stock_id', 'q'),
+    ('time', 'q'),
+    ('last', 'd'),
+    ('chg_pct', 'd'),
+    ('tval', 'q'),
+    ('tlot', 'q'),
+    ('tfrq', 'q'),
+)
+
+
+class TopStokSession:
+    """Store kolom untuk satu tanggal sesi"""
+
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+        self.codes = []
+        self.stock_ids = {}
+        self.columns = {name: array(code) for name, code in STORE_COLUMNS}
+        self.rows_by_stock = {}
+        self._last_key = {}
+        self._load()
+
+    def _column_path(self, name):
+        return os.path.join(self.session_dir, f'{name}.bin')
+
+    def _load(self):
+        # Folder sesi baru dibuat saat append (show/open_session hanya membaca)
+        stocks_path = os.path.join(self.session_dir, 'stocks.txt')
+        if os.path.exists(stocks_path):
+            with open(stocks_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    code = line.strip()
+                    if code:
+                        self.stock_ids[code] = len(self.codes)
+                        self.codes.append(code)
+
+        for name, code in STORE_COLUMNS:
+            path = self._column_path(name)
+            if os.path.exists(path):
+                col = self.columns[name]
+                with open(path, 'rb') as f:
+                    col.frombytes(f.read())
+
+        # Potong ke panjang terpendek (append terakhir mungkin tidak lengkap)
+        n = min(len(c) for c in self.columns.values())
+        for name, _ in STORE_COLUMNS:
+            col = self.columns[name]
+            if len(col) > n:
+                del col[n:]
+                with open(self._column_path(name), 'r+b') as f:
+                    f.truncate(n * col.itemsize)
+
+        stock_col = self.columns['stock_id']
+        for row in range(n):
+            self._index_row(stock_col[row], row)
+
+    def _index_row(self, stock_id, row):
+        rows = self.rows_by_stock.get(stock_id)
+        if rows is None:
+            rows = self.rows_by_stock[stock_id] = array('l')
+        rows.append(row)
+        self._last_key[stock_id] = (self.columns['time'][row], self.columns['tval'][row])
+
+    def __len__(self):
+        return len(self.columns['stock_id'])
+
+    def _intern(self, code, new_codes):
+        stock_id = self.stock_ids.get(code)
+        if stock_id is None:
+            stock_id = self.stock_ids[code] = len(self.codes)
+            self.codes.append(code)
+            new_codes.append(code)
+        return stock_id
+
+    def append_snapshot(self, snapshot, equity_only=True):
+        """Append semua baris snapshot yang berubah. Returns: jumlah baris baru"""
+        new_codes = []
+        pending = {name: array(code) for name, code in STORE_COLUMNS}
+
+        for i, code in enumerate(snapshot.codes):
+            if equity_only and not is_equity(code, snapshot.types[i]):
+                continue
+            if snapshot.time[i] < 0:
+                continue
+            stock_id = self._intern(code, new_codes)
+            key = (snapshot.time[i], snapshot.tval[i])
+            if self._last_key.get(stock_id) == key:
+                continue
+            self._last_key[stock_id] = key
+            pending['stock_id'].append(stock_id)
+            pending['time'].append(snapshot.time[i])
+            pending['last'].append(snapshot.last[i])
+            pending['chg_pct'].append(snapshot.chg_pct[i])
+            pending['tval'].append(snapshot.tval[i])
+            pending['tlot'].append(snapshot.tlot[i])
+            pending['tfrq'].append(snapshot.tfrq[i])
+
+        if new_codes or pending['stock_id']:
+            os.makedirs(self.session_dir, exist_ok=True)
+        if new_codes:
+            with open(os.path.join(self.session_dir, 'stocks.txt'), 'a', encoding='utf-8') as f:
+                f.write(''.join(f'{c}\n' for c in new_codes))
+
+        added = len(pending['stock_id'])
+        if not added:
+            return 0
+
+        first_row = len(self)
+        # stock_id ditulis terakhir: baris dianggap lengkap setelah kolom ini
+        for name, _ in reversed(STORE_COLUMNS):
+            with open(self._column_path(name), 'ab') as f:
+                pending[name].tofile(f)
+            self.columns[name].extend(pending[name])
+
+        for offset, stock_id in enumerate(pending['stock_id']):
+            self._index_row(stock_id, first_row + offset)
+        return added
+
+    def series(self, code):
+        """Time series satu saham: {time, last, chg_pct, tval, tlot, tfrq} (list)"""
+        stock_id = self.stock_ids.get(code)
+        rows = self.rows_by_stock.get(stock_id) if stock_id is not None else None
+        if not rows:
+            return None
+        result = {}
+        for name, _ in STORE_COLUMNS[1:]:
+            col = self.columns[name]
+            result[name] = [col[r] for r in rows]
+        return result
+
+    def latest(self, code):
+        """Baris terakhir satu saham sebagai dict (None jika tidak ada)"""
+        stock_id = self.stock_ids.get(code)
+        rows = self.rows_by_stock.get(stock_id) if stock_id is not None else None
+        if not rows:
+            return None
+        r = rows[-1]
+        return {name: self.columns[name][r] for name, _ in STORE_COLUMNS[1:]}
+
+    def latest_prices(self):
+        """{code: last price} untuk semua saham di sesi ini"""
+        prices = {}
+        for stock_id, rows in self.rows_by_stock.items():
+            last = self.columns['last'][rows[-1]]
+            if last > 0:
+                prices[self.codes[stock_id]] = last
+        return prices
+
+
+def session_dir(store_dir, session_date=None):
+    session_date = session_date or datetime.now().strftime('%Y-%m-%d')
+    return os.path.join(store_dir, session_date)
+
+
+def open_session(store_dir, session_date=None):
+    return TopStokSession(session_dir(store_dir, session_date))
+
+
+def latest_session_date(store_dir):
+    """Tanggal sesi terbaru di store (None jika kosong)"""
+    if not os.path.isdir(store_dir):
+        return None
+    dates = sorted(d for d in os.listdir(store_dir) if os.path.isdir(os.path.join(store_dir, d)))
+    return dates[-1] if dates else None
+
+
+def last_trading_day(today=None):
+    """Hari bursa terakhir (YYYY-MM-DD): hari ini, atau Jumat sebelumnya di akhir pekan"""
+    day = today or datetime.now()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.strftime('%Y-%m-%d')
+
+
+def current_session_date(store_dir, today=None):
+    """
+    Tanggal sesi terbaru jika dari hari bursa terakhir. Sesi lama (store tidak
+    di-append hari ini) -> None + peringatan: harga last-nya sudah basi
+    """
+    session_date = latest_session_date(store_dir)
+    expected = last_trading_day(today)
+    if session_date and session_date != expected:
+        print(f"[WARN] TopStok store: latest session {session_date} is not the current trading day "
+              f"({expected}) - last prices ignored")
+        return None
+    return session_date
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 4 or sys.argv[1] not in ('append', 'show'):
+        print("Usage:")
+        print("  python topstok_store.py append <store_dir> <topstok.csv> [--date YYYY-MM-DD]")
+        print("  python topstok_store.py show <store_dir> <CODE> [--date YYYY-MM-DD]")
+        return
+
+    command, store_dir, target = sys.argv[1], sys.argv[2], sys.argv[3]
+    args = sys.argv[4:]
+    session_date = args[args.index('--date') + 1] if '--date' in args else None
+
+    if command == 'append':
+        session = open_session(store_dir, session_date)
+        added = session.append_snapshot(load_topstok(target))
+        print(f"[OK] Appended {added} rows ({len(session)} rows in session)")
+        return
+
+    session_date = session_date or latest_session_date(store_dir)
+    if not session_date:
+        print(f"No sessions in {store_dir}")
+        return
+    session = open_session(store_dir, session_date)
+    series = session.series(target.upper())
+    if not series:
+        print(f"No data for {target.upper()} on {session_date}")
+        return
+    print(f"{target.upper()} - {session_date}")
+    print(f"{'Time':<10}{'Last':>10}{'Chg%':>8}{'TVal (M)':>12}{'TLot':>14}{'TFrq':>10}")
+    for i in range(len(series['time'])):
+        print(f"{format_time(series['time'][i]):<10}{series['last'][i]:>10.0f}{series['chg_pct'][i]:>8.1f}"
+              f"{series['tval'][i] / 1e9:>12.1f}{series['tlot'][i]:>14,}{series['tfrq'][i]:>10,}")
+
+
+if __name__ == '__main__':
+    main()
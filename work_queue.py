@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Work queue berbasis folder bersama untuk generate lintas mesin.
+
+Backfill penuh (ratusan saham x bertahun-tahun) atau sweep parameter terlalu
+lama untuk satu mesin. Coordinator membuat job di folder bersama (SMB/NFS/
+folder sync), worker di host mana pun mengambil saham satu per satu, dan
+coordinator menggabungkan hasilnya menjadi file periode biasa:
+
+    <queue>/job.json          parameter run + signature (versi kode, slice, ...)
+    <queue>/pending/<NNNN>_<CODE>   task belum diambil (NNNN = urutan likuiditas)
+    <queue>/leases/<NNNN>_<CODE>    task sedang dikerjakan (isi: worker, mtime = heartbeat)
+    <queue>/done/<NNNN>_<CODE>      task selesai
+    <queue>/results/          hasil per saham (format checkpoint.RunCheckpoint)
+
+Lease:
+- klaim = os.rename pending -> leases (atomic: hanya satu worker yang menang)
+- lease yang mtime-nya lebih tua dari --lease detik dianggap mati dan
+  dikembalikan ke pending (rename lagi, juga hanya satu yang menang)
+- selama compute worker memperpanjang lease setiap --lease/4 detik (thread
+  heartbeat), jadi saham yang lama dihitung tidak dianggap mati
+- file lease berisi worker id pemiliknya; sebelum menyimpan hasil dan
+  sebelum rename ke done worker memastikan lease masih miliknya
+- selesai = tulis hasil (atomic), lalu rename leases -> done
+
+Hasil deterministik: setiap saham dihitung dari CSV-nya saja dengan parameter
+dan versi kode yang sama (signature di job.json; worker dengan kode berbeda
+menolak bekerja), dan merge menyusun output urut kode saham. Jika lease
+kedaluwarsa dan satu saham dikerjakan dua kali, kedua hasil identik.
+
+CLI:
+    python work_queue.py init <queue> --input <Analisis> [--output <dir>] [opsi generate_data]
+    python work_queue.py worker <queue> [--input <Analisis>] [--lease 600] [--once]
+    python work_queue.py status <queue>
+    python work_queue.py merge <queue> --output <dir>
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+import generate_data
+from broker_flows import save_flows, load_flows
+from broker_footprint import FootprintTensor
+from checkpoint import RunCheckpoint, inputs_fingerprint
+from export_slices import parse_slice, slice_label
+
+DEFAULT_LEASE_SECONDS = 600
+POLL_SECONDS = 5
+
+
+def _dirs(queue_dir):
+    return {name: os.path.join(queue_dir, name) for name in ('pending', 'leases', 'done', 'results')}
+
+
+def _task_code(task_name):
+    return task_name.split('_', 1)[1]
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_job(queue_dir):
+    with open(os.path.join(queue_dir, 'job.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def job_run(job):
+    """Parameter run (format generate_data.prepare_run) dari job.json"""
+    periods, _ = generate_data.parse_periods(','.join(job['periods']) or 'broker_data')
+    return {
+        'periods': periods,
+        'stocks': job['stocks'],
+        'universe': job.get('universe', job['stocks']),
+        'partial': job.get('partial', False),
+        'formats': tuple(job.get('formats', generate_data.OUTPUT_FORMATS)),
+        'slice_dims': parse_slice(job['slice']),
+        'last_prices': job['last_prices'],
+        'max_days': job['recent'],
+        'write_default': job['write_default'],
+        'chart_points': job.get('chart_points', generate_data.DEFAULT_CHART_POINTS),
+        'alert_rules': job.get('alert_rules')
+    }
+
+
+def code_version():
+    return generate_data.new_analytics_cache().version
+
+
+def changed_stocks(run, base_path, output_path):
+    """--only-changed: saham yang input-nya berubah sejak terakhir ditulis ke output"""
+    state = generate_data.load_inputs_state(output_path)
+    key = generate_data.input_key(run, code_version())
+    changed = []
+    for stock_code in run['stocks']:
+        inputs = inputs_fingerprint(generate_data.scan_stock_folder(os.path.join(base_path, stock_code)))
+        token = generate_data.input_token(key, inputs, run['last_prices'].get(stock_code))
+        if not generate_data.is_up_to_date(state, run, stock_code, token):
+            changed.append(stock_code)
+    return changed
+
+
+def init_queue(queue_dir, base_path, run):
+    """Buat job + satu task per saham (urutan likuiditas dipertahankan)"""
+    dirs = _dirs(queue_dir)
+    if os.path.exists(os.path.join(queue_dir, 'job.json')):
+        raise ValueError(f"Queue already initialized: {queue_dir}")
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+
+    job = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'input': os.path.abspath(base_path),
+        'periods': [p['name'] for p in run['periods']],
+        'recent': run['max_days'],
+        'slice': slice_label(run['slice_dims']),
+        'write_default': run['write_default'],
+        'chart_points': run['chart_points'],
+        'alert_rules': run.get('alert_rules'),
+        'last_prices': run['last_prices'],
+        'stocks': run['stocks'],
+        'universe': run['universe'],
+        'partial': run['partial'],
+        'formats': list(run['formats']),
+        'signature': generate_data.results_signature(run, code_version())
+    }
+    _write_json(os.path.join(queue_dir, 'job.json'), job)
+    for i, stock_code in enumerate(run['stocks']):
+        open(os.path.join(dirs['pending'], f'{i:04d}_{stock_code}'), 'w').close()
+    return job
+
+
+def reclaim_expired(queue_dir, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Kembalikan lease yang tidak di-heartbeat lebih dari lease_seconds ke pending"""
+    dirs = _dirs(queue_dir)
+    now = time.time()
+    reclaimed = []
+    for name in sorted(os.listdir(dirs['leases'])):
+        path = os.path.join(dirs['leases'], name)
+        try:
+            if now - os.stat(path).st_mtime <= lease_seconds:
+                continue
+            os.rename(path, os.path.join(dirs['pending'], name))
+        except OSError:
+            continue  # sudah selesai / diambil reclaimer lain
+        reclaimed.append(name)
+    return reclaimed
+
+
+def claim_task(queue_dir, worker_id):
+    """Ambil task pending pertama; returns nama task atau None jika kosong"""
+    dirs = _dirs(queue_dir)
+    for name in sorted(os.listdir(dirs['pending'])):
+        lease_path = os.path.join(dirs['leases'], name)
+        try:
+            os.rename(os.path.join(dirs['pending'], name), lease_path)
+            # rename mempertahankan mtime saat init: segarkan dulu supaya
+            # reclaim_expired tidak langsung menganggap lease ini kedaluwarsa
+            os.utime(lease_path)
+        except OSError:
+            continue  # kalah cepat dengan worker lain
+        with open(lease_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'worker': worker_id, 'claimed_at': time.time()}))
+        return name
+    return None
+
+
+def lease_owner(queue_dir, task_name):
+    """Worker id pemilik lease (None jika lease hilang / belum ditulis)"""
+    try:
+        with open(os.path.join(_dirs(queue_dir)['leases'], task_name), 'r', encoding='utf-8') as f:
+            return json.loads(f.read() or '{}').get('worker')
+    except (OSError, ValueError):
+        return None
+
+
+def heartbeat(queue_dir, task_name, worker_id):
+    """Perpanjang lease milik worker_id; False jika lease sudah hilang atau diambil alih"""
+    if lease_owner(queue_dir, task_name) != worker_id:
+        return False
+    try:
+        os.utime(os.path.join(_dirs(queue_dir)['leases'], task_name))
+        return True
+    except OSError:
+        return False
+
+
+class LeaseKeeper:
+    """Heartbeat periodik di thread terpisah selama satu task dihitung"""
+
+    def __init__(self, queue_dir, task_name, worker_id, interval):
+        self.queue_dir = queue_dir
+        self.task_name = task_name
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not heartbeat(self.queue_dir, self.task_name, self.worker_id):
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def complete_task(queue_dir, task_name, worker_id):
+    """Pindahkan lease milik worker_id ke done; False jika lease sudah diambil alih"""
+    dirs = _dirs(queue_dir)
+    if lease_owner(queue_dir, task_name) != worker_id:
+        return False
+    try:
+        os.rename(os.path.join(dirs['leases'], task_name), os.path.join(dirs['done'], task_name))
+        return True
+    except OSError:
+        return False
+
+
+def run_worker(queue_dir, base_path=None, lease_seconds=DEFAULT_LEASE_SECONDS, once=False):
+    """Kerjakan task sampai queue habis (atau, tanpa once, sampai semua task done)"""
+    job = load_job(queue_dir)
+    run = job_run(job)
+    base_path = base_path or job['input']
+    if generate_data.results_signature(run, code_version()) != job['signature']:
+        raise ValueError("Worker code/registry differs from the job signature; update this host first")
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    results = RunCheckpoint(_dirs(queue_dir)['results'], job['signature'])
+    cache = generate_data.new_analytics_cache()
+    processed = 0
+
+    while True:
+        reclaim_expired(queue_dir, lease_seconds)
+        task_name = claim_task(queue_dir, worker_id)
+        if task_name is None:
+            if once or not os.listdir(_dirs(queue_dir)['leases']):
+                break
+            time.sleep(POLL_SECONDS)  # tunggu lease lain selesai / kedaluwarsa
+            continue
+
+        stock_code = _task_code(task_name)
+        print(f"[{worker_id}] Processing {stock_code}...")
+        inputs = inputs_fingerprint(generate_data.scan_stock_folder(os.path.join(base_path, stock_code)))
+        with LeaseKeeper(queue_dir, task_name, worker_id, max(1.0, lease_seconds / 4)) as lease:
+            record, flows = generate_data.compute_stock_record(stock_code, base_path, run, cache=cache)
+        if lease.lost or not heartbeat(queue_dir, task_name, worker_id):
+            print(f"  [!] Lease for {stock_code} lost; result discarded")
+            continue
+        if record is None:
+            record, flows = {'empty': True}, None
+        try:
+            results.save(stock_code, inputs, run['last_prices'].get(stock_code), record, flows)
+        except OSError as e:
+            print(f"  [!] Could not save {stock_code}: {e}")
+            continue
+        if complete_task(queue_dir, task_name, worker_id):
+            processed += 1
+        else:
+            print(f"  [!] Lease for {stock_code} taken over before completion")
+    return processed
+
+
+def queue_status(queue_dir):
+    dirs = _dirs(queue_dir)
+    return {name: len(os.listdir(dirs[name])) for name in ('pending', 'leases', 'done')}
+
+
+def merge_results(queue_dir, output_path):
+    """Gabungkan hasil semua task menjadi file periode (generate_data.write_run_outputs)"""
+    status = queue_status(queue_dir)
+    if status['pending'] or status['leases']:
+        raise ValueError(f"Queue not finished: {status['pending']} pending, {status['leases']} leased")
+
+    job = load_job(queue_dir)
+    run = job_run(job)
+    results = RunCheckpoint(_dirs(queue_dir)['results'], job['signature'])
+    flows_dir = os.path.join(output_path, 'flows')
+
+    windows_by_stock = {}
+    input_tokens = {}
+    flows_by_stock = {}
+    token_key = generate_data.input_key(run, code_version())
+    tensor = FootprintTensor() if generate_data.builds_index(run) else None
+    for stock_code in run['stocks']:
+        path = os.path.join(results.checkpoint_dir, f'{stock_code}.json')
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if record.get('signature') != job['signature']:
+            raise ValueError(f"Result for {stock_code} has a different signature")
+        input_tokens[stock_code] = generate_data.input_token(token_key, record['inputs'], record['last_price'])
+        if record.get('empty'):
+            continue
+        flows = load_flows(stock_code, results.flows_dir)
+        if flows is None:
+            raise ValueError(f"Flows for {stock_code} missing or inconsistent")
+        windows_by_stock[stock_code] = record['windows']
+        if tensor is not None and run['partial']:
+            flows_by_stock[stock_code] = flows
+        elif tensor is not None:
+            tensor.update_stock(flows)
+        # Flows cache output sama seperti run generate_data biasa
+        if run['max_days'] is None and not run['slice_dims']:
+            save_flows(flows, flows_dir)
+
+    if run['partial'] and tensor is not None:
+        tensor = generate_data.universe_tensor(run, flows_by_stock, flows_dir)
+
+    os.makedirs(output_path, exist_ok=True)
+    generate_data.write_run_outputs(output_path, run, windows_by_stock, tensor, input_tokens=input_tokens)
+    return len(windows_by_stock)
+
+
+def _option(args, name, default=None):
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ('init', 'worker', 'status', 'merge'):
+        print("Usage:")
+        print("  python work_queue.py init <queue> --input <Analisis> [--output <dir>] [generate_data options]")
+        print("      (--stocks / --only-changed: merge replaces only those stocks in <output>)")
+        print("  python work_queue.py worker <queue> [--input <Analisis>] [--lease 600] [--once]")
+        print("  python work_queue.py status <queue>")
+        print("  python work_queue.py merge <queue> --output <dir>")
+        return
+
+    command, queue_dir = sys.argv[1], sys.argv[2]
+    args = sys.argv[3:]
+
+    if command == 'init':
+        base_path = _option(args, '--input')
+        if not base_path:
+            print("Error: --input is required")
+            return
+        # --output hanya untuk default TopStok snapshot (<output>/TopStok/topstok.csv)
+        output_path = _option(args, '--output', os.path.dirname(os.path.abspath(base_path)))
+        base_path = os.path.abspath(base_path)
+        gen_args = generate_data.parse_args(args)
+        run = generate_data.prepare_run(gen_args, base_path, output_path)
+        if run is None:
+            return
+        if gen_args.only_changed:
+            run = dict(run, stocks=changed_stocks(run, base_path, output_path))
+        job = init_queue(queue_dir, base_path, run)
+        print(f"[OK] Queue {queue_dir}: {len(job['stocks'])} tasks (signature {job['signature'][:12]})")
+
+    elif command == 'worker':
+        base_path = _option(args, '--input')
+        lease_seconds = int(_option(args, '--lease', DEFAULT_LEASE_SECONDS))
+        processed = run_worker(queue_dir, base_path, lease_seconds, '--once' in args)
+        print(f"[OK] Worker finished: {processed} tasks")
+
+    elif command == 'status':
+        status = queue_status(queue_dir)
+        print(f"pending: {status['pending']}  leased: {status['leases']}  done: {status['done']}")
+
+    else:
+        output_path = _option(args, '--output')
+        if not output_path:
+            print("Error: --output is required")
+            return
+        count = merge_results(queue_dir, output_path)
+        print(f"\n[OK] Merged {count} stocks into {output_path}")
+
+
+if __name__ == '__main__':
+    main()